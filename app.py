@@ -1,12 +1,19 @@
+import asyncio
+from functools import partial
 from flask import Flask, request, jsonify
 from flask_cors import CORS  # Add this import
-from config import GEMINI_KEY_1, GEMINI_KEY_2, ROUNDS
+from config import (GEMINI_KEY_1, DEFAULT_LIMITS, ANALYZE_QUOTA, QUOTA_COST_DEBATE,
+                    QUOTA_COST_CACHED, ROUNDS)
 from utils.gemini_setup import setup_gemini
-from models.ai_lawyer import AILawyer
+from utils.rate_limit import SQLiteRateLimiter
+from utils.search_cache import get_search_cache
+from utils.log_sink import get_log_sink
+from utils.token_meter import token_meter
 from models.judge import Judge
-from models.debate_db import DebateDB
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
+from models.rag_store import get_rag_store
+from models.debate import create_lawyers, run_debate, run_thread_step
+from models.retrieval import debate_rounds
+from models.debate_db import DebateDB, ReservationExpired, ThreadBusy
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -14,19 +21,57 @@ CORS(app)  # Enable CORS for all routes
 
 
 
-limiter = Limiter(
-    get_remote_address,
-    app=app,
-    default_limits=["200 per day", "50 per hour"],
-    storage_uri="memory://"
-)
+# Rate limits are counted in a shared SQLite file so all workers see the same quota
+limiter = SQLiteRateLimiter()
+
+
+class QuotaExceeded(Exception):
+    """Raised when a client has no quota left for the requested analysis"""
+    def __init__(self, retry_after: float):
+        super().__init__(f"Quota exceeded, retry after {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+def rate_limited_response(retry_after: float):
+    """Build the 429 response for a rejected request"""
+    response = jsonify({"error": "Rate limit exceeded", "retry_after": round(retry_after)})
+    response.headers['Retry-After'] = str(int(retry_after) + 1)
+    return response, 429
+
+
+@app.before_request
+def apply_default_limits():
+    """Apply the default per-IP limits to every endpoint except health checks"""
+    if request.endpoint in (None, 'health_check') or request.method == 'OPTIONS':
+        return None
+    allowed, retry_after = limiter.hit(f"default:{request.remote_addr}", DEFAULT_LIMITS)
+    if not allowed:
+        return rate_limited_response(retry_after)
+    return None
+
 # Initialize database
 db = DebateDB()
 
+def charge_quota(quota_key: str, cost: int):
+    """Charge an analysis against the caller's quota, raising QuotaExceeded if it doesn't fit"""
+    if quota_key is None:
+        return
+    allowed, retry_after = limiter.hit(quota_key, [ANALYZE_QUOTA], cost=cost)
+    if not allowed:
+        raise QuotaExceeded(retry_after)
+
+def debate_cost(rounds: int) -> int:
+    """Quota cost of a debate of `rounds` rounds: QUOTA_COST_DEBATE per ROUNDS rounds, rounded up"""
+    return max(1, -(-QUOTA_COST_DEBATE * rounds // ROUNDS))
+
 # Modify the analyze_message function to force a debate for testing purposes
 
-def analyze_message(message: str):
-    """Analyze a custom message for potential scams"""
+def analyze_message(message: str, quota_key: str = None):
+    """Analyze a custom message for potential scams
+
+    When quota_key is given, the analysis is charged against ANALYZE_QUOTA:
+    cached verdicts cost QUOTA_COST_CACHED, debates their debate_cost.
+    """
     # Ensure message is a string
     if isinstance(message, dict):
         message = message.get('text', '')  # assuming the message is in 'text' field
@@ -37,6 +82,7 @@ def analyze_message(message: str):
     # First check if we have a similar case
     has_similar, cached_verdict = judge.check_similar_case(message)
     if has_similar:
+        charge_quota(quota_key, QUOTA_COST_CACHED)
         return {
             "message": message,
             "verdict": cached_verdict['verdict'],
@@ -56,42 +102,11 @@ def analyze_message(message: str):
     #         "source": "direct"
     #     }
     
-    # For complex cases, proceed with full debate
-    prosecutor = AILawyer(
-        name="Scam Analyst",
-        api_key=GEMINI_KEY_1,
-        role="prosecutor"
-    )
-    
-    defender = AILawyer(
-        name="Legitimacy Analyst",
-        api_key=GEMINI_KEY_2,
-        role="defender"
-    )
-    
-    # Multi-round debate for message analysis
-    previous_defender_arg = None
-    
-    for round_num in range(1, ROUNDS + 1):
-        print(f"\n=== Round {round_num}/{ROUNDS} ===")
-        
-        # Prosecutor makes argument (considering defender's previous argument)
-        prosecutor_argument = prosecutor.make_argument(message, previous_defender_arg)
-        print(f"Prosecutor Argument: {prosecutor_argument}")
-        judge.record_argument(prosecutor.name, f"Round {round_num}: {prosecutor_argument}")
-        print(f"{prosecutor.name}: Argument presented")
-        
-        # Defender responds to prosecutor's argument
-        defender_argument = defender.make_argument(message, prosecutor_argument)
-        print(f"Defender Argument: {defender_argument}")
-        judge.record_argument(defender.name, f"Round {round_num}: {defender_argument}")
-        print(f"{defender.name}: Counter-argument presented")
-        
-        # Store defender's argument for next round
-        previous_defender_arg = defender_argument
-    
-    print(f"\n=== Debate Complete: {ROUNDS} rounds finished ===")
-    verdict_data = judge.analyze_debate(message)
+    # For complex cases, proceed with full debate; near-misses start from their precedents in fewer rounds
+    rounds = debate_rounds(judge.precedents)
+    charge_quota(quota_key, debate_cost(rounds))
+    prosecutor, defender = create_lawyers()
+    verdict_data = run_debate(message, judge, prosecutor, defender, rounds=rounds, precedents=judge.precedents)
     
     # Save to database
     debate_id = db.save_debate(
@@ -115,22 +130,41 @@ def analyze_message(message: str):
         "source": "debate"
     }
 
-@app.route('/testanalyze', methods=['POST'])
-def testanalyze_endpoint():
-    """API endpoint to analyze messages"""
+def analyze_thread_message(thread: dict, message: str, reservation: int, quota_key: str = None):
+    """Re-evaluate a thread after a new message (see models.debate.run_thread_step)
+
+    `reservation` is the id returned by DebateDB.reserve_thread_message.
+    """
+    judge = Judge(setup_gemini(GEMINI_KEY_1))
+    return asyncio.run(run_thread_step(db, thread, message, reservation, judge, create_lawyers(),
+                                       charge=partial(charge_quota, quota_key)))
+
+def get_request_message():
+    """Extract the message text from a JSON request, returning (message, error_response)"""
     if not request.is_json:
-        return jsonify({"error": "Content-Type must be application/json"}), 400
+        return None, (jsonify({"error": "Content-Type must be application/json"}), 400)
     
+    # Malformed JSON is rejected by Flask itself with a 400
     data = request.get_json()
+    if not isinstance(data, dict):
+        return None, (jsonify({"error": "Request body must be a JSON object"}), 400)
     if 'message' not in data:
-        return jsonify({"error": "Message field is required"}), 400
+        return None, (jsonify({"error": "Message field is required"}), 400)
     
     # Extract the actual message text from the request
     message = data['message']
     if isinstance(message, dict):
         if 'text' not in message:
-            return jsonify({"error": "Message must contain 'text' field"}), 400
+            return None, (jsonify({"error": "Message must contain 'text' field"}), 400)
         message = message['text']
+    return message, None
+
+@app.route('/testanalyze', methods=['POST'])
+def testanalyze_endpoint():
+    """API endpoint to analyze messages"""
+    message, error = get_request_message()
+    if error:
+        return error
     
     result = analyze_message(message)
     return jsonify(result)
@@ -138,31 +172,99 @@ def testanalyze_endpoint():
 
 
 @app.route('/analyze', methods=['POST'])
-@limiter.limit("2 per day")  # Max 2 requests per day per IP
 def analyze_endpoint():
     """API endpoint to analyze messages"""
-    if not request.is_json:
-        return jsonify({"error": "Content-Type must be application/json"}), 400
+    message, error = get_request_message()
+    if error:
+        return error
     
-    data = request.get_json()
-    if 'message' not in data:
-        return jsonify({"error": "Message field is required"}), 400
+    try:
+        result = analyze_message(message, quota_key=f"analyze:{request.remote_addr}")
+    except QuotaExceeded as e:
+        return rate_limited_response(e.retry_after)
+    return jsonify(result)
+
+
+@app.route('/threads', methods=['POST'])
+def create_thread_endpoint():
+    """Start a conversation thread with its first message"""
+    message, error = get_request_message()
+    if error:
+        return error
     
-    # Extract the actual message text from the request
-    message = data['message']
-    if isinstance(message, dict):
-        if 'text' not in message:
-            return jsonify({"error": "Message must contain 'text' field"}), 400
-        message = message['text']
+    try:
+        result = analyze_message(message, quota_key=f"analyze:{request.remote_addr}")
+    except QuotaExceeded as e:
+        return rate_limited_response(e.retry_after)
     
-    result = analyze_message(message)
+    thread_id = db.create_thread()
+    result['position'] = db.add_thread_message(thread_id, message, result['verdict'], result['summary'],
+                                               result['source'], result.get('debate_id'))
+    result['thread_id'] = thread_id
+    return jsonify(result), 201
+
+
+@app.route('/threads/<int:thread_id>/messages', methods=['POST'])
+def append_thread_message_endpoint(thread_id):
+    """Append a message to a thread and re-evaluate the conversation"""
+    message, error = get_request_message()
+    if error:
+        return error
+    
+    if not db.get_thread(thread_id):
+        return jsonify({"error": "Thread not found"}), 404
+    
+    # Claim the next position first, so concurrent appends to this thread are rejected before any round runs
+    try:
+        reservation = db.reserve_thread_message(thread_id, message)
+    except ThreadBusy as e:
+        return jsonify({"error": str(e)}), 409
+    
+    try:
+        thread = db.get_thread(thread_id)
+        result = analyze_thread_message(thread, message, reservation, quota_key=f"analyze:{request.remote_addr}")
+    except QuotaExceeded as e:
+        db.release_thread_message(reservation)
+        return rate_limited_response(e.retry_after)
+    except ReservationExpired as e:
+        return jsonify({"error": str(e)}), 409
+    except Exception:
+        db.release_thread_message(reservation)
+        raise
     return jsonify(result)
 
 
+@app.route('/threads/<int:thread_id>', methods=['GET'])
+def get_thread(thread_id):
+    """Get a thread with its messages and current verdict"""
+    try:
+        thread = db.get_thread(thread_id)
+        if thread:
+            return jsonify({
+                "success": True,
+                "thread": thread
+            })
+        else:
+            return jsonify({"error": "Thread not found"}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({"status": "healthy"}), 200
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Report cache, log writer, token and case store counters for this worker"""
+    return jsonify({
+        "search_cache": get_search_cache().stats(),
+        "log_sink": get_log_sink().stats(),
+        "tokens": token_meter.stats(),
+        "debates": token_meter.debate_stats(),
+        "rag_store": get_rag_store().stats()
+    })
+
 @app.route('/debates', methods=['GET'])
 def get_debates():
     """Get all debates with optional limit"""
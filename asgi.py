@@ -0,0 +1,225 @@
+"""Async serving mode: the LLM-bound endpoints run as coroutines on one event loop.
+
+A sync gunicorn worker holds one debate per thread while it waits on Gemini.
+Here every debate awaits the async Gemini clients instead, so a single worker
+keeps hundreds of debates in flight. Sentence embeddings and RAGStore writes
+run on a small thread pool (ENCODE_THREADS), DebateDB calls on a single thread
+so they do not queue behind embeddings. All other endpoints are served by the
+Flask app mounted underneath, whose a2wsgi threads use the same DebateDB; it
+serializes access to its shared SQLite connection itself.
+
+Run with:
+    gunicorn asgi:app -c gunicorn_config.py -k uvicorn.workers.UvicornWorker
+"""
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+from config import GEMINI_KEY_1, DEFAULT_LIMITS, ENCODE_THREADS, QUOTA_COST_CACHED
+from app import app as flask_app, db, limiter, charge_quota, debate_cost, QuotaExceeded
+from utils.gemini_setup import setup_gemini
+from models.judge import Judge
+from models.rag_store import get_rag_store
+from models.debate import get_lawyers, run_blocking, run_debate_async, run_thread_step
+from models.debate_db import ReservationExpired, ThreadBusy
+from models.retrieval import debate_rounds
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Embeddings and other blocking work; DebateDB calls get their own thread (DebateDB locks its connection)
+encode_executor = ThreadPoolExecutor(max_workers=ENCODE_THREADS, thread_name_prefix="encode")
+db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="debate-db")
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def get_judge_components():
+    """Return the judge model and RAGStore shared by every request in this worker"""
+    with _shared_lock:
+        if not _shared:
+            _shared['model'] = setup_gemini(GEMINI_KEY_1)
+            _shared['rag_store'] = get_rag_store()
+        return _shared['model'], _shared['rag_store']
+
+
+async def create_judge() -> Judge:
+    """Create a judge for one request around the worker's shared model and RAGStore"""
+    model, rag_store = await run_blocking(encode_executor, get_judge_components)
+    return Judge(model, rag_store=rag_store)
+
+
+async def analyze_message_async(message: str, quota_key: str = None) -> dict:
+    """Coroutine version of app.analyze_message"""
+    judge = await create_judge()
+
+    has_similar, cached_verdict = await run_blocking(encode_executor, judge.check_similar_case, message)
+    if has_similar:
+        await run_blocking(None, charge_quota, quota_key, QUOTA_COST_CACHED)
+        return {
+            "message": message,
+            "verdict": cached_verdict['verdict'],
+            "summary": cached_verdict['summary'],
+            "evidence": cached_verdict['evidence'],
+            "source": "cached"
+        }
+
+    rounds = debate_rounds(judge.precedents)
+    await run_blocking(None, charge_quota, quota_key, debate_cost(rounds))
+    prosecutor, defender = get_lawyers()
+    verdict_data = await run_debate_async(message, judge, prosecutor, defender, rounds=rounds,
+                                          precedents=judge.precedents, executor=encode_executor)
+
+    debate_id = await run_blocking(
+        db_executor, db.save_debate,
+        message=message,
+        verdict=verdict_data['verdict'],
+        summary=verdict_data['summary'],
+        evidence=verdict_data['evidence'],
+        arguments=verdict_data['arguments'],
+        judge_statement=verdict_data['judge_statement'],
+        source="debate"
+    )
+
+    return {
+        "debate_id": debate_id,
+        "message": message,
+        "verdict": verdict_data['verdict'],
+        "summary": verdict_data['summary'],
+        "evidence": verdict_data['evidence'],
+        "arguments": verdict_data['arguments'],
+        "judge_statement": verdict_data['judge_statement'],
+        "source": "debate"
+    }
+
+
+async def analyze_thread_message_async(thread: dict, message: str, reservation: int, quota_key: str = None) -> dict:
+    """Coroutine version of app.analyze_thread_message"""
+    return await run_thread_step(db, thread, message, reservation, await create_judge(), get_lawyers(),
+                                 charge=partial(charge_quota, quota_key), db_executor=db_executor,
+                                 executor=encode_executor)
+
+
+def rate_limited_response(retry_after: float) -> JSONResponse:
+    """Build the 429 response for a rejected request"""
+    return JSONResponse({"error": "Rate limit exceeded", "retry_after": round(retry_after)}, status_code=429,
+                        headers={'Retry-After': str(int(retry_after) + 1)})
+
+
+async def read_request_message(request: Request):
+    """Async counterpart of app.get_request_message, returning (message, error_response)"""
+    # The default per-IP limits that Flask's before_request applies to mounted routes, checked first as there
+    allowed, retry_after = await run_blocking(None, limiter.hit, f"default:{request.client.host}", DEFAULT_LIMITS)
+    if not allowed:
+        return None, rate_limited_response(retry_after)
+
+    if request.headers.get('content-type', '').split(';')[0].strip() != 'application/json':
+        return None, JSONResponse({"error": "Content-Type must be application/json"}, status_code=400)
+
+    try:
+        data = await request.json()
+    except ValueError:
+        # json.JSONDecodeError and UnicodeDecodeError are both ValueErrors
+        return None, JSONResponse({"error": "Request body must be valid JSON"}, status_code=400)
+    if not isinstance(data, dict):
+        return None, JSONResponse({"error": "Request body must be a JSON object"}, status_code=400)
+    if 'message' not in data:
+        return None, JSONResponse({"error": "Message field is required"}, status_code=400)
+
+    message = data['message']
+    if isinstance(message, dict):
+        if 'text' not in message:
+            return None, JSONResponse({"error": "Message must contain 'text' field"}, status_code=400)
+        message = message['text']
+    return message, None
+
+
+async def testanalyze_endpoint(request: Request):
+    """API endpoint to analyze messages"""
+    message, error = await read_request_message(request)
+    if error:
+        return error
+    return JSONResponse(await analyze_message_async(message))
+
+
+async def analyze_endpoint(request: Request):
+    """API endpoint to analyze messages"""
+    message, error = await read_request_message(request)
+    if error:
+        return error
+
+    try:
+        result = await analyze_message_async(message, quota_key=f"analyze:{request.client.host}")
+    except QuotaExceeded as e:
+        return rate_limited_response(e.retry_after)
+    return JSONResponse(result)
+
+
+async def create_thread_endpoint(request: Request):
+    """Start a conversation thread with its first message"""
+    message, error = await read_request_message(request)
+    if error:
+        return error
+
+    try:
+        result = await analyze_message_async(message, quota_key=f"analyze:{request.client.host}")
+    except QuotaExceeded as e:
+        return rate_limited_response(e.retry_after)
+
+    thread_id = await run_blocking(db_executor, db.create_thread)
+    result['position'] = await run_blocking(db_executor, db.add_thread_message, thread_id, message,
+                                            result['verdict'], result['summary'], result['source'],
+                                            result.get('debate_id'))
+    result['thread_id'] = thread_id
+    return JSONResponse(result, status_code=201)
+
+
+async def append_thread_message_endpoint(request: Request):
+    """Append a message to a thread and re-evaluate the conversation"""
+    message, error = await read_request_message(request)
+    if error:
+        return error
+
+    thread_id = request.path_params['thread_id']
+    if not await run_blocking(db_executor, db.get_thread, thread_id):
+        return JSONResponse({"error": "Thread not found"}, status_code=404)
+
+    try:
+        reservation = await run_blocking(db_executor, db.reserve_thread_message, thread_id, message)
+    except ThreadBusy as e:
+        return JSONResponse({"error": str(e)}, status_code=409)
+
+    try:
+        thread = await run_blocking(db_executor, db.get_thread, thread_id)
+        result = await analyze_thread_message_async(thread, message, reservation,
+                                                    quota_key=f"analyze:{request.client.host}")
+    except QuotaExceeded as e:
+        await run_blocking(db_executor, db.release_thread_message, reservation)
+        return rate_limited_response(e.retry_after)
+    except ReservationExpired as e:
+        return JSONResponse({"error": str(e)}, status_code=409)
+    except Exception:
+        await run_blocking(db_executor, db.release_thread_message, reservation)
+        raise
+    return JSONResponse(result)
+
+
+app = Starlette(routes=[
+    Route('/testanalyze', testanalyze_endpoint, methods=['POST']),
+    Route('/analyze', analyze_endpoint, methods=['POST']),
+    Route('/threads', create_thread_endpoint, methods=['POST']),
+    Route('/threads/{thread_id:int}/messages', append_thread_message_endpoint, methods=['POST']),
+    # Health, metrics and the read-only debate/thread endpoints stay on Flask
+    Mount('/', WSGIMiddleware(flask_app))
+], middleware=[
+    # Same open CORS policy as flask_cors.CORS(app)
+    Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])
+])
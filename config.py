@@ -9,8 +9,58 @@ GEMINI_KEY_1 = os.getenv('GEMINI_KEY_1')
 GEMINI_KEY_2 = os.getenv('GEMINI_KEY_2')
 
 # Configure Google Custom Search API (for web search)
-GOOGLE_SEARCH_API = "https://www.googleapis.com/customsearch/v1"
+GOOGLE_SEARCH_API = os.getenv('GOOGLE_SEARCH_API', "https://www.googleapis.com/customsearch/v1")
+GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY', os.getenv('GOOGLE_SEARCH_API_KEY'))
 SEARCH_ENGINE_ID = os.getenv('SEARCH_ENGINE_ID')
+# With Custom Search configured, lawyers get their evidence from the cached search instead of Gemini grounding
+WEB_SEARCH_ENABLED = bool(GOOGLE_API_KEY and SEARCH_ENGINE_ID)
+SEARCH_TIMEOUT = float(os.getenv('SEARCH_TIMEOUT', 10))
+
+# Configure the web search result cache (utils/web_search.py)
+SEARCH_CACHE_DB = os.getenv('SEARCH_CACHE_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), "search_cache.db"))
+SEARCH_CACHE_TTL = int(os.getenv('SEARCH_CACHE_TTL_HOURS', 24)) * 3600
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', 10000))
 
 # Configure debate rounds
-ROUNDS = int(os.getenv('ROUNDS', 3))  # Default to 3 rounds if not set
\ No newline at end of file
+ROUNDS = int(os.getenv('ROUNDS', 3))  # Default to 3 rounds if not set
+
+# Configure debate log segments (background writer in utils/log_sink.py)
+LOG_DIR = os.getenv('LOG_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), "debate_logs"))
+LOG_SEGMENT_MAX_BYTES = int(os.getenv('LOG_SEGMENT_MAX_MB', 64)) * 1024 * 1024
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 1000))
+# Configure rate limiting (shared across gunicorn workers via SQLite)
+RATE_LIMIT_DB = os.getenv('RATE_LIMIT_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), "rate_limits.db"))
+DEFAULT_LIMITS = ["200 per day", "50 per hour"]
+# /analyze quota in cost units: a full debate costs QUOTA_COST_DEBATE, a cached verdict QUOTA_COST_CACHED
+ANALYZE_QUOTA = os.getenv('ANALYZE_QUOTA', "10 per day")
+QUOTA_COST_DEBATE = int(os.getenv('QUOTA_COST_DEBATE', 5))
+QUOTA_COST_CACHED = int(os.getenv('QUOTA_COST_CACHED', 1))
+# A message appended to a thread runs a single debate round
+QUOTA_COST_ROUND = int(os.getenv('QUOTA_COST_ROUND', 2))
+# Seconds after which a thread message still being judged (its worker died) no longer blocks the thread
+THREAD_STEP_TIMEOUT = int(os.getenv('THREAD_STEP_TIMEOUT', 300))
+
+# Configure similar-case matching: default threshold, overridden per verdict by scripts/calibrate_threshold.py
+SIMILARITY_THRESHOLD = float(os.getenv('SIMILARITY_THRESHOLD', 0.90))
+SIMILARITY_THRESHOLDS_FILE = os.getenv('SIMILARITY_THRESHOLDS_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), "similarity_thresholds.json"))
+
+# Configure the debates database
+DEBATES_DB = os.getenv('DEBATES_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), "debates.db"))
+
+# Configure the async server (asgi.py): threads for embedding and other blocking work per worker
+ENCODE_THREADS = int(os.getenv('ENCODE_THREADS', 4))
+
+# Configure precedent retrieval: the top-k similar past cases are summarised into the debate prompts
+PRECEDENT_TOP_K = int(os.getenv('PRECEDENT_TOP_K', 3))  # 0 disables retrieval
+PRECEDENT_MIN_SIMILARITY = float(os.getenv('PRECEDENT_MIN_SIMILARITY', 0.60))
+# Near-miss cases (best precedent >= NEAR_MISS_SIMILARITY, below the cache threshold, all precedents on one
+# verdict) may debate fewer rounds. Off by default (ROUNDS) until its effect on verdicts has been measured.
+NEAR_MISS_SIMILARITY = float(os.getenv('NEAR_MISS_SIMILARITY', 0.75))
+NEAR_MISS_ROUNDS = int(os.getenv('NEAR_MISS_ROUNDS', ROUNDS))
+
+# Configure the sharded case store behind RAGStore: recent shards stay in memory up to the budget,
+# older ones are memory-mapped. The pickle cache of earlier versions is migrated on first load.
+RAG_STORE_DIR = os.getenv('RAG_STORE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), "case_store"))
+RAG_MEMORY_BUDGET_BYTES = int(os.getenv('RAG_MEMORY_BUDGET_MB', 256)) * 1024 * 1024
+RAG_SHARD_DAYS = int(os.getenv('RAG_SHARD_DAYS', 30))
+RAG_LEGACY_CACHE = os.getenv('RAG_LEGACY_CACHE', os.path.join(os.path.dirname(os.path.abspath(__file__)), "case_cache.pkl"))
@@ -1,168 +1,83 @@
+import asyncio
+import logging
 from google import genai
 from google.genai import types
+from config import WEB_SEARCH_ENABLED
+from utils.token_meter import token_meter
+from utils.web_search import perform_web_search, evidence_query
+from .prompts import lawyer_system_instruction, lawyer_request
 
-# ============================================================================
-# LAWYER A - SKEPTIC/PROSECUTOR (CONDENSED)
-# ============================================================================
+# Configure logging
+logger = logging.getLogger(__name__)
 
-LAWYER_A_SYSTEM_PROMPT = """You are Lawyer A, the Skeptical Prosecutor. Challenge claims by finding flaws, misinformation, and missing context.
+MODEL_NAME = "gemini-2.0-flash-exp"
 
-ANALYZE FOR:
-1. Source credibility issues
-2. Logical fallacies and inconsistencies  
-3. Missing context or cherry-picked facts
-4. Political/ideological bias
-5. Relevancy (true but irrelevant claims)
-
-USE EVIDENCE: Always cite URLs from web search results."""
-
-# ============================================================================
-# LAWYER B - DEFENDER/ADVOCATE (CONDENSED)
-# ============================================================================
-
-LAWYER_B_SYSTEM_PROMPT = """You are Lawyer B, the Analytical Defender. Validate claims by finding supporting evidence and proper context.
-
-ANALYZE FOR:
-1. Corroborating sources and evidence
-2. Proper context that supports the claim
-3. Expert consensus
-4. Nuance and legitimate interpretations
-5. Relevancy validation
-
-USE EVIDENCE: Always cite URLs from web search results. Acknowledge weaknesses honestly."""
 
 class AILawyer:
-    def __init__(self, name: str, api_key: str, role: str):
+    def __init__(self, name: str, api_key: str, role: str, client: genai.Client = None,
+                 web_search: bool = None):
         """
         Args:
             name: "Scam Analyst" or "Legitimacy Analyst"
             api_key: Gemini API key
             role: "prosecutor" or "defender"
+            client: Optional preconfigured client (e.g. pointed at a stub backend)
+            web_search: Take evidence from the cached web search instead of Gemini grounding
+                (defaults to WEB_SEARCH_ENABLED)
         """
         self.name = name
         self.role = role
-        self.client = genai.Client(api_key=api_key)
+        self.client = client or genai.Client(api_key=api_key)
         
-        # Set system prompt based on role
-        self.system_prompt = LAWYER_A_SYSTEM_PROMPT if role == "prosecutor" else LAWYER_B_SYSTEM_PROMPT
+        # Static system instruction: role prompt plus the argument structure, compiled once per process
+        self.system_prompt = lawyer_system_instruction(role, name)
         
-        # Configure Google Search grounding
-        self.grounding_tool = types.Tool(
-            google_search=types.GoogleSearch()
-        )
+        # Evidence from the cached Custom Search is shared by every round, debate and worker that
+        # looks up the same message; without it, Gemini's Google Search grounding runs on every call
+        self.web_search = WEB_SEARCH_ENABLED if web_search is None else web_search
+        tools = None if self.web_search else [types.Tool(google_search=types.GoogleSearch())]
         
         self.config = types.GenerateContentConfig(
-            tools=[self.grounding_tool],
+            tools=tools,
             temperature=0.7,
             system_instruction=self.system_prompt
         )
 
-    def make_argument(self, message: str, opposing_argument: str = None) -> str:
-        """Generate an argument using Gemini with Google Search grounding"""
-        
-        # Construct the prompt
-        if opposing_argument:
-            prompt = f"""Analyze this message:
-"{message}"
-
-The opposing analyst has argued:
-"{opposing_argument}"
-
-Present your analysis as a professional case study with the following structure:
-
-═══════════════════════════════════════════════════════════════════════════
-ARGUMENT #{"{round_number}"} - {self.name.upper()}
-═══════════════════════════════════════════════════════════════════════════
-
-📋 EXECUTIVE SUMMARY
--------------------
-[One-sentence overview of your position]
-
-🔍 DETAILED ANALYSIS
---------------------
-
-【POINT 1】[Clear, specific heading]
-├─ Analysis: [Your argument in 2-3 sentences]
-├─ Evidence: [Specific finding with data/facts]
-└─ Source: [URL] - [Organization name]
-
-【POINT 2】[Clear, specific heading]
-├─ Analysis: [Your argument in 2-3 sentences]
-├─ Evidence: [Specific finding with data/facts]
-└─ Source: [URL] - [Organization name]
-
-【POINT 3】[Clear, specific heading]
-├─ Analysis: [Your argument in 2-3 sentences]
-├─ Evidence: [Specific finding with data/facts]
-└─ Source: [URL] - [Organization name]
-
-⚖️ REBUTTAL TO OPPOSING COUNSEL
---------------------------------
-├─ Their Claim: [Quote key opposing argument]
-├─ Our Counter: [Direct response with evidence]
-└─ Weakness Exposed: [Identify flaw in their reasoning]
-
-💡 CONCLUSION
--------------
-[2-3 sentence summary reinforcing your position]
+    def make_argument(self, message: str, opposing_argument: str = None, thread_messages: list = None,
+                      precedents: list = None) -> str:
+        """Generate an argument using Gemini with web search evidence
 
-═══════════════════════════════════════════════════════════════════════════
-
-Requirements:
-✓ Use specific, credible sources with full URLs
-✓ Present data, statistics, or expert opinions
-✓ Maintain professional, analytical tone
-✓ Address opponent's arguments directly
-✓ Total length: 400-500 words"""
-        else:
-            prompt = f"""Analyze this message:
-"{message}"
-
-Present your analysis as a professional case study with the following structure:
-
-═══════════════════════════════════════════════════════════════════════════
-OPENING ARGUMENT - {self.name.upper()}
-═══════════════════════════════════════════════════════════════════════════
-
-📋 EXECUTIVE SUMMARY
--------------------
-[One-sentence overview of your position]
-
-🔍 DETAILED ANALYSIS
---------------------
-
-【POINT 1】[Clear, specific heading]
-├─ Analysis: [Your argument in 2-3 sentences]
-├─ Evidence: [Specific finding with data/facts]
-└─ Source: [URL] - [Organization name]
-
-【POINT 2】[Clear, specific heading]
-├─ Analysis: [Your argument in 2-3 sentences]
-├─ Evidence: [Specific finding with data/facts]
-└─ Source: [URL] - [Organization name]
-
-【POINT 3】[Clear, specific heading]
-├─ Analysis: [Your argument in 2-3 sentences]
-├─ Evidence: [Specific finding with data/facts]
-└─ Source: [URL] - [Organization name]
-
-💡 CONCLUSION
--------------
-[2-3 sentence summary reinforcing your position]
-
-═══════════════════════════════════════════════════════════════════════════
-
-Requirements:
-✓ Use specific, credible sources with full URLs
-✓ Present data, statistics, or expert opinions
-✓ Maintain professional, analytical tone
-✓ Total length: 400-500 words"""
+        When thread_messages is given, `message` is the newest message of that
+        conversation and the argument focuses on what it changes. Precedents
+        retrieved by the judge and the search results are summarised ahead of
+        the request.
+        """
+        evidence = self._evidence(message) if self.web_search else None
+        prompt = lawyer_request(message, opposing_argument, thread_messages, precedents, evidence)
+        
+        response = self._generate(prompt)
+        token_meter.record(f"lawyer:{self.role}", response)
+        return response.text
     
-        # Generate response using Gemini with Google Search grounding
-        response = self.client.models.generate_content(
-            model="gemini-2.0-flash-exp",
-            contents=prompt,
-            config=self.config
-        )
+    async def make_argument_async(self, message: str, opposing_argument: str = None,
+                                  thread_messages: list = None, precedents: list = None) -> str:
+        """Coroutine version of make_argument using the client's async API"""
+        # The search (usually a cache hit) is a blocking SQLite/HTTP call
+        evidence = await asyncio.to_thread(self._evidence, message) if self.web_search else None
+        prompt = lawyer_request(message, opposing_argument, thread_messages, precedents, evidence)
         
-        return response.text
\ No newline at end of file
+        response = await self._generate_async(prompt)
+        token_meter.record(f"lawyer:{self.role}", response)
+        return response.text
+    
+    def _evidence(self, message: str) -> list:
+        """Web search results for a message, from the shared search cache when possible"""
+        return perform_web_search(evidence_query(message))
+    
+    def _generate(self, prompt: str):
+        """Call Gemini with the lawyer's system instruction"""
+        return self.client.models.generate_content(model=MODEL_NAME, contents=prompt, config=self.config)
+    
+    async def _generate_async(self, prompt: str):
+        """Coroutine version of _generate"""
+        return await self.client.aio.models.generate_content(model=MODEL_NAME, contents=prompt, config=self.config)
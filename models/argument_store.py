@@ -0,0 +1,160 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import zlib
+import logging
+from collections import OrderedDict
+from typing import Dict, Iterable, List
+from config import DEBATES_DB
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class ArgumentStore:
+    """Content-addressed, zlib-compressed argument bodies kept in debates.db.
+
+    Bodies are keyed by the SHA-256 of their text, so an argument shared by the
+    debates table, the RAGStore cache and repeated debates is stored once.
+    Recently read bodies are kept decompressed in a small LRU.
+    """
+
+    def __init__(self, db_path: str = DEBATES_DB, cache_size: int = 512, timeout: float = 5.0):
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self.timeout = timeout
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._local = threading.local()
+        self.create_tables()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, reopening it after a fork"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def create_tables(self):
+        """Create the blob table"""
+        conn = self._connection()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS argument_blobs (
+                hash TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL
+            )
+        ''')
+        conn.commit()
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        """Return the content address of an argument body"""
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def put(self, text: str) -> str:
+        """Store an argument body (once) and return its hash"""
+        return self.put_many([text])[0]
+
+    def put_many(self, texts: List[str]) -> List[str]:
+        """Store several argument bodies in one transaction and return their hashes"""
+        hashes = [self.hash_text(text) for text in texts]
+        conn = self._connection()
+        conn.executemany(
+            'INSERT OR IGNORE INTO argument_blobs (hash, body, size) VALUES (?, ?, ?)',
+            [(h, zlib.compress(text.encode('utf-8'), 6), len(text)) for h, text in zip(hashes, texts)]
+        )
+        conn.commit()
+        for h, text in zip(hashes, texts):
+            self._remember(h, text)
+        return hashes
+
+    def get(self, text_hash: str) -> str:
+        """Return the argument body for a hash"""
+        return self.get_many([text_hash]).get(text_hash, '')
+
+    def get_many(self, hashes: Iterable[str]) -> Dict[str, str]:
+        """Return {hash: body} for every known hash, reading missing ones in one query"""
+        found = {}
+        missing = []
+        with self._cache_lock:
+            for h in set(hashes):
+                if h in self._cache:
+                    self._cache.move_to_end(h)
+                    found[h] = self._cache[h]
+                else:
+                    missing.append(h)
+
+        conn = self._connection()
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(missing), 500):
+            batch = missing[start:start + 500]
+            placeholders = ",".join("?" for _ in batch)
+            rows = conn.execute(f'SELECT hash, body FROM argument_blobs WHERE hash IN ({placeholders})', batch)
+            for h, body in rows:
+                text = zlib.decompress(body).decode('utf-8')
+                found[h] = text
+                self._remember(h, text)
+        return found
+
+    def _remember(self, text_hash: str, text: str):
+        with self._cache_lock:
+            self._cache[text_hash] = text
+            self._cache.move_to_end(text_hash)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    @staticmethod
+    def split_round_prefix(text: str) -> tuple:
+        """Split "Round N: body" into (prefix, body, suffix) as DebateDB stores the body"""
+        if text.startswith("Round "):
+            head, sep, rest = text.partition(":")
+            if sep and head[len("Round "):].strip().isdigit():
+                body = rest.strip()
+                start = text.index(body, len(head) + 1) if body else len(text)
+                return text[:start], body, text[start + len(body):]
+        return "", text, ""
+
+    def compact_arguments(self, arguments: List[Dict]) -> List[Dict]:
+        """Replace the 'argument' bodies of a debate history with 'hash' references.
+
+        The "Round N:" prefix is kept on the reference so the body hashes the same
+        as the copy DebateDB stores for that debate.
+        """
+        parts = [self.split_round_prefix(arg.get('argument', '')) for arg in arguments]
+        hashes = self.put_many([body for _, body, _ in parts])
+        refs = []
+        for arg, (prefix, _, suffix), h in zip(arguments, parts, hashes):
+            ref = {k: v for k, v in arg.items() if k != 'argument'}
+            ref['hash'] = h
+            if prefix:
+                ref['prefix'] = prefix
+            if suffix:
+                ref['suffix'] = suffix
+            refs.append(ref)
+        return refs
+
+    def expand_arguments(self, refs: List[Dict]) -> List[Dict]:
+        """Inverse of compact_arguments"""
+        bodies = self.get_many(ref['hash'] for ref in refs)
+        arguments = []
+        for ref in refs:
+            arg = {k: v for k, v in ref.items() if k not in ('hash', 'prefix', 'suffix')}
+            arg['argument'] = ref.get('prefix', '') + bodies.get(ref['hash'], '') + ref.get('suffix', '')
+            arguments.append(arg)
+        return arguments
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_argument_store(db_path: str = DEBATES_DB) -> ArgumentStore:
+    """Return the process-wide argument store for a database"""
+    with _stores_lock:
+        if db_path not in _stores:
+            _stores[db_path] = ArgumentStore(db_path)
+        return _stores[db_path]
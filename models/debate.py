@@ -0,0 +1,204 @@
+import asyncio
+import threading
+from functools import partial
+from config import GEMINI_KEY_1, GEMINI_KEY_2, QUOTA_COST_ROUND, ROUNDS
+from utils.token_meter import token_meter
+from .ai_lawyer import AILawyer
+from .judge import Judge
+from .prompts import thread_topic
+
+
+def create_lawyers():
+    """Create the prosecutor and defender, one per Gemini key"""
+    prosecutor = AILawyer(
+        name="Scam Analyst",
+        api_key=GEMINI_KEY_1,
+        role="prosecutor"
+    )
+    
+    defender = AILawyer(
+        name="Legitimacy Analyst",
+        api_key=GEMINI_KEY_2,
+        role="defender"
+    )
+    return prosecutor, defender
+
+
+_lawyers = None
+_lawyers_lock = threading.Lock()
+
+
+def get_lawyers():
+    """Return a process-wide prosecutor and defender
+
+    Lawyers hold no per-debate state, so the async server shares one pair and
+    their clients' connection pools across all concurrent debates.
+    """
+    global _lawyers
+    if _lawyers is None:
+        with _lawyers_lock:
+            if _lawyers is None:
+                _lawyers = create_lawyers()
+    return _lawyers
+
+
+def run_debate(message: str, judge: Judge, prosecutor: AILawyer, defender: AILawyer,
+               rounds: int = ROUNDS, precedents: list = None) -> dict:
+    """Run a multi-round debate and return the judge's verdict
+
+    `precedents` (usually judge.precedents) are summarised into every lawyer prompt and the judge's.
+    """
+    previous_defender_arg = None
+    token_meter.record_debate(rounds, bool(precedents))
+    
+    for round_num in range(1, rounds + 1):
+        print(f"\n=== Round {round_num}/{rounds} ===")
+        
+        # Prosecutor makes argument (considering defender's previous argument)
+        prosecutor_argument = prosecutor.make_argument(message, previous_defender_arg, precedents=precedents)
+        print(f"Prosecutor Argument: {prosecutor_argument}")
+        judge.record_argument(prosecutor.name, f"Round {round_num}: {prosecutor_argument}")
+        print(f"{prosecutor.name}: Argument presented")
+        
+        # Defender responds to prosecutor's argument
+        defender_argument = defender.make_argument(message, prosecutor_argument, precedents=precedents)
+        print(f"Defender Argument: {defender_argument}")
+        judge.record_argument(defender.name, f"Round {round_num}: {defender_argument}")
+        print(f"{defender.name}: Counter-argument presented")
+        
+        # Store defender's argument for next round
+        previous_defender_arg = defender_argument
+    
+    print(f"\n=== Debate Complete: {rounds} rounds finished ===")
+    return judge.analyze_debate(message, precedents=precedents)
+
+
+async def run_debate_async(message: str, judge: Judge, prosecutor: AILawyer, defender: AILawyer,
+                           rounds: int = ROUNDS, precedents: list = None, executor=None) -> dict:
+    """Coroutine version of run_debate; `executor` runs the judge's blocking bookkeeping"""
+    previous_defender_arg = None
+    token_meter.record_debate(rounds, bool(precedents))
+    
+    for round_num in range(1, rounds + 1):
+        prosecutor_argument = await prosecutor.make_argument_async(message, previous_defender_arg,
+                                                                   precedents=precedents)
+        judge.record_argument(prosecutor.name, f"Round {round_num}: {prosecutor_argument}")
+        
+        defender_argument = await defender.make_argument_async(message, prosecutor_argument, precedents=precedents)
+        judge.record_argument(defender.name, f"Round {round_num}: {defender_argument}")
+        
+        previous_defender_arg = defender_argument
+    
+    return await judge.analyze_debate_async(message, precedents=precedents, executor=executor)
+
+
+async def run_blocking(executor, func, *args, **kwargs):
+    """Run a blocking call on `executor` (the loop's default pool when None) and await its result"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, partial(func, *args, **kwargs))
+
+
+def last_lawyer_argument(db, debate: dict, speaker: str) -> str:
+    """Return the latest argument of `speaker` in a thread step's debate or the steps before it
+
+    Precedent steps record no lawyer arguments, so this follows parent_id back to the last debated step.
+    """
+    while debate is not None:
+        for arg in reversed(debate['arguments']):
+            if arg['speaker'] == speaker:
+                return arg['argument']
+        debate = db.get_debate(debate['parent_id']) if debate.get('parent_id') else None
+    return None
+
+
+async def run_thread_round_async(thread_messages: list, message: str, judge: Judge, prosecutor: AILawyer,
+                                 defender: AILawyer, round_num: int, previous_defender_arg: str = None,
+                                 precedents: list = None, executor=None) -> dict:
+    """Run a single round on a message appended to a thread and re-judge the thread
+
+    The judge must already hold the previous step's last round and verdict (Judge.load_history);
+    the prosecutor opens by answering the defender's last argument, if any. `precedents` of the
+    new message go to both lawyers and the judge.
+    """
+    prosecutor_argument = await prosecutor.make_argument_async(message, previous_defender_arg, thread_messages,
+                                                               precedents)
+    judge.record_argument(prosecutor.name, f"Round {round_num}: {prosecutor_argument}")
+    
+    defender_argument = await defender.make_argument_async(message, prosecutor_argument, thread_messages,
+                                                           precedents)
+    judge.record_argument(defender.name, f"Round {round_num}: {defender_argument}")
+    
+    return await judge.analyze_debate_async(thread_topic(thread_messages + [message]), store_case=False,
+                                            precedents=precedents, executor=executor)
+
+
+async def run_thread_step(db, thread: dict, message: str, reservation: int, judge: Judge, lawyers: tuple,
+                          charge=None, db_executor=None, executor=None) -> dict:
+    """Re-evaluate a thread after a new message, reusing its stored debate state
+
+    The new message alone is looked up in RAGStore. On a hit the matched case is
+    recorded as precedent and only the judge runs; otherwise a single debate
+    round focused on the new message runs on top of the previous step's last
+    round and verdict. Either way `charge(QUOTA_COST_ROUND)` runs before any
+    model call. The step's debate is saved with its verdict at the position
+    held by `reservation` (DebateDB.reserve_thread_message).
+
+    Both servers share this step: asgi.py awaits it with its DebateDB and
+    embedding executors, app.py runs it with asyncio.run on the default pool.
+    """
+    previous_messages = [m['message'] for m in thread['messages']]
+    topic = thread_topic(previous_messages + [message])
+    
+    # Resume from the last round and verdict of the thread's latest debate
+    latest, round_num = None, 1
+    if thread['latest_debate_id'] is not None:
+        latest = await run_blocking(db_executor, db.get_debate, thread['latest_debate_id'])
+        judge.load_history(latest)
+        round_num = max([arg['round'] for arg in latest['arguments']], default=0) + 1
+    
+    has_similar, cached_verdict = await run_blocking(executor, judge.check_similar_case, message)
+    if charge is not None:
+        await run_blocking(None, charge, QUOTA_COST_ROUND)
+    
+    if has_similar:
+        judge.record_argument("Precedent", f"Round {round_num}: Message {len(previous_messages) + 1} closely "
+                                           f"matches a previous case judged {cached_verdict['verdict']}: "
+                                           f"{cached_verdict['summary']}")
+        verdict_data = await judge.analyze_debate_async(topic, store_case=False, executor=executor)
+        source = "thread_precedent"
+    else:
+        prosecutor, defender = lawyers
+        previous_defender_arg = await run_blocking(db_executor, last_lawyer_argument, db, latest, defender.name)
+        verdict_data = await run_thread_round_async(previous_messages, message, judge, prosecutor, defender,
+                                                    round_num, previous_defender_arg, precedents=judge.precedents,
+                                                    executor=executor)
+        source = "thread_round"
+    
+    # Earlier rounds are already stored with the previous step's debate, which parent_id links
+    arguments = [arg for arg in verdict_data['arguments'] if arg['argument'].startswith(f"Round {round_num}:")]
+    # Saved together with the verdict, so a step that outlived its reservation leaves no debate behind
+    position, debate_id = await run_blocking(
+        db_executor, db.complete_thread_message, reservation, verdict_data['verdict'], verdict_data['summary'],
+        source, debate={
+            'message': topic,
+            'verdict': verdict_data['verdict'],
+            'summary': verdict_data['summary'],
+            'evidence': verdict_data['evidence'],
+            'arguments': arguments,
+            'judge_statement': verdict_data['judge_statement'],
+            'source': source,
+            'parent_id': thread['latest_debate_id']
+        })
+    
+    return {
+        "thread_id": thread['id'],
+        "position": position,
+        "debate_id": debate_id,
+        "message": message,
+        "verdict": verdict_data['verdict'],
+        "summary": verdict_data['summary'],
+        "evidence": verdict_data['evidence'],
+        "arguments": arguments,
+        "judge_statement": verdict_data['judge_statement'],
+        "source": source
+    }
@@ -1,15 +1,51 @@
 import sqlite3
 import json
+import threading
 import time
-import os
-from typing import Dict, List
+from functools import wraps
+from typing import Dict, Iterator, List, Set
 from datetime import datetime
+from config import DEBATES_DB, THREAD_STEP_TIMEOUT
+from .argument_store import get_argument_store
+
+# Debates judging a single message, which are also stored as RAGStore cases. Thread steps
+# (thread_round, thread_precedent) judge a numbered transcript and are never indexed.
+CASE_SOURCES = ('debate', 'direct')
+
+
+class ThreadBusy(Exception):
+    """Raised when another message of the same thread is still being judged"""
+    def __init__(self, thread_id: int):
+        super().__init__(f"Thread {thread_id} already has a message being analyzed")
+        self.thread_id = thread_id
+
+
+class ReservationExpired(Exception):
+    """Raised when a thread step outlived its reservation, which a later append dropped as stale"""
+    def __init__(self, reservation: int):
+        super().__init__("The message took too long to analyze and its thread position was released; retry it")
+        self.reservation = reservation
+
+
+def _serialized(method):
+    """Run a DebateDB method under the connection lock"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 
 class DebateDB:
-    def __init__(self):
+    def __init__(self, db_path: str = None):
         """Initialize database connection"""
-        db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "debates.db")
+        db_path = db_path or DEBATES_DB
         self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        # The connection is shared by every request thread of the worker (and the ASGI
+        # db_executor alongside Flask routes mounted under a2wsgi), so all access is serialized
+        self.lock = threading.RLock()
+        # Argument bodies are stored compressed and deduplicated, shared with RAGStore
+        self.argument_store = get_argument_store(db_path)
         self.create_tables()
     
     def create_tables(self):
@@ -44,22 +80,79 @@ class DebateDB:
             )
         ''')
         
-        self.conn.commit()
-    
-    def save_debate(self, message: str, verdict: str, summary: str, evidence: List[str], 
-                   arguments: List[Dict], judge_statement: str, source: str = "debate") -> int:
-        """Save a complete debate to the database"""
-        cursor = self.conn.cursor()
+        # Bodies of new arguments live in argument_blobs; legacy rows keep them inline
+        cursor.execute('PRAGMA table_info(arguments)')
+        if 'body_hash' not in [column[1] for column in cursor.fetchall()]:
+            cursor.execute('ALTER TABLE arguments ADD COLUMN body_hash TEXT')
+        
+        # A thread step stores only its own round and links the debate of the previous step
+        cursor.execute('PRAGMA table_info(debates)')
+        if 'parent_id' not in [column[1] for column in cursor.fetchall()]:
+            cursor.execute('ALTER TABLE debates ADD COLUMN parent_id INTEGER REFERENCES debates (id)')
+        
+        # Verdicts table (re-adjudicated verdicts, one per debate and scoring version)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS verdicts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                debate_id INTEGER NOT NULL,
+                version TEXT NOT NULL,
+                verdict TEXT NOT NULL,
+                summary TEXT,
+                evidence TEXT,
+                judge_statement TEXT,
+                source TEXT,
+                timestamp REAL NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (debate_id, version),
+                FOREIGN KEY (debate_id) REFERENCES debates (id)
+            )
+        ''')
         
-        # Insert debate record
+        # Threads group messages of one conversation; each step links the debate that judged it
         cursor.execute('''
-            INSERT INTO debates (message, verdict, summary, evidence, judge_statement, source, timestamp)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (message, verdict, summary, json.dumps(evidence), judge_statement, source, time.time()))
+            CREATE TABLE IF NOT EXISTS threads (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp REAL NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
         
-        debate_id = cursor.lastrowid
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS thread_messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                thread_id INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                message TEXT NOT NULL,
+                debate_id INTEGER,
+                verdict TEXT,
+                summary TEXT,
+                source TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (thread_id, position),
+                FOREIGN KEY (thread_id) REFERENCES threads (id),
+                FOREIGN KEY (debate_id) REFERENCES debates (id)
+            )
+        ''')
         
-        # Insert all arguments
+        self.conn.commit()
+    
+    @_serialized
+    def save_debate(self, message: str, verdict: str, summary: str, evidence: List[str], 
+                   arguments: List[Dict], judge_statement: str, source: str = "debate",
+                   parent_id: int = None) -> int:
+        """Save a complete debate to the database
+
+        Thread steps pass only their own round's arguments and the previous step's debate as parent_id.
+        """
+        rows = self._store_arguments(arguments)
+        debate_id = self._insert_debate(self.conn.cursor(), message, verdict, summary, evidence, rows,
+                                        judge_statement, source, parent_id)
+        self.conn.commit()
+        return debate_id
+    
+    def _store_arguments(self, arguments: List[Dict]) -> List[tuple]:
+        """Store argument bodies and return (round_number, speaker, body_hash) rows"""
+        rows = []
         for arg in arguments:
             # Extract round number from speaker field if it has "Round X:" prefix
             round_number = arg.get('round', 0)
@@ -76,14 +169,31 @@ class DebateDB:
                 except Exception:
                     pass
             
-            cursor.execute('''
-                INSERT INTO arguments (debate_id, round_number, speaker, argument)
-                VALUES (?, ?, ?, ?)
-            ''', (debate_id, round_number, speaker, argument_text))
+            rows.append((round_number, speaker, argument_text))
         
-        self.conn.commit()
+        # Store bodies first: the argument store writes through its own connection,
+        # so this must not run inside a transaction of self.conn
+        hashes = self.argument_store.put_many([row[2] for row in rows])
+        return [(round_number, speaker, body_hash) for (round_number, speaker, _), body_hash in zip(rows, hashes)]
+    
+    def _insert_debate(self, cursor, message: str, verdict: str, summary: str, evidence: List[str],
+                       rows: List[tuple], judge_statement: str, source: str, parent_id: int) -> int:
+        """Insert a debate and its argument rows without committing"""
+        cursor.execute('''
+            INSERT INTO debates (message, verdict, summary, evidence, judge_statement, source, timestamp, parent_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (message, verdict, summary, json.dumps(evidence), judge_statement, source, time.time(), parent_id))
+        
+        debate_id = cursor.lastrowid
+        
+        # Insert all arguments
+        cursor.executemany('''
+            INSERT INTO arguments (debate_id, round_number, speaker, argument, body_hash)
+            VALUES (?, ?, ?, '', ?)
+        ''', [(debate_id, round_number, speaker, body_hash) for round_number, speaker, body_hash in rows])
         return debate_id
     
+    @_serialized
     def get_debate(self, debate_id: int) -> Dict:
         """Retrieve a debate by ID"""
         cursor = self.conn.cursor()
@@ -95,43 +205,249 @@ class DebateDB:
         if not debate_row:
             return None
         
-        # Get all arguments for this debate
-        cursor.execute('''
-            SELECT round_number, speaker, argument 
+        return self._format_debates([debate_row])[0]
+    
+    @_serialized
+    def get_all_debates(self, limit: int = 100) -> List[Dict]:
+        """Retrieve all debates"""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT * FROM debates ORDER BY timestamp DESC LIMIT ?', (limit,))
+        return self._format_debates(cursor.fetchall())
+    
+    def _format_debates(self, debate_rows: List[tuple]) -> List[Dict]:
+        """Attach arguments to debate rows, loading all of them in one pass"""
+        if not debate_rows:
+            return []
+        cursor = self.conn.cursor()
+        
+        # Get all arguments for these debates
+        debate_ids = [row[0] for row in debate_rows]
+        placeholders = ",".join("?" for _ in debate_ids)
+        cursor.execute(f'''
+            SELECT debate_id, round_number, speaker, argument, body_hash
             FROM arguments 
-            WHERE debate_id = ? 
+            WHERE debate_id IN ({placeholders})
             ORDER BY id
-        ''', (debate_id,))
-        arguments = cursor.fetchall()
+        ''', debate_ids)
+        argument_rows = cursor.fetchall()
+        bodies = self.argument_store.get_many(row[4] for row in argument_rows if row[4])
         
-        # Format timestamp to readable date
-        timestamp = debate_row[7]
-        readable_date = datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+        arguments = {debate_id: [] for debate_id in debate_ids}
+        for debate_id, round_number, speaker, argument, body_hash in argument_rows:
+            arguments[debate_id].append({
+                'round': round_number,
+                'speaker': speaker,
+                'argument': bodies.get(body_hash, '') if body_hash else argument
+            })
         
-        return {
-            'id': debate_row[0],
-            'message': debate_row[1],
-            'verdict': debate_row[2],
-            'summary': debate_row[3],
-            'evidence': json.loads(debate_row[4]),
-            'judge_statement': debate_row[5],
-            'source': debate_row[6],
-            'timestamp': timestamp,
-            'created_at': readable_date,
-            'arguments': [
-                {'round': arg[0], 'speaker': arg[1], 'argument': arg[2]} 
-                for arg in arguments
-            ]
-        }
+        debates = []
+        for debate_row in debate_rows:
+            # Format timestamp to readable date
+            timestamp = debate_row[7]
+            readable_date = datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+            
+            debates.append({
+                'id': debate_row[0],
+                'message': debate_row[1],
+                'verdict': debate_row[2],
+                'summary': debate_row[3],
+                'evidence': json.loads(debate_row[4]),
+                'judge_statement': debate_row[5],
+                'source': debate_row[6],
+                'timestamp': timestamp,
+                'created_at': readable_date,
+                'parent_id': debate_row[9],
+                'arguments': arguments[debate_row[0]]
+            })
+        return debates
     
-    def get_all_debates(self, limit: int = 100) -> List[Dict]:
-        """Retrieve all debates"""
+    def compact_arguments(self, batch_size: int = 500) -> int:
+        """Move inline argument bodies of legacy rows into the argument store"""
+        cursor = self.conn.cursor()
+        moved = 0
+        while True:
+            with self.lock:
+                cursor.execute('''
+                    SELECT id, argument FROM arguments WHERE body_hash IS NULL LIMIT ?
+                ''', (batch_size,))
+                rows = cursor.fetchall()
+            if not rows:
+                return moved
+            hashes = self.argument_store.put_many([row[1] for row in rows])
+            with self.lock:
+                cursor.executemany(
+                    "UPDATE arguments SET argument = '', body_hash = ? WHERE id = ?",
+                    [(body_hash, row[0]) for row, body_hash in zip(rows, hashes)]
+                )
+                self.conn.commit()
+            moved += len(rows)
+    
+    def iter_messages(self, chunk_size: int = 100, after_id: int = 0,
+                      sources: tuple = CASE_SOURCES) -> Iterator[List[Dict]]:
+        """Yield debates in id order as chunks of {'id', 'message', 'verdict'} dicts
+
+        Only debates whose source is in `sources` are included (all when None);
+        by default that is the single-message debates that go into RAGStore.
+        """
+        cursor = self.conn.cursor()
+        source_filter = f"AND source IN ({','.join('?' for _ in sources)})" if sources else ""
+        while True:
+            # The lock is held per chunk, not across the caller's work between chunks
+            with self.lock:
+                cursor.execute(f'''
+                    SELECT id, message, verdict FROM debates
+                    WHERE id > ? {source_filter} ORDER BY id LIMIT ?
+                ''', (after_id, *(sources or ()), chunk_size))
+                rows = cursor.fetchall()
+            if not rows:
+                return
+            yield [{'id': row[0], 'message': row[1], 'verdict': row[2]} for row in rows]
+            after_id = rows[-1][0]
+    
+    @_serialized
+    def save_verdict(self, debate_id: int, version: str, verdict: str, summary: str,
+                     evidence: List[str], judge_statement: str = None, source: str = "debate"):
+        """Save (or replace) the verdict of a debate under a scoring version"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            INSERT OR REPLACE INTO verdicts (debate_id, version, verdict, summary, evidence, judge_statement, source, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (debate_id, version, verdict, summary, json.dumps(evidence), judge_statement, source, time.time()))
+        self.conn.commit()
+    
+    @_serialized
+    def get_verdict_ids(self, version: str, debate_ids: List[int]) -> Set[int]:
+        """Return which of the given debates already have a verdict under `version`"""
+        if not debate_ids:
+            return set()
+        cursor = self.conn.cursor()
+        placeholders = ",".join("?" for _ in debate_ids)
+        cursor.execute(
+            f'SELECT debate_id FROM verdicts WHERE version = ? AND debate_id IN ({placeholders})',
+            (version, *debate_ids)
+        )
+        return {row[0] for row in cursor.fetchall()}
+    
+    @_serialized
+    def create_thread(self) -> int:
+        """Start a new conversation thread"""
+        cursor = self.conn.cursor()
+        cursor.execute('INSERT INTO threads (timestamp) VALUES (?)', (time.time(),))
+        self.conn.commit()
+        return cursor.lastrowid
+    
+    def add_thread_message(self, thread_id: int, message: str, verdict: str, summary: str,
+                           source: str, debate_id: int = None) -> int:
+        """Append a judged message to a thread and return its position"""
+        reservation = self.reserve_thread_message(thread_id, message)
+        position, _ = self.complete_thread_message(reservation, verdict, summary, source, debate_id)
+        return position
+    
+    def reserve_thread_message(self, thread_id: int, message: str, stale_after: float = THREAD_STEP_TIMEOUT) -> int:
+        """Claim the next position of a thread for a message about to be judged, returning the reservation id
+
+        The pending row (no verdict yet) is inserted in one IMMEDIATE transaction,
+        so concurrent appends from any worker cannot get the same position. While
+        it is pending, further appends raise ThreadBusy before they pay for a
+        round. Pending rows older than stale_after seconds, left by a worker that
+        died mid-round, are dropped.
+        """
+        with self.lock:
+            cursor = self.conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                cursor.execute('''
+                    DELETE FROM thread_messages
+                    WHERE thread_id = ? AND verdict IS NULL AND created_at < datetime('now', ?)
+                ''', (thread_id, f"-{int(stale_after)} seconds"))
+                cursor.execute('SELECT COUNT(*) FROM thread_messages WHERE thread_id = ? AND verdict IS NULL',
+                               (thread_id,))
+                if cursor.fetchone()[0]:
+                    raise ThreadBusy(thread_id)
+                cursor.execute('SELECT COALESCE(MAX(position), 0) + 1 FROM thread_messages WHERE thread_id = ?',
+                               (thread_id,))
+                position = cursor.fetchone()[0]
+                cursor.execute('INSERT INTO thread_messages (thread_id, position, message) VALUES (?, ?, ?)',
+                               (thread_id, position, message))
+                reservation = cursor.lastrowid
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+        return reservation
+    
+    def complete_thread_message(self, reservation: int, verdict: str, summary: str, source: str,
+                                debate_id: int = None, debate: Dict = None) -> tuple:
+        """Record the verdict of a reserved message and return (position, debate_id)
+
+        `debate` holds save_debate's arguments for the debate judged in this step. It is
+        inserted in the same transaction as the verdict, so a reservation that went stale
+        and was dropped raises ReservationExpired without leaving an orphan debate behind.
+        """
+        if debate is not None:
+            debate = dict(debate)
+            debate['rows'] = self._store_arguments(debate.pop('arguments'))
+        with self.lock:
+            cursor = self.conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                cursor.execute('SELECT position FROM thread_messages WHERE id = ? AND verdict IS NULL',
+                               (reservation,))
+                row = cursor.fetchone()
+                if row is None:
+                    raise ReservationExpired(reservation)
+                if debate is not None:
+                    debate_id = self._insert_debate(cursor, **debate)
+                cursor.execute('''
+                    UPDATE thread_messages SET debate_id = ?, verdict = ?, summary = ?, source = ?
+                    WHERE id = ?
+                ''', (debate_id, verdict, summary, source, reservation))
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+        return row[0], debate_id
+    
+    def release_thread_message(self, reservation: int):
+        """Drop a reservation whose message could not be judged"""
+        with self.lock:
+            self.conn.execute('DELETE FROM thread_messages WHERE id = ? AND verdict IS NULL', (reservation,))
+            self.conn.commit()
+    
+    @_serialized
+    def get_thread(self, thread_id: int) -> Dict:
+        """Retrieve a thread with its messages and the id of its latest debate"""
         cursor = self.conn.cursor()
-        cursor.execute('SELECT id FROM debates ORDER BY timestamp DESC LIMIT ?', (limit,))
-        debate_ids = [row[0] for row in cursor.fetchall()]
+        cursor.execute('SELECT id, timestamp FROM threads WHERE id = ?', (thread_id,))
+        thread_row = cursor.fetchone()
         
-        return [self.get_debate(debate_id) for debate_id in debate_ids]
+        if not thread_row:
+            return None
+        
+        # Messages still being judged are not part of the thread yet
+        cursor.execute('''
+            SELECT position, message, debate_id, verdict, summary, source
+            FROM thread_messages
+            WHERE thread_id = ? AND verdict IS NOT NULL
+            ORDER BY position
+        ''', (thread_id,))
+        messages = [
+            {'position': row[0], 'message': row[1], 'debate_id': row[2],
+             'verdict': row[3], 'summary': row[4], 'source': row[5]}
+            for row in cursor.fetchall()
+        ]
+        debate_ids = [m['debate_id'] for m in messages if m['debate_id'] is not None]
+        
+        return {
+            'id': thread_row[0],
+            'created_at': datetime.fromtimestamp(thread_row[1]).strftime('%Y-%m-%d %H:%M:%S'),
+            'messages': messages,
+            'latest_debate_id': debate_ids[-1] if debate_ids else None,
+            'verdict': messages[-1]['verdict'] if messages else None,
+            'summary': messages[-1]['summary'] if messages else None
+        }
     
+    @_serialized
     def close(self):
         """Close database connection"""
         self.conn.close()
@@ -1,26 +1,61 @@
+import asyncio
 import json
-import time
 import os
-import google.generativeai as genai
+import time
 from typing import Dict, Tuple
-from .rag_store import RAGStore
+from config import SIMILARITY_THRESHOLD, SIMILARITY_THRESHOLDS_FILE, PRECEDENT_TOP_K, PRECEDENT_MIN_SIMILARITY
+from .rag_store import RAGStore, get_rag_store
+from .prompts import direct_verdict_prompt, debate_verdict_prompt
+from utils.gemini_setup import RetryGenerativeModel
+from utils.token_meter import token_meter
+from utils.log_sink import get_log_sink
 import logging
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+_thresholds = {'mtime': None, 'value': None}
+
+
+def load_similarity_thresholds(path: str = SIMILARITY_THRESHOLDS_FILE) -> dict:
+    """Load calibrated thresholds, re-reading the file whenever it changes.
+
+    Returns {'default': float, 'per_verdict': {verdict: float}}; falls back to
+    SIMILARITY_THRESHOLD when no calibration file exists.
+    """
+    mtime = os.path.getmtime(path) if os.path.exists(path) else None
+    if _thresholds['value'] is not None and _thresholds['mtime'] == mtime:
+        return _thresholds['value']
+    
+    value = {'default': SIMILARITY_THRESHOLD, 'per_verdict': {}}
+    if mtime is not None:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                calibrated = json.load(f)
+            value = {
+                'default': float(calibrated.get('default', SIMILARITY_THRESHOLD)),
+                'per_verdict': {k: float(v) for k, v in calibrated.get('per_verdict', {}).items()}
+            }
+            logger.info(f"Loaded similarity thresholds from {path}: {value}")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable similarity thresholds file {path}: {e}")
+    
+    _thresholds['mtime'] = mtime
+    _thresholds['value'] = value
+    return value
+
 class Judge:
-    def __init__(self, model: genai.GenerativeModel):
+    def __init__(self, model: RetryGenerativeModel, rag_store: RAGStore = None):
         self.model = model
         self.debate_history = []
-        self.rag_store = RAGStore()
-        logger.info("Judge initialized with new RAGStore")
+        # Near-miss cases found by the last check_similar_case; callers pass them on explicitly
+        self.precedents = []
+        # Callers that judge many messages pass a shared store to avoid reloading the encoder
+        self.rag_store = rag_store if rag_store is not None else get_rag_store()
+        logger.info("Judge initialized with RAGStore")
         
-        # Create logs directory if it doesn't exist
-        self.logs_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "debate_logs")
-        if not os.path.exists(self.logs_dir):
-            os.makedirs(self.logs_dir)
-            logger.info(f"Created debate logs directory at {self.logs_dir}")
+        # Debate logs are written off the request path by a shared background sink
+        self.log_sink = get_log_sink()
         
     def record_argument(self, speaker: str, argument: str):
         """Record each argument for final analysis"""
@@ -30,6 +65,23 @@ class Judge:
         })
         logger.info(f"Recorded argument from {speaker}")
     
+    def load_history(self, debate: dict):
+        """Seed the debate history from a thread's latest debate stored in DebateDB
+
+        Only its last round and its verdict are loaded, so the judge prompt of a
+        thread step stays the same size however long the thread grows.
+        """
+        last_round = max([arg['round'] for arg in debate['arguments']], default=0)
+        self.debate_history = [
+            {"speaker": arg['speaker'], "argument": f"Round {arg['round']}: {arg['argument']}"}
+            for arg in debate['arguments'] if arg['round'] == last_round
+        ]
+        self.debate_history.append({
+            "speaker": "Judge",
+            "argument": f"Round {last_round}: Verdict so far: {debate['verdict']} - {debate['summary']}"
+        })
+        logger.info(f"Loaded {len(self.debate_history)} prior arguments")
+    
     def check_similar_case(self, topic: str) -> Tuple[bool, dict]:
         """Check if there's a similar case and return verdict if found"""
         if not isinstance(topic, str):
@@ -41,53 +93,37 @@ class Judge:
             return False, {}
             
         logger.info(f"Checking for similar cases for topic: {topic[:100]}...")
-        similar_cases = self.rag_store.find_similar_cases(topic)
-        
-        if similar_cases:
-            best_match = similar_cases[0]
+        thresholds = load_similarity_thresholds()
+        floor = min([thresholds['default'], *thresholds['per_verdict'].values()])
+        # One hybrid lookup serves both the cache check and precedent retrieval
+        min_similarity = min(floor, PRECEDENT_MIN_SIMILARITY) if PRECEDENT_TOP_K else floor
+        candidates = self.rag_store.search(topic, min_similarity=min_similarity)
+        self.precedents = []
+        
+        if candidates:
+            best_match = max(candidates, key=lambda case: case['similarity'])
             similarity = best_match['similarity']
             logger.info(f"Best match similarity score: {similarity:.2f}")
             
-            # Increased threshold to 0.90 (90%) for more accurate matches
-            if similarity > 0.90:  # Higher threshold for more accurate matching
+            # Threshold depends on the verdict being reused (see scripts/calibrate_threshold.py)
+            threshold = thresholds['per_verdict'].get(best_match['verdict']['verdict'], thresholds['default'])
+            if similarity >= floor and similarity > threshold:
                 logger.info(f"Found highly similar case with similarity: {similarity:.2f}")
                 # Return the exact same verdict as the previous case
-                return True, best_match['verdict']
-                
-        logger.info("No highly similar cases found")
+                return True, self.rag_store.expand_case(best_match)['verdict']
+        
+        self.precedents = [case for case in candidates if case['similarity'] >= PRECEDENT_MIN_SIMILARITY][:PRECEDENT_TOP_K]
+        logger.info(f"No highly similar cases found, {len(self.precedents)} precedents retrieved")
         return False, {}
     
     def direct_verdict(self, topic: str) -> dict:
         """Provide verdict directly based on topic without debate"""
         logger.info(f"Providing direct verdict for topic: {topic[:100]}...")
         
-        prompt = f"""
-        Analyze this message objectively to determine if it's a scam or legitimate:
-        "{topic}"
-        
-        Consider these scam indicators:
-        - Urgent language or pressure tactics
-        - Requests for personal/financial information
-        - Suspicious email domains or contact methods
-        - Too-good-to-be-true offers
-        - Poor grammar/spelling
-        - Generic greetings
-        
-        Consider these legitimacy indicators:
-        - Professional company domain
-        - Realistic job requirements and salary
-        - Proper contact information
-        - Clear application process
-        - No requests for money or personal details
-        
-        Provide exactly:
-        1. Verdict: SCAM or LEGITIMATE
-        2. One sentence summary explaining why
-        3. Single most important evidence point
-        Keep it extremely concise.
-        """
+        prompt = direct_verdict_prompt(topic)
         
         response = self.model.generate_content(prompt)
+        token_meter.record("judge", response)
         
         # Parse the response into structured format
         lines = [line.strip() for line in response.text.split('\n') if line.strip()]
@@ -111,26 +147,38 @@ class Judge:
         
         return verdict_data
     
-    def analyze_debate(self, topic: str) -> dict:
-        """Analyze the debate and provide a structured verdict"""
+    def analyze_debate(self, topic: str, store_case: bool = True, precedents: list = None) -> dict:
+        """Analyze the debate and provide a structured verdict
+
+        Thread verdicts pass store_case=False: they judge a whole conversation,
+        while similar-case lookups are made per message. `precedents` should be
+        the ones the lawyers argued with.
+        """
         logger.info(f"Analyzing debate for topic: {topic[:100]}...")
-        debate_text = json.dumps(self.debate_history, indent=2)
-        
-        prompt = f"""
-        Based on the debate about this message:
-        "{topic}"
-        
-        Debate history:
-        {debate_text}
-        
-        Provide exactly:
-        1. Verdict: SCAM or LEGITIMATE
-        2. One sentence summary explaining why
-        3. Single most important evidence point
-        Keep it extremely concise.
+        response = self.model.generate_content(self._debate_prompt(topic, precedents))
+        return self._record_debate_verdict(topic, response, store_case)
+    
+    async def analyze_debate_async(self, topic: str, store_case: bool = True, precedents: list = None,
+                                   executor=None) -> dict:
+        """Coroutine version of analyze_debate
+
+        The Gemini call runs on the event loop; logging and embedding the stored
+        case run on `executor` (the loop's default pool when None).
         """
-        
-        response = self.model.generate_content(prompt)
+        logger.info(f"Analyzing debate for topic: {topic[:100]}...")
+        response = await self.model.generate_content_async(self._debate_prompt(topic, precedents))
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, self._record_debate_verdict, topic, response, store_case)
+    
+    def _debate_prompt(self, topic: str, precedents: list = None) -> str:
+        """Build the verdict prompt from the recorded debate history"""
+        # Keep the lawyers' box-drawing characters literal instead of \uXXXX escapes, which cost extra tokens
+        debate_text = json.dumps(self.debate_history, indent=2, ensure_ascii=False)
+        return debate_verdict_prompt(topic, debate_text, precedents)
+    
+    def _record_debate_verdict(self, topic: str, response, store_case: bool) -> dict:
+        """Parse the judge's response, log the debate and optionally store the case"""
+        token_meter.record("judge", response)
         
         # Parse the response into structured format
         lines = [line.strip() for line in response.text.split('\n') if line.strip()]
@@ -146,16 +194,18 @@ class Judge:
         self._save_debate_log(topic, verdict_data)
         
         # Store the case
-        self._store_case(topic, verdict_data)
+        if store_case:
+            self._store_case(topic, verdict_data)
         
         return verdict_data
     
     def _store_case(self, topic: str, verdict: dict):
         """Store the case in RAG store"""
+        # The debate history is already in verdict['arguments']; RAGStore keeps it in the argument store
         case = {
             'topic': topic,
             'verdict': verdict,
-            'key_evidence': json.dumps(self.debate_history),
+            'key_evidence': verdict['evidence'][0],
             'timestamp': time.time()
         }
         self.rag_store.add_case(case)
@@ -172,52 +222,27 @@ Reference case timestamp: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(cas
         logger.info("Formatted cached response")
         return formatted_response
         
-    def _save_debate_log(self, topic: str, verdict_data: dict):
-        """Save the debate to a text file for review"""
-        timestamp = time.strftime("%Y%m%d_%H%M%S")
-        # Create a safe filename from the first few words of the topic
-        safe_topic = "".join(c if c.isalnum() else "_" for c in topic[:30])
-        filename = f"{timestamp}_{safe_topic}.txt"
-        filepath = os.path.join(self.logs_dir, filename)
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(f"DEBATE LOG - {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"{'='*80}\n\n")
-            f.write(f"TOPIC:\n{topic}\n\n")
-            f.write(f"{'='*80}\n\n")
-            f.write("DEBATE:\n")
-            
-            for entry in self.debate_history:
-                f.write(f"\n{entry['speaker']}:\n")
-                f.write(f"{entry['argument']}\n")
-                f.write(f"{'-'*80}\n")
-            
-            f.write(f"\n{'='*80}\n\n")
-            f.write("VERDICT:\n")
-            f.write(f"Verdict: {verdict_data['verdict']}\n")
-            f.write(f"Summary: {verdict_data['summary']}\n")
-            f.write(f"Evidence: {', '.join(verdict_data['evidence'])}\n")
-        
-        logger.info(f"Debate log saved to {filepath}")
-        return filepath
-        
-    def _save_direct_verdict_log(self, topic: str, verdict_data: dict):
-        """Save direct verdict to a text file for review"""
-        timestamp = time.strftime("%Y%m%d_%H%M%S")
-        # Create a safe filename from the first few words of the topic
-        safe_topic = "".join(c if c.isalnum() else "_" for c in topic[:30])
-        filename = f"{timestamp}_{safe_topic}_direct.txt"
-        filepath = os.path.join(self.logs_dir, filename)
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(f"DIRECT VERDICT LOG - {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"{'='*80}\n\n")
-            f.write(f"TOPIC:\n{topic}\n\n")
-            f.write(f"{'='*80}\n\n")
-            f.write("VERDICT:\n")
-            f.write(f"Verdict: {verdict_data['verdict']}\n")
-            f.write(f"Summary: {verdict_data['summary']}\n")
-            f.write(f"Evidence: {', '.join(verdict_data['evidence'])}\n")
-        
-        logger.info(f"Direct verdict log saved to {filepath}")
-        return filepath
\ No newline at end of file
+    def _save_debate_log(self, topic: str, verdict_data: dict) -> bool:
+        """Queue the debate for the background log writer"""
+        queued = self.log_sink.submit({
+            'type': 'debate',
+            'topic': topic,
+            'arguments': self.debate_history.copy(),
+            'verdict': verdict_data['verdict'],
+            'summary': verdict_data['summary'],
+            'evidence': verdict_data['evidence']
+        })
+        logger.info(f"Debate log {'queued' if queued else 'dropped'}")
+        return queued
+        
+    def _save_direct_verdict_log(self, topic: str, verdict_data: dict) -> bool:
+        """Queue the direct verdict for the background log writer"""
+        queued = self.log_sink.submit({
+            'type': 'direct',
+            'topic': topic,
+            'verdict': verdict_data['verdict'],
+            'summary': verdict_data['summary'],
+            'evidence': verdict_data['evidence']
+        })
+        logger.info(f"Direct verdict log {'queued' if queued else 'dropped'}")
+        return queued
@@ -0,0 +1,261 @@
+from functools import lru_cache
+from string import Template
+
+# ============================================================================
+# Prompt templates, compiled once per process. Text that does not depend on
+# the message comes first (the lawyers' system instruction, the judge's
+# indicator lists), so every call shares the same prefix.
+# ============================================================================
+
+# ============================================================================
+# LAWYER A - SKEPTIC/PROSECUTOR (CONDENSED)
+# ============================================================================
+
+LAWYER_A_SYSTEM_PROMPT = """You are Lawyer A, the Skeptical Prosecutor. Challenge claims by finding flaws, misinformation, and missing context.
+
+ANALYZE FOR:
+1. Source credibility issues
+2. Logical fallacies and inconsistencies
+3. Missing context or cherry-picked facts
+4. Political/ideological bias
+5. Relevancy (true but irrelevant claims)
+
+USE EVIDENCE: Always cite URLs from web search results."""
+
+# ============================================================================
+# LAWYER B - DEFENDER/ADVOCATE (CONDENSED)
+# ============================================================================
+
+LAWYER_B_SYSTEM_PROMPT = """You are Lawyer B, the Analytical Defender. Validate claims by finding supporting evidence and proper context.
+
+ANALYZE FOR:
+1. Corroborating sources and evidence
+2. Proper context that supports the claim
+3. Expert consensus
+4. Nuance and legitimate interpretations
+5. Relevancy validation
+
+USE EVIDENCE: Always cite URLs from web search results. Acknowledge weaknesses honestly."""
+
+_ANALYSIS_POINTS = """📋 EXECUTIVE SUMMARY
+-------------------
+[One-sentence overview of your position]
+
+🔍 DETAILED ANALYSIS
+--------------------
+
+【POINT 1】[Clear, specific heading]
+├─ Analysis: [Your argument in 2-3 sentences]
+├─ Evidence: [Specific finding with data/facts]
+└─ Source: [URL] - [Organization name]
+
+【POINT 2】[Clear, specific heading]
+├─ Analysis: [Your argument in 2-3 sentences]
+├─ Evidence: [Specific finding with data/facts]
+└─ Source: [URL] - [Organization name]
+
+【POINT 3】[Clear, specific heading]
+├─ Analysis: [Your argument in 2-3 sentences]
+├─ Evidence: [Specific finding with data/facts]
+└─ Source: [URL] - [Organization name]"""
+
+_RULE = "═══════════════════════════════════════════════════════════════════════════"
+
+LAWYER_FORMAT = Template(f"""Present every analysis as a professional case study.
+
+OPENING ARGUMENT STRUCTURE (when there is no opposing argument yet):
+
+{_RULE}
+OPENING ARGUMENT - $name
+{_RULE}
+
+{_ANALYSIS_POINTS}
+
+💡 CONCLUSION
+-------------
+[2-3 sentence summary reinforcing your position]
+
+{_RULE}
+
+REBUTTAL STRUCTURE (when responding to the opposing analyst):
+
+{_RULE}
+ARGUMENT - $name
+{_RULE}
+
+{_ANALYSIS_POINTS}
+
+⚖️ REBUTTAL TO OPPOSING COUNSEL
+--------------------------------
+├─ Their Claim: [Quote key opposing argument]
+├─ Our Counter: [Direct response with evidence]
+└─ Weakness Exposed: [Identify flaw in their reasoning]
+
+💡 CONCLUSION
+-------------
+[2-3 sentence summary reinforcing your position]
+
+{_RULE}
+
+Requirements:
+✓ Use specific, credible sources with full URLs
+✓ Present data, statistics, or expert opinions
+✓ Maintain professional, analytical tone
+✓ Address opponent's arguments directly when rebutting
+✓ Total length: 400-500 words""")
+
+OPENING_REQUEST = Template('''Analyze this message:
+"$message"
+
+Present your analysis using the OPENING ARGUMENT STRUCTURE.''')
+
+REBUTTAL_REQUEST = Template('''Analyze this message:
+"$message"
+
+The opposing analyst has argued:
+"$opposing_argument"
+
+Present your analysis using the REBUTTAL STRUCTURE.''')
+
+THREAD_REQUEST = Template('''These messages arrived earlier in the same conversation:
+$thread
+
+A new message was just added:
+"$message"
+$opposing
+Focus on what the new message changes about the assessment of the conversation as a whole.
+Present your analysis using the $structure.''')
+
+THREAD_OPPOSING = Template('''
+The opposing analyst has argued:
+"$opposing_argument"
+''')
+
+
+PRECEDENTS = Template('''Previously judged messages similar to this one (leads to verify, not proof):
+$precedents
+
+''')
+
+
+EVIDENCE = Template('''Web search results about this message (cite these URLs):
+$results
+
+''')
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(str(text or "").split())
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+def precedent_summary(case: dict) -> str:
+    """One compact line per retrieved case: verdict, similarity, message and key evidence"""
+    verdict = case.get('verdict')
+    label = verdict.get('verdict', '') if isinstance(verdict, dict) else str(verdict or '')
+    summary = verdict.get('summary', '') if isinstance(verdict, dict) else ''
+    line = f"- [{label}, similarity {case['similarity']:.2f}] \"{_clip(case.get('topic'), 200)}\" {_clip(summary, 200)}"
+    evidence = case.get('key_evidence')
+    if evidence:
+        line += f" Evidence: {_clip(evidence, 200)}"
+    return line
+
+
+def precedent_block(precedents: list) -> str:
+    """Render retrieved precedents for a prompt, or "" when there are none"""
+    if not precedents:
+        return ""
+    return PRECEDENTS.substitute(precedents="\n".join(precedent_summary(case) for case in precedents))
+
+
+def evidence_block(results: list) -> str:
+    """Render web search results for a lawyer prompt, or "" when there are none"""
+    if not results:
+        return ""
+    return EVIDENCE.substitute(results="\n".join(
+        f"- {_clip(r.get('title'), 120)}: {_clip(r.get('snippet'), 300)} ({r.get('link')})" for r in results
+    ))
+
+
+def thread_topic(messages: list) -> str:
+    """Render the messages of a thread as one numbered block"""
+    return "\n".join(f"Message {i}: {message}" for i, message in enumerate(messages, 1))
+
+
+@lru_cache(maxsize=None)
+def lawyer_system_instruction(role: str, name: str) -> str:
+    """Return the static system instruction for a lawyer"""
+    system_prompt = LAWYER_A_SYSTEM_PROMPT if role == "prosecutor" else LAWYER_B_SYSTEM_PROMPT
+    return f"{system_prompt}\n\n{LAWYER_FORMAT.substitute(name=name.upper())}"
+
+
+def lawyer_request(message: str, opposing_argument: str = None, thread_messages: list = None,
+                   precedents: list = None, evidence: list = None) -> str:
+    """Return the per-call part of a lawyer prompt"""
+    if thread_messages:
+        if opposing_argument:
+            opposing = THREAD_OPPOSING.substitute(opposing_argument=opposing_argument)
+            structure = "REBUTTAL STRUCTURE"
+        else:
+            opposing, structure = "", "OPENING ARGUMENT STRUCTURE"
+        request = THREAD_REQUEST.substitute(thread=thread_topic(thread_messages), message=message, opposing=opposing,
+                                            structure=structure)
+    elif opposing_argument:
+        request = REBUTTAL_REQUEST.substitute(message=message, opposing_argument=opposing_argument)
+    else:
+        request = OPENING_REQUEST.substitute(message=message)
+    return precedent_block(precedents) + evidence_block(evidence) + request
+
+
+# ============================================================================
+# JUDGE
+# ============================================================================
+
+SCAM_INDICATORS = """Consider these scam indicators:
+- Urgent language or pressure tactics
+- Requests for personal/financial information
+- Suspicious email domains or contact methods
+- Too-good-to-be-true offers
+- Poor grammar/spelling
+- Generic greetings"""
+
+LEGITIMACY_INDICATORS = """Consider these legitimacy indicators:
+- Professional company domain
+- Realistic job requirements and salary
+- Proper contact information
+- Clear application process
+- No requests for money or personal details"""
+
+VERDICT_FORMAT = """Provide exactly:
+1. Verdict: SCAM or LEGITIMATE
+2. One sentence summary explaining why
+3. Single most important evidence point
+Keep it extremely concise."""
+
+DIRECT_VERDICT_PROMPT = Template(f'''{SCAM_INDICATORS}
+
+{LEGITIMACY_INDICATORS}
+
+Analyze this message objectively to determine if it's a scam or legitimate:
+"$topic"
+
+{VERDICT_FORMAT}''')
+
+DEBATE_VERDICT_PROMPT = Template(f'''${{precedents}}Based on the debate about this message:
+"$topic"
+
+Debate history:
+$debate_text
+
+{VERDICT_FORMAT}''')
+
+
+def direct_verdict_prompt(topic: str) -> str:
+    """Return the judge prompt for a verdict without debate"""
+    return DIRECT_VERDICT_PROMPT.substitute(topic=topic)
+
+
+def debate_verdict_prompt(topic: str, debate_text: str, precedents: list = None) -> str:
+    """Return the judge prompt for a verdict on a finished debate"""
+    return DEBATE_VERDICT_PROMPT.substitute(topic=topic, debate_text=debate_text,
+                                            precedents=precedent_block(precedents))
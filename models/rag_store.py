@@ -1,81 +1,763 @@
+import hashlib
 import json
-from typing import List, Dict
-import numpy as np
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 import os
 import pickle
+import shutil
+import tempfile
+import threading
+import time
+import weakref
 import logging
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import List, Dict, Optional
+import numpy as np
+from sentence_transformers import SentenceTransformer
+from config import RAG_STORE_DIR, RAG_MEMORY_BUDGET_BYTES, RAG_SHARD_DAYS, RAG_LEGACY_CACHE
+from .argument_store import ArgumentStore, get_argument_store
+from .retrieval import BM25Index, bm25_scores, bm25_top_k, reciprocal_rank_fusion
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the single-process development server runs there
+    fcntl = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Rough per-case cost of a CaseRecord and its string objects beyond their characters
+_RECORD_OVERHEAD = 400
+
+# What a case embedding encodes, recorded in the manifest. Stores written before cases were
+# embedded by their message alone are re-encoded when opened.
+_EMBEDDED_TEXT = 'topic'
+
+
+def _normalise(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length so a dot product is the cosine similarity"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class CaseRecord:
+    """The fields of a stored case needed to rank and summarise it; everything else stays on disk"""
+    __slots__ = ('topic', 'verdict', 'summary', 'key_evidence', 'timestamp')
+
+    def __init__(self, topic: str, verdict: str, summary: str, key_evidence: str, timestamp: float):
+        self.topic = topic
+        self.verdict = verdict
+        self.summary = summary
+        self.key_evidence = key_evidence
+        self.timestamp = timestamp
+
+    @classmethod
+    def from_case(cls, case: Dict) -> 'CaseRecord':
+        verdict = case.get('verdict')
+        label = verdict.get('verdict', '') if isinstance(verdict, dict) else str(verdict or '')
+        summary = verdict.get('summary', '') if isinstance(verdict, dict) else ''
+        return cls(case.get('topic', ''), label, summary, case.get('key_evidence', ''),
+                   float(case.get('timestamp', 0.0)))
+
+    def to_case(self) -> Dict:
+        """Compact case dict: verdict label and summary only (see RAGStore.expand_case)"""
+        return {
+            'topic': self.topic,
+            'verdict': {'verdict': self.verdict, 'summary': self.summary},
+            'key_evidence': self.key_evidence,
+            'timestamp': self.timestamp
+        }
+
+    def lexical_text(self) -> str:
+        """Text the case is matched against lexically"""
+        return f"{self.topic} {self.summary} {self.key_evidence}"
+
+    def memory_bytes(self) -> int:
+        return _RECORD_OVERHEAD + len(self.topic) + len(self.summary) + len(self.key_evidence)
+
+
+@lru_cache(maxsize=65536)
+def _term_hash(term: str) -> int:
+    return int.from_bytes(hashlib.blake2b(term.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+# First header field of a .lex table with postings; tables of earlier versions are rebuilt
+_LEX_MAGIC = int.from_bytes(b'LEXPOST1', 'little')
+_LEX_HEADER = 5
+
+
+def _aligned(nbytes: int) -> int:
+    return -(-nbytes // 8) * 8
+
+
+class ShardLexicon:
+    """BM25 statistics and postings of a shard: a table on disk plus the cases counted since it was written.
+
+    <name>.lex holds a header (format marker, cases covered, their total
+    length, term count, posting count) followed by the sorted 64-bit hashes of
+    the terms, the offset of each term's postings, the postings themselves
+    (uint32 row, uint16 term count) and the length of every covered case. It
+    is memory-mapped, so a lookup is a binary search plus one contiguous read
+    and the table costs no anonymous memory; only `delta` does. persisted()
+    folds the delta into a new table. Tables are only written under the
+    store's file lock and never replaced by one covering fewer cases; a worker
+    whose lexicon counts fewer cases than the table adopts the table.
+    """
+
+    def __init__(self, path: str, covered: Optional[int] = None):
+        self.path = path
+        self.covered = 0
+        self.covered_length = 0
+        self.hashes = np.empty(0, dtype=np.uint64)
+        self.offsets = np.zeros(1, dtype=np.uint64)
+        self.docs = np.empty(0, dtype=np.uint32)
+        self.tfs = np.empty(0, dtype=np.uint16)
+        self.doc_lengths = np.empty(0, dtype=np.uint32)
+        self.delta = BM25Index()
+        header = self._header(path)
+        # A table counting more than `covered` cases, more than the caller knows of yet, is ignored
+        if header is not None and (covered is None or header[0] <= covered):
+            self._map(*header)
+
+    @staticmethod
+    def _header(path: str) -> Optional[tuple]:
+        """(covered, covered_length, terms, postings) of the table at path, if there is a current one"""
+        try:
+            header = np.fromfile(path, dtype=np.uint64, count=_LEX_HEADER)
+        except FileNotFoundError:
+            return None
+        if len(header) < _LEX_HEADER or int(header[0]) != _LEX_MAGIC:
+            return None
+        return tuple(int(value) for value in header[1:])
+
+    @classmethod
+    def covered_on_disk(cls, path: str) -> int:
+        """Cases counted by the table at path, without mapping it"""
+        header = cls._header(path)
+        return header[0] if header else 0
+
+    def _map(self, covered: int, covered_length: int, terms: int, postings: int):
+        """Memory-map the arrays of the table at self.path"""
+        self.covered, self.covered_length = covered, covered_length
+        offset = _LEX_HEADER * 8
+        arrays = []
+        for dtype, count in ((np.uint64, terms), (np.uint64, terms + 1), (np.uint32, postings),
+                             (np.uint16, postings), (np.uint32, covered)):
+            # Plain ndarray views of the map: indexing a memmap object is several times slower
+            arrays.append(np.asarray(np.memmap(self.path, dtype=dtype, mode='r', offset=offset, shape=(count,)))
+                          if count else np.empty(0, dtype=dtype))
+            offset += _aligned(count * np.dtype(dtype).itemsize)
+        self.hashes, self.offsets, self.docs, self.tfs, self.doc_lengths = arrays
+
+    @property
+    def doc_count(self) -> int:
+        return self.covered + self.delta.doc_count
+
+    @property
+    def total_length(self) -> int:
+        return self.covered_length + self.delta.total_length
+
+    def add(self, text: str):
+        """Count a case appended after the table"""
+        self.delta.add(text)
+
+    def _find(self, term: str) -> Optional[int]:
+        """Position of `term` in the table, if it is there"""
+        if len(self.hashes):
+            key = np.uint64(_term_hash(term))
+            i = int(np.searchsorted(self.hashes, key))
+            if i < len(self.hashes) and self.hashes[i] == key:
+                return i
+        return None
+
+    def df(self, term: str) -> int:
+        """Number of cases containing `term`"""
+        i = self._find(term)
+        found = 0 if i is None else int(self.offsets[i + 1] - self.offsets[i])
+        return found + self.delta.df(term)
+
+    def postings(self, term: str):
+        """Rows of the cases containing `term`, in order, and the term's count in each"""
+        docs, tfs = self.delta.postings(term)
+        i = self._find(term)
+        if i is None:
+            return docs + self.covered, tfs
+        start, stop = int(self.offsets[i]), int(self.offsets[i + 1])
+        return (np.concatenate([np.asarray(self.docs[start:stop], dtype=np.int64), docs + self.covered]),
+                np.concatenate([np.asarray(self.tfs[start:stop], dtype=np.float32), tfs]))
+
+    def lengths(self, rows: np.ndarray) -> np.ndarray:
+        """Term counts of the cases at `rows`"""
+        rows = np.asarray(rows, dtype=np.int64)
+        lengths = np.empty(len(rows), dtype=np.float32)
+        in_table = rows < self.covered
+        lengths[in_table] = self.doc_lengths[rows[in_table]]
+        if not in_table.all():
+            lengths[~in_table] = self.delta.lengths(rows[~in_table] - self.covered)
+        return lengths
+
+    def persisted(self) -> 'ShardLexicon':
+        """Write the statistics, delta included, to a new table and return a lexicon reading it
+
+        If the table on disk already counts as many cases, it is returned
+        instead; it may count cases the caller has not read yet. The caller
+        holds the store's file lock, so no other worker writes meanwhile.
+        """
+        if self.covered_on_disk(self.path) >= self.doc_count:
+            return ShardLexicon(self.path)
+        # Postings of the table and of the delta, ordered by term hash, then row
+        keys = [np.repeat(np.asarray(self.hashes), np.diff(np.asarray(self.offsets)).astype(np.int64))]
+        docs = [np.asarray(self.docs, dtype=np.uint32)]
+        tfs = [np.asarray(self.tfs)]
+        for term in list(self.delta.term_postings):
+            term_docs, term_tfs = self.delta.postings(term)
+            keys.append(np.full(len(term_docs), _term_hash(term), dtype=np.uint64))
+            docs.append((term_docs + self.covered).astype(np.uint32))
+            tfs.append(term_tfs.astype(np.uint16))
+        keys, docs, tfs = np.concatenate(keys), np.concatenate(docs), np.concatenate(tfs)
+        order = np.lexsort((docs, keys))
+        keys, docs, tfs = keys[order], docs[order], tfs[order]
+        hashes, counts = np.unique(keys, return_counts=True)
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.uint64)
+        lengths = np.concatenate([np.asarray(self.doc_lengths),
+                                  np.asarray(self.delta.doc_lengths, dtype=np.uint32)]).astype(np.uint32)
+
+        covered = self.doc_count
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(np.array([_LEX_MAGIC, covered, self.total_length, len(hashes), len(docs)],
+                             dtype=np.uint64).tobytes())
+            for array in (hashes, offsets, docs, tfs, lengths):
+                data = array.tobytes()
+                f.write(data + b'\0' * (_aligned(len(data)) - len(data)))
+        os.replace(tmp, self.path)
+        return ShardLexicon(self.path)
+
+    def memory_bytes(self) -> int:
+        """In-memory part of the statistics; the table is memory-mapped"""
+        return self.delta.memory_bytes()
+
+
+class Shard:
+    """The cases of one time period, in append-only files.
+
+    <name>.jsonl  compacted case, one JSON line each
+    <name>.emb    normalised float32 embeddings, one row per case
+    <name>.idx    uint64 offset of each case's line; a case exists once its offset is written
+    <name>.lex    BM25 statistics and postings of the first cases (see ShardLexicon), rewritten as the shard grows
+
+    A hot shard holds its embeddings and CaseRecords in memory, and counts the
+    BM25 statistics and postings of new cases in memory too. A cold one is scanned through a
+    memory map, reads cases on demand and keeps its statistics in <name>.lex.
+    """
+
+    def __init__(self, directory: str, name: str, dim: int):
+        self.name = name
+        self.dim = dim
+        self.lines_path = os.path.join(directory, f"{name}.jsonl")
+        self.emb_path = os.path.join(directory, f"{name}.emb")
+        self.idx_path = os.path.join(directory, f"{name}.idx")
+        self.lex_path = os.path.join(directory, f"{name}.lex")
+        self.count = 0
+        self.hot = False
+        self.records: Optional[List[CaseRecord]] = None
+        self.embeddings: Optional[np.ndarray] = None
+        # Read from the table once the shard's cases are known (see refresh)
+        self.lexicon = ShardLexicon(self.lex_path, covered=0)
+        self._records_bytes = 0
+        self._mmap = None
+
+    def disk_count(self) -> int:
+        """Cases committed to disk, by this or any other process"""
+        try:
+            return os.path.getsize(self.idx_path) // 8
+        except FileNotFoundError:
+            return 0
+
+    def append(self, cases: List[Dict], embeddings: np.ndarray):
+        """Append cases to the files; the caller holds the store's file lock"""
+        committed = self.disk_count()
+        # An interrupted append can leave embedding rows without offsets; drop them so rows stay aligned
+        row_bytes = self.dim * 4
+        if os.path.exists(self.emb_path) and os.path.getsize(self.emb_path) > committed * row_bytes:
+            os.truncate(self.emb_path, committed * row_bytes)
+
+        offsets = []
+        with open(self.lines_path, 'ab') as lines:
+            for case in cases:
+                offsets.append(lines.tell())
+                lines.write(json.dumps(case, ensure_ascii=False).encode('utf-8') + b'\n')
+        with open(self.emb_path, 'ab') as emb:
+            emb.write(np.ascontiguousarray(embeddings, dtype=np.float32).tobytes())
+        with open(self.idx_path, 'ab') as idx:
+            idx.write(np.array(offsets, dtype=np.uint64).tobytes())
+
+    def refresh(self) -> int:
+        """Pick up cases appended since the last refresh and return how many there were"""
+        committed = self.disk_count()
+        if committed <= self.count:
+            return 0
+        start, self.count = self.count, committed
+        # Cases already in a table on disk, possibly written by another worker, need not be read to count them
+        if ShardLexicon.covered_on_disk(self.lex_path) > self.lexicon.doc_count:
+            table = ShardLexicon(self.lex_path, committed)
+            if table.covered > self.lexicon.doc_count:
+                self.lexicon = table
+        if self.hot:
+            self._load_embeddings(start, committed)
+        counted = self.lexicon.doc_count
+        first = start if self.hot else counted
+        for row, record in enumerate(self._read_records(first, committed), first):
+            if row >= counted:
+                self.lexicon.add(record.lexical_text())
+            if self.hot:
+                self._add_record(record)
+        return committed - start
+
+    def persist_lexicon(self):
+        """Write the lexicon to <name>.lex, or adopt a fuller table; the caller holds the store's file lock"""
+        self.lexicon = self.lexicon.persisted()
+        if self.lexicon.doc_count > self.count:
+            # The adopted table counts cases appended since the last refresh: read the rest of them
+            self.refresh()
+
+    def read_cases(self, rows: List[int]) -> List[Dict]:
+        """Read full compacted cases from disk"""
+        cases = []
+        with open(self.idx_path, 'rb') as idx, open(self.lines_path, 'rb') as lines:
+            for row in rows:
+                idx.seek(row * 8)
+                lines.seek(int(np.frombuffer(idx.read(8), dtype=np.uint64)[0]))
+                cases.append(json.loads(lines.readline()))
+        return cases
+
+    def _read_records(self, start: int, stop: int) -> List[CaseRecord]:
+        """Read the CaseRecords of rows [start, stop) in one sequential pass"""
+        if start >= stop:
+            return []
+        offset = np.fromfile(self.idx_path, dtype=np.uint64, count=1, offset=start * 8)[0]
+        with open(self.lines_path, 'rb') as lines:
+            lines.seek(int(offset))
+            return [CaseRecord.from_case(json.loads(lines.readline())) for _ in range(stop - start)]
+
+    def records_at(self, rows: List[int]) -> List[CaseRecord]:
+        """CaseRecords for rows, from memory when hot"""
+        records = self.records
+        if records is not None and all(row < len(records) for row in rows):
+            return [records[row] for row in rows]
+        return [CaseRecord.from_case(case) for case in self.read_cases(rows)]
+
+    def vectors(self) -> np.ndarray:
+        """Embedding matrix of the known cases: in memory when hot, memory-mapped when cold"""
+        embeddings = self.embeddings
+        if embeddings is not None:
+            return embeddings[:self.count]
+        if self.count == 0:
+            return np.empty((0, self.dim), dtype=np.float32)
+        if self._mmap is None or self._mmap.shape[0] != self.count:
+            self._mmap = np.memmap(self.emb_path, dtype=np.float32, mode='r', shape=(self.count, self.dim))
+        return self._mmap
+
+    def _load_embeddings(self, start: int, stop: int):
+        """Read embedding rows [start, stop) into the in-memory matrix"""
+        embeddings = np.fromfile(self.emb_path, dtype=np.float32, count=(stop - start) * self.dim,
+                                 offset=start * self.dim * 4).reshape(-1, self.dim)
+        if self.embeddings.shape[0] < stop:
+            # Grow geometrically instead of re-stacking on every new case
+            grown = np.empty((max(stop, start + start // 4, 64), self.dim), dtype=np.float32)
+            grown[:start] = self.embeddings[:start]
+            self.embeddings = grown
+        self.embeddings[start:stop] = embeddings
+
+    def _add_record(self, record: CaseRecord):
+        self.records.append(record)
+        self._records_bytes += record.memory_bytes()
+
+    def make_hot(self):
+        """Load the shard's embeddings and CaseRecords into memory"""
+        self.records = []
+        self._records_bytes = 0
+        self.embeddings = np.empty((self.count, self.dim), dtype=np.float32)
+        self._mmap = None
+        self._load_embeddings(0, self.count)
+        for record in self._read_records(0, self.count):
+            self._add_record(record)
+        self.hot = True
+
+    def make_cold(self):
+        """Drop the in-memory copy; lookups go through the memory map (the caller holds the file lock)"""
+        self.persist_lexicon()
+        self.hot = False
+        self.records = None
+        self.embeddings = None
+        self._records_bytes = 0
+
+    def memory_bytes(self) -> int:
+        """Memory held by the shard"""
+        if not self.hot:
+            return self.lexicon.memory_bytes()
+        return self.embeddings.nbytes + self._records_bytes + self.lexicon.memory_bytes()
+
+    def hot_estimate(self) -> int:
+        """Memory the shard's embeddings and CaseRecords take, or would take once loaded"""
+        if self.hot:
+            return self.embeddings.nbytes + self._records_bytes
+        return self.count * (self.dim * 4 + _RECORD_OVERHEAD + 200)
+
+
 class RAGStore:
-    def __init__(self, model_name: str = 'all-MiniLM-L6-v2'):
+    """Similar-case store sharded by time and bounded in memory.
+
+    Cases are appended to per-period shards under store_dir, shared by every
+    worker. The newest shards are kept in memory until memory_budget is
+    reached; older ones are memory-mapped and scanned blockwise, so lookups
+    still cover the full history while RSS stays bounded.
+    """
+
+    def __init__(self, model_name: str = 'all-MiniLM-L6-v2', store_dir: Optional[str] = RAG_STORE_DIR,
+                 argument_store: ArgumentStore = None, memory_budget: int = RAG_MEMORY_BUDGET_BYTES,
+                 shard_days: int = RAG_SHARD_DAYS, legacy_cache_file: Optional[str] = RAG_LEGACY_CACHE):
+        """
+        Args:
+            model_name: Sentence transformer used for embeddings
+            store_dir: Directory holding the shards, or None for a throwaway store removed with the object
+            argument_store: Where argument bodies are kept; defaults to the one shared with DebateDB
+            memory_budget: Bytes of shard data kept in memory; older shards beyond it are memory-mapped
+            shard_days: Period covered by one shard (fixed once the store exists)
+            legacy_cache_file: Pickle cache of earlier versions, migrated into the shards on first load
+        """
+        self.model_name = model_name
         self.encoder = SentenceTransformer(model_name)
-        self.cases = []
-        self.embeddings = None
-        self.cache_file = 'case_cache.pkl'
-        self.load_cache()
-        logger.info(f"RAGStore initialized with model: {model_name}")
-    
-    def load_cache(self):
-        """Load cached cases if available"""
-        if os.path.exists(self.cache_file):
-            with open(self.cache_file, 'rb') as f:
+        self.dim = self.encoder.get_sentence_embedding_dimension()
+        self.argument_store = argument_store or get_argument_store()
+        self.memory_budget = memory_budget
+        self.shard_days = shard_days
+        self.refresh_interval = 1.0
+
+        if store_dir is None:
+            store_dir = tempfile.mkdtemp(prefix="rag_store-")
+            weakref.finalize(self, shutil.rmtree, store_dir, True)
+            legacy_cache_file = None
+        self.store_dir = store_dir
+        os.makedirs(store_dir, exist_ok=True)
+
+        self.shards: Dict[str, Shard] = {}
+        self.lock = threading.Lock()
+        self._last_refresh = 0.0
+        self._open_manifest()
+        self._migrate_legacy(legacy_cache_file)
+        with self.lock:
+            self._refresh_locked()
+        logger.info(f"RAGStore initialized with model: {model_name}, {len(self)} cases in {len(self.shards)} shards")
+
+    def __len__(self) -> int:
+        return sum(shard.count for shard in self.shards.values())
+
+    @contextmanager
+    def _file_lock(self):
+        """Serialise appends across workers"""
+        with open(os.path.join(self.store_dir, '.lock'), 'a') as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _open_manifest(self):
+        """Create the manifest, or check the store was built with the same encoder"""
+        path = os.path.join(self.store_dir, 'manifest.json')
+        with self._file_lock():
+            if not os.path.exists(path):
+                self._write_manifest(path, {'model': self.model_name, 'dim': self.dim,
+                                            'shard_days': self.shard_days, 'embedded_text': _EMBEDDED_TEXT})
+                return
+            with open(path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest['model'] != self.model_name or manifest['dim'] != self.dim:
+                raise ValueError(f"{self.store_dir} holds {manifest['model']} embeddings, not {self.model_name}")
+            self.shard_days = manifest['shard_days']
+            if manifest.get('embedded_text') != _EMBEDDED_TEXT:
+                self._reembed()
+                self._write_manifest(path, {**manifest, 'embedded_text': _EMBEDDED_TEXT})
+
+    @staticmethod
+    def _write_manifest(path: str, manifest: Dict):
+        with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(f"{path}.tmp", path)
+
+    def _reembed(self, batch_size: int = 10000):
+        """Re-encode every stored case from its message; the caller holds the file lock"""
+        total = 0
+        for filename in sorted(os.listdir(self.store_dir)):
+            if not filename.endswith('.idx'):
+                continue
+            shard = Shard(self.store_dir, filename[:-4], self.dim)
+            count = shard.disk_count()
+            with open(f"{shard.emb_path}.tmp", 'wb') as f:
+                for start in range(0, count, batch_size):
+                    topics = [case.get('topic', '') for case in
+                              shard.read_cases(list(range(start, min(start + batch_size, count))))]
+                    f.write(_normalise(self.encoder.encode(topics, batch_size=64)).tobytes())
+            os.replace(f"{shard.emb_path}.tmp", shard.emb_path)
+            total += count
+        logger.info(f"Re-encoded {total} cases in {self.store_dir} from their messages")
+
+    def _migrate_legacy(self, path: Optional[str]):
+        """Move the cases of a pickle cache into the shards, once"""
+        if not path or not os.path.exists(path):
+            return
+        with self._file_lock():
+            # Another worker may have migrated it while we waited
+            if not os.path.exists(path):
+                return
+            with open(path, 'rb') as f:
                 cached_data = pickle.load(f)
-                self.cases = cached_data['cases']
-                self.embeddings = cached_data['embeddings']
-                logger.info(f"Loaded {len(self.cases)} cases from cache")
-        else:
-            logger.info("No cache file found, starting with empty store")
-    
-    def save_cache(self):
-        """Save cases to cache"""
-        with open(self.cache_file, 'wb') as f:
-            pickle.dump({
-                'cases': self.cases,
-                'embeddings': self.embeddings
-            }, f)
-        logger.info(f"Saved {len(self.cases)} cases to cache")
-    
+            cases = cached_data['cases']
+            if cases:
+                # The pickle's embeddings encode topic, verdict and evidence; re-encode the messages alone
+                embeddings = _normalise(self.encoder.encode([case['topic'] for case in cases], batch_size=64))
+                self._append([self._compact_case(case) for case in cases], embeddings)
+            os.replace(path, f"{path}.migrated")
+        logger.info(f"Migrated {len(cases)} cases from {path} into {self.store_dir}")
+
+    def _shard_name(self, timestamp: float) -> str:
+        period = self.shard_days * 86400
+        return time.strftime('%Y%m%d', time.gmtime(int(timestamp // period) * period))
+
+    def _append(self, cases: List[Dict], embeddings: np.ndarray):
+        """Write compacted cases to their shards; the caller holds the file lock"""
+        groups = {}
+        for i, case in enumerate(cases):
+            groups.setdefault(self._shard_name(case.get('timestamp', time.time())), []).append(i)
+        for name, rows in sorted(groups.items()):
+            Shard(self.store_dir, name, self.dim).append([cases[i] for i in rows], embeddings[rows])
+
+    def import_cases(self, cases: List[Dict], embeddings: np.ndarray):
+        """Store cases with precomputed embeddings"""
+        compacted = [self._compact_case(case) for case in cases]
+        embeddings = _normalise(np.asarray(embeddings).reshape(len(cases), -1))
+        with self.lock:
+            with self._file_lock():
+                self._append(compacted, embeddings)
+            self._refresh_locked()
+
     def add_case(self, case: Dict):
-        """Add a new case to the store"""
-        # Create case embedding
-        case_text = f"{case['topic']} {case['verdict']} {case['key_evidence']}"
-        case_embedding = self.encoder.encode([case_text])[0]
-        
-        # Initialize embeddings array if first case
-        if self.embeddings is None:
-            self.embeddings = case_embedding.reshape(1, -1)
-        else:
-            self.embeddings = np.vstack([self.embeddings, case_embedding.reshape(1, -1)])
-        
-        self.cases.append(case)
-        self.save_cache()
+        """Add a new case to the store
+
+        Only the message (topic) is embedded: lookups compare a bare message
+        against it, and scripts/calibrate_threshold.py measures thresholds on
+        that same message-to-message scale.
+        """
+        case_embedding = self.encoder.encode([case['topic']])[0]
+        self.import_cases([case], case_embedding.reshape(1, -1))
         logger.info(f"Added new case: {case['topic'][:100]}...")
-    
+
+    def refresh(self, force: bool = False):
+        """Pick up shards and cases written by other workers"""
+        if not force and time.monotonic() - self._last_refresh < self.refresh_interval:
+            return
+        with self.lock:
+            self._refresh_locked()
+
+    def _refresh_locked(self):
+        self._last_refresh = time.monotonic()
+        for filename in os.listdir(self.store_dir):
+            if filename.endswith('.idx') and filename[:-4] not in self.shards:
+                self.shards[filename[:-4]] = Shard(self.store_dir, filename[:-4], self.dim)
+        grown = [shard for shard in self.shards.values() if shard.refresh()]
+        # Cold shards keep their statistics on disk; the file lock stops workers from overwriting a
+        # fuller table with their own
+        unsaved = [shard for shard in grown if not shard.hot and shard.lexicon.delta.doc_count]
+        if unsaved:
+            with self._file_lock():
+                for shard in unsaved:
+                    shard.persist_lexicon()
+        if grown:
+            self._rebalance()
+
+    def _rebalance(self):
+        """Keep the newest shards that fit in the memory budget hot and memory-map the rest"""
+        # BM25 statistics counted in memory (cases added to hot shards since their table was written) come
+        # out of the budget first; cold shards read theirs from disk
+        used = sum(shard.lexicon.memory_bytes() for shard in self.shards.values())
+        full = False
+        for name in sorted(self.shards, reverse=True):
+            shard = self.shards[name]
+            if not full and used + shard.hot_estimate() <= self.memory_budget:
+                if not shard.hot:
+                    shard.make_hot()
+                    logger.info(f"Loaded shard {name} ({shard.count} cases) into memory")
+                used += shard.hot_estimate()
+            else:
+                full = True
+                if shard.hot:
+                    with self._file_lock():
+                        shard.make_cold()
+                    logger.info(f"Shard {name} ({shard.count} cases) is now memory-mapped")
+
+    def _scan(self, query_embedding: np.ndarray, min_similarity: float, limit: Optional[int],
+              block_size: int = 65536) -> List[tuple]:
+        """Return (similarity, shard, row) of the `limit` most similar cases at or above min_similarity"""
+        self.refresh()
+        with self.lock:
+            # Ties are broken by shard name and row, so the order does not depend on which shards are hot
+            shards = sorted(self.shards.values(), key=lambda shard: shard.name)
+            views = [shard.vectors() for shard in shards]
+
+        sims = np.empty(0, dtype=np.float32)
+        shard_ids = np.empty(0, dtype=np.int64)
+        rows = np.empty(0, dtype=np.int64)
+        for s, vectors in enumerate(views):
+            for start in range(0, len(vectors), block_size):
+                block = np.asarray(vectors[start:start + block_size] @ query_embedding)
+                found = np.flatnonzero(block >= min_similarity)
+                if len(found) == 0:
+                    continue
+                sims = np.concatenate([sims, block[found]])
+                shard_ids = np.concatenate([shard_ids, np.full(len(found), s)])
+                rows = np.concatenate([rows, found + start])
+                # Bound the candidates held while scanning a long history
+                if limit is not None and len(sims) > 4 * limit:
+                    keep = np.argpartition(-sims, limit - 1)[:limit]
+                    sims, shard_ids, rows = sims[keep], shard_ids[keep], rows[keep]
+
+        order = np.lexsort((rows, shard_ids, -sims))[:limit]
+        return [(float(sims[i]), shards[shard_ids[i]], int(rows[i])) for i in order]
+
+    def _hits_to_cases(self, hits: List[tuple]) -> List[Dict]:
+        """Compact case dicts for scan results, reading cold shards once per shard"""
+        by_shard = {}
+        for i, (_, shard, row) in enumerate(hits):
+            by_shard.setdefault(shard, []).append((i, row))
+        cases = [None] * len(hits)
+        for shard, items in by_shard.items():
+            for (i, row), record in zip(items, shard.records_at([row for _, row in items])):
+                case = record.to_case()
+                case['case_ref'] = (shard.name, row)
+                case['similarity'] = hits[i][0]
+                cases[i] = case
+        return cases
+
     def find_similar_cases(self, query: str, threshold: float = 0.8) -> List[Dict]:
         """Find similar cases based on semantic similarity"""
-        if not self.cases:
-            logger.info("No cases in store to compare against")
-            return []
-            
-        # Encode query
-        query_embedding = self.encoder.encode([query]).reshape(1, -1)
-        
-        # Calculate similarities
-        similarities = cosine_similarity(query_embedding, self.embeddings)[0]
-        
-        # Get cases above threshold
-        similar_cases = []
-        for idx, similarity in enumerate(similarities):
-            if similarity >= threshold:
-                case = self.cases[idx].copy()
-                case['similarity'] = float(similarity)
-                similar_cases.append(case)
-        
-        similar_cases = sorted(similar_cases, key=lambda x: x['similarity'], reverse=True)
+        query_embedding = _normalise(self.encoder.encode([query]))[0]
+        hits = self._scan(query_embedding, threshold, None)
+        similar_cases = [self.expand_case(case) for case in self._hits_to_cases(hits)]
         logger.info(f"Found {len(similar_cases)} similar cases for query: {query[:100]}...")
-        return similar_cases
\ No newline at end of file
+        return similar_cases
+
+    def search(self, query: str, min_similarity: float = 0.0, candidates: int = 50) -> List[Dict]:
+        """Hybrid retrieval: rank cases by fusing BM25 and embedding rankings
+
+        The `candidates` most similar cases (cosine) and the `candidates` best
+        BM25 matches are each taken from every shard, the latter from the
+        lexicons' postings, so exact lexical overlap (domains, phone numbers,
+        phrasing) finds a case however far down the embedding order it is.
+        Cases below `min_similarity` are left out of both rankings.
+        Returns compact copies (see expand_case) with 'similarity',
+        'lexical_score' and 'rank_score', best first.
+        """
+        query_embedding = _normalise(self.encoder.encode([query]))[0]
+        semantic = self._scan(query_embedding, min_similarity, candidates)
+        with self.lock:
+            shards = sorted(self.shards.values(), key=lambda shard: shard.name)
+            lexicons = [shard.lexicon for shard in shards]
+
+        lexical = []
+        for position, row, _ in bm25_top_k(query, lexicons, candidates):
+            shard = shards[position]
+            similarity = float(np.asarray(shard.vectors()[row]) @ query_embedding)
+            if similarity >= min_similarity:
+                lexical.append((similarity, shard, row))
+
+        # One pool entry per case found by either ranking
+        hits, positions = [], {}
+        for similarity, shard, row in semantic + lexical:
+            if (shard.name, row) not in positions:
+                positions[(shard.name, row)] = len(hits)
+                hits.append((similarity, shard, row))
+        if not hits:
+            return []
+        pool = self._hits_to_cases(hits)
+        by_similarity = list(range(len(semantic)))
+        by_lexical = [positions[(shard.name, row)] for _, shard, row in lexical]
+        fused = reciprocal_rank_fusion([by_similarity, by_lexical])
+
+        texts = [f"{case['topic']} {case['verdict']['summary']} {case['key_evidence']}" for case in pool]
+        lexical_scores = bm25_scores(query, texts, lexicons)
+        results = []
+        for idx, score in sorted(fused.items(), key=lambda item: item[1], reverse=True):
+            case = pool[idx]
+            case['lexical_score'] = float(lexical_scores[idx])
+            case['rank_score'] = score
+            results.append(case)
+        logger.info(f"Retrieved {len(results)} candidate cases for query: {query[:100]}...")
+        return results
+
+    def stats(self) -> Dict:
+        """Case, shard and memory counts for this worker"""
+        with self.lock:
+            return {
+                'cases': len(self),
+                'shards': len(self.shards),
+                'hot_shards': sum(shard.hot for shard in self.shards.values()),
+                'memory_bytes': sum(shard.memory_bytes() for shard in self.shards.values()),
+                'memory_budget': self.memory_budget
+            }
+
+    @staticmethod
+    def _needs_compaction(case: Dict) -> bool:
+        verdict = case.get('verdict')
+        return (isinstance(verdict, dict) and 'arguments' in verdict) or len(case.get('key_evidence', '')) > 512
+
+    def _compact_case(self, case: Dict) -> Dict:
+        """Move argument bodies and long evidence into the argument store, leaving references"""
+        case = case.copy()
+        verdict = case.get('verdict')
+        if isinstance(verdict, dict) and 'arguments' in verdict:
+            verdict = {k: v for k, v in verdict.items() if k != 'arguments'}
+            verdict['argument_refs'] = self.argument_store.compact_arguments(case['verdict']['arguments'])
+            case['verdict'] = verdict
+        if len(case.get('key_evidence', '')) > 512:
+            case['key_evidence_ref'] = self.argument_store.put(case['key_evidence'])
+            case['key_evidence'] = ''
+        return case
+
+    def expand_case(self, case: Dict) -> Dict:
+        """Return the full stored case with argument bodies read back from the argument store
+
+        Takes the compact copies returned by search and find_similar_cases, whose
+        full verdict is read back from the case's shard.
+        """
+        if 'case_ref' in case:
+            name, row = case['case_ref']
+            full = self.shards[name].read_cases([row])[0]
+            full.update({k: case[k] for k in ('similarity', 'lexical_score', 'rank_score') if k in case})
+            case = full
+        case = case.copy()
+        verdict = case.get('verdict')
+        if isinstance(verdict, dict) and 'argument_refs' in verdict:
+            verdict = {k: v for k, v in verdict.items() if k != 'argument_refs'}
+            verdict['arguments'] = self.argument_store.expand_arguments(case['verdict']['argument_refs'])
+            case['verdict'] = verdict
+        if 'key_evidence_ref' in case:
+            case['key_evidence'] = self.argument_store.get(case.pop('key_evidence_ref'))
+        return case
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_rag_store() -> RAGStore:
+    """Return the process-wide case store"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = RAGStore()
+    return _store
@@ -0,0 +1,167 @@
+import math
+import re
+from array import array
+from typing import Dict, List, Tuple
+import numpy as np
+from config import ROUNDS, NEAR_MISS_SIMILARITY, NEAR_MISS_ROUNDS
+
+# Keep domains, e-mail addresses and phone numbers as single terms: they are what repeats across scams
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.@'\-][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case word, domain and number terms of a text"""
+    return _TOKEN_PATTERN.findall((text or "").lower())
+
+
+class BM25Index:
+    """Okapi BM25 statistics and postings for one group of documents.
+
+    Documents are numbered in the order they are added. Besides document
+    frequencies and lengths, each term keeps the documents containing it and
+    their term counts, so bm25_top_k can find the best lexical matches among
+    all documents. RAGStore scores with the statistics of every shard; cold
+    shards keep theirs on disk (see rag_store.ShardLexicon), which exposes the
+    same doc_count, total_length, df(), postings() and lengths().
+    """
+
+    def __init__(self):
+        self.doc_freq: Dict[str, int] = {}
+        self.doc_count = 0
+        self.total_length = 0
+        # Per term: document numbers and term counts as compact typed arrays (6 bytes per posting)
+        self.term_postings: Dict[str, Tuple[array, array]] = {}
+        self.doc_lengths = array('I')
+
+    def __len__(self) -> int:
+        return self.doc_count
+
+    def add(self, text: str):
+        """Count a document"""
+        terms = tokenize(text)
+        counts = {}
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+        # The length goes first, so a concurrent reader never sees a posting without it
+        self.doc_lengths.append(len(terms))
+        for term, tf in counts.items():
+            self.doc_freq[term] = self.doc_freq.get(term, 0) + 1
+            docs, tfs = self.term_postings.setdefault(term, (array('I'), array('H')))
+            docs.append(self.doc_count)
+            tfs.append(min(tf, 65535))
+        self.doc_count += 1
+        self.total_length += len(terms)
+
+    def df(self, term: str) -> int:
+        """Number of documents containing `term`"""
+        return self.doc_freq.get(term, 0)
+
+    def postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Documents containing `term`, in order, and the term's count in each"""
+        entries = self.term_postings.get(term)
+        if entries is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        # Copies, so a concurrent add() can still grow the arrays
+        docs, tfs = np.array(entries[0], dtype=np.int64), np.array(entries[1], dtype=np.float32)
+        count = min(len(docs), len(tfs))
+        return docs[:count], tfs[:count]
+
+    def lengths(self, docs: np.ndarray) -> np.ndarray:
+        """Term counts of the given documents"""
+        return np.array(self.doc_lengths, dtype=np.float32)[docs]
+
+    def memory_bytes(self) -> int:
+        """Rough size of the vocabulary and postings in memory"""
+        return len(self.doc_freq) * 250 + sum(self.doc_freq.values()) * 6 + self.doc_count * 4
+
+
+def _idf(query: str, indexes: list, n: int) -> Dict[str, float]:
+    """BM25 idf of the query terms found in any of `indexes`"""
+    idf = {}
+    for term in set(tokenize(query)):
+        df = sum(index.df(term) for index in indexes)
+        if df:
+            idf[term] = math.log(1 + (n - df + 0.5) / (df + 0.5))
+    return idf
+
+
+def bm25_scores(query: str, texts: List[str], indexes: list, k1: float = 1.5,
+                b: float = 0.75) -> np.ndarray:
+    """BM25 score of each text for `query`, with idf and average length taken from `indexes`"""
+    scores = np.zeros(len(texts), dtype=np.float32)
+    n = sum(index.doc_count for index in indexes)
+    if n == 0 or not texts:
+        return scores
+    avg_length = max(sum(index.total_length for index in indexes) / n, 1e-9)
+    idf = _idf(query, indexes, n)
+    if not idf:
+        return scores
+
+    for i, text in enumerate(texts):
+        terms = tokenize(text)
+        counts = {}
+        for term in terms:
+            if term in idf:
+                counts[term] = counts.get(term, 0) + 1
+        norm = k1 * (1 - b + b * len(terms) / avg_length)
+        scores[i] = sum(idf[term] * tf * (k1 + 1) / (tf + norm) for term, tf in counts.items())
+    return scores
+
+
+def bm25_top_k(query: str, indexes: list, limit: int, k1: float = 1.5,
+               b: float = 0.75) -> List[Tuple[int, int, float]]:
+    """The `limit` best BM25 matches among every document of `indexes`, best first
+
+    Returns (position of the index in `indexes`, document number, score).
+    Candidates come from the postings of the query terms, so no document
+    text is read; scores equal bm25_scores on the same documents.
+    """
+    n = sum(index.doc_count for index in indexes)
+    if n == 0 or limit <= 0:
+        return []
+    avg_length = max(sum(index.total_length for index in indexes) / n, 1e-9)
+    idf = _idf(query, indexes, n)
+
+    results = []
+    for position, index in enumerate(indexes):
+        docs, weights = [], []
+        for term, term_idf in idf.items():
+            term_docs, tfs = index.postings(term)
+            if len(term_docs) == 0:
+                continue
+            norm = k1 * (1 - b + b * index.lengths(term_docs) / avg_length)
+            docs.append(term_docs)
+            weights.append(term_idf * tfs * (k1 + 1) / (tfs + norm))
+        if not docs:
+            continue
+        scores = np.bincount(np.concatenate(docs), weights=np.concatenate(weights))
+        found = np.flatnonzero(scores)
+        if len(found) > limit:
+            found = found[np.argpartition(-scores[found], limit - 1)[:limit]]
+        results.extend((position, int(doc), float(scores[doc])) for doc in found)
+    results.sort(key=lambda item: (-item[2], item[0], item[1]))
+    return results[:limit]
+
+
+def reciprocal_rank_fusion(rankings: List[np.ndarray], k: int = 60) -> Dict[int, float]:
+    """Fuse several rankings (arrays of candidate positions, best first) into one score per candidate"""
+    fused = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(np.asarray(ranking).tolist()):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return fused
+
+
+def debate_rounds(precedents: List[Dict], rounds: int = ROUNDS, near_miss_rounds: int = NEAR_MISS_ROUNDS) -> int:
+    """Rounds to debate a message given its retrieved precedents
+
+    A near-miss (best precedent at or above NEAR_MISS_SIMILARITY but below the
+    cache threshold) starts from the precedent's evidence and may need fewer
+    rounds, but only when every precedent reached the same verdict: conflicting
+    precedents leave the case open and get the full debate.
+    """
+    if not precedents or max(p['similarity'] for p in precedents) < NEAR_MISS_SIMILARITY:
+        return rounds
+    if len({p['verdict']['verdict'] for p in precedents}) > 1:
+        return rounds
+    return min(rounds, near_miss_rounds)
@@ -0,0 +1,101 @@
+"""Compare inline and compacted argument storage on a synthetic debate history.
+
+Builds a database in the pre-compaction layout (every argument body inline as
+TEXT), measures its size and the latency of DebateDB.get_all_debates (what
+GET /debates serves), then migrates it with compact_arguments and measures
+again. A share of opening arguments is repeated across debates, as happens
+when the same message is debated twice.
+
+Usage:
+    python -m scripts.bench_argument_store --debates 2000 --repeat-share 0.3
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from models.debate_db import DebateDB
+
+WORDS = ("scam verify account urgent prize bank transfer source evidence claim official report "
+         "analysis credible website domain fraud legitimate context expert consensus data study").split()
+
+
+def make_argument(rng: random.Random, words: int = 450) -> str:
+    """A 400-500 word argument with some of the box-drawing structure the lawyers produce"""
+    body = " ".join(rng.choice(WORDS) for _ in range(words))
+    return f"📋 EXECUTIVE SUMMARY\n-------------------\n{body}\n└─ Source: https://example.com/{rng.randrange(10 ** 6)}"
+
+
+def build_legacy_db(path: str, debates: int, repeat_share: float, seed: int = 7):
+    """Create a database with inline argument bodies (the layout before compaction)"""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.execute('''CREATE TABLE debates (id INTEGER PRIMARY KEY AUTOINCREMENT, message TEXT NOT NULL,
+                    verdict TEXT NOT NULL, summary TEXT, evidence TEXT, judge_statement TEXT, source TEXT,
+                    timestamp REAL NOT NULL, created_at DATETIME DEFAULT CURRENT_TIMESTAMP)''')
+    conn.execute('''CREATE TABLE arguments (id INTEGER PRIMARY KEY AUTOINCREMENT, debate_id INTEGER NOT NULL,
+                    round_number INTEGER NOT NULL, speaker TEXT NOT NULL, argument TEXT NOT NULL,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP)''')
+    openings = []
+    for i in range(debates):
+        cur = conn.execute('''INSERT INTO debates (message, verdict, summary, evidence, judge_statement, source, timestamp)
+                              VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                           (f"message {i}", rng.choice(["SCAM", "LEGITIMATE"]), "summary", '["evidence"]',
+                            "judge statement", "debate", time.time() - i))
+        if openings and rng.random() < repeat_share:
+            opening = rng.choice(openings)
+        else:
+            opening = (make_argument(rng), make_argument(rng))
+            openings.append(opening)
+        bodies = [opening[0], opening[1]] + [make_argument(rng) for _ in range(4)]
+        for n, body in enumerate(bodies):
+            conn.execute('INSERT INTO arguments (debate_id, round_number, speaker, argument) VALUES (?, ?, ?, ?)',
+                         (cur.lastrowid, n // 2 + 1, "Scam Analyst" if n % 2 == 0 else "Legitimacy Analyst", body))
+    conn.commit()
+    conn.close()
+
+
+def time_reads(db_path: str, limit: int, repeats: int) -> float:
+    """Median milliseconds for get_all_debates(limit) on a fresh connection (cold LRU)"""
+    samples = []
+    for _ in range(repeats):
+        db = DebateDB(db_path)
+        db.argument_store._cache.clear()
+        start = time.perf_counter()
+        db.get_all_debates(limit=limit)
+        samples.append((time.perf_counter() - start) * 1000)
+        db.close()
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark compacted argument storage")
+    parser.add_argument('--debates', type=int, default=2000)
+    parser.add_argument('--repeat-share', type=float, default=0.3, help="Share of debates reusing an opening")
+    parser.add_argument('--limit', type=int, default=100, help="Debates per GET /debates read")
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench_debates.db")
+        build_legacy_db(path, args.debates, args.repeat_share)
+        legacy_size = os.path.getsize(path)
+        legacy_ms = time_reads(path, args.limit, args.repeats)
+
+        db = DebateDB(path)
+        moved = db.compact_arguments()
+        db.conn.execute('VACUUM')
+        db.close()
+        compact_size = os.path.getsize(path)
+        compact_ms = time_reads(path, args.limit, args.repeats)
+
+    print(f"{args.debates} debates, {moved} arguments")
+    print(f"size:  inline {legacy_size / 1e6:.1f} MB  compacted {compact_size / 1e6:.1f} MB  "
+          f"({1 - compact_size / legacy_size:.0%} smaller)")
+    print(f"GET /debates?limit={args.limit}:  inline {legacy_ms:.1f} ms  compacted {compact_ms:.1f} ms (median, cold)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Measure how many debates one worker keeps in flight against a stub Gemini backend.
+
+Every stub call sleeps for --latency seconds, standing in for network time.
+The async path (run_debate_async on one event loop, as served by asgi.py)
+is compared with the sync path (run_debate) on a thread pool sized like a
+gunicorn worker (`threads = 4`). Similar-case lookups and stored cases use a
+real in-memory RAGStore on a small encode pool, as asgi.py does.
+
+Usage:
+    python -m scripts.bench_async_debates --debates 300 --latency 0.5
+    python -m scripts.bench_async_debates --debates 300 --sync-debates 16 --threads 4
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+
+class InFlight:
+    """Counts concurrent stub calls and remembers the peak"""
+
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> int:
+        with self._lock:
+            self.current += 1
+            self.calls += 1
+            self.peak = max(self.peak, self.current)
+            return self.calls
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.current -= 1
+
+
+def stub_response(text: str):
+    return SimpleNamespace(text=text, usage_metadata=SimpleNamespace(
+        prompt_token_count=1000, cached_content_token_count=0, candidates_token_count=len(text.split())
+    ))
+
+
+class StubLawyerClient:
+    """Stand-in for google.genai.Client with both the sync and the `aio` surface"""
+
+    def __init__(self, latency: float, in_flight: InFlight):
+        self.latency = latency
+        self.in_flight = in_flight
+        self.models = SimpleNamespace(generate_content=self._generate_content)
+        self.aio = SimpleNamespace(models=SimpleNamespace(generate_content=self._generate_content_async))
+
+    def _generate_content(self, model: str, contents: str, config):
+        # Number each argument so the transcript shows distinct rounds
+        with self.in_flight as call:
+            time.sleep(self.latency)
+        return stub_response(f"Stub argument #{call} on {contents[:60]}")
+
+    async def _generate_content_async(self, model: str, contents: str, config):
+        # Number each argument so the transcript shows distinct rounds
+        with self.in_flight as call:
+            await asyncio.sleep(self.latency)
+        return stub_response(f"Stub argument #{call} on {contents[:60]}")
+
+
+class StubJudgeModel:
+    """Stand-in for RetryGenerativeModel"""
+
+    def __init__(self, latency: float, in_flight: InFlight):
+        self.latency = latency
+        self.in_flight = in_flight
+
+    def generate_content(self, prompt: str, **kwargs):
+        with self.in_flight:
+            time.sleep(self.latency)
+        return stub_response("Verdict: SCAM\nStub summary.\nStub evidence.")
+
+    async def generate_content_async(self, prompt: str, **kwargs):
+        with self.in_flight:
+            await asyncio.sleep(self.latency)
+        return stub_response("Verdict: SCAM\nStub summary.\nStub evidence.")
+
+
+def make_components(latency: float):
+    """Build lawyers, judge model and RAGStore around fresh stubs"""
+    import models.ai_lawyer as ai_lawyer
+    from models.rag_store import RAGStore
+
+    in_flight = InFlight()
+    client = StubLawyerClient(latency, in_flight)
+    prosecutor = ai_lawyer.AILawyer("Scam Analyst", "stub-key-1", "prosecutor", client=client)
+    defender = ai_lawyer.AILawyer("Legitimacy Analyst", "stub-key-2", "defender", client=client)
+    return prosecutor, defender, StubJudgeModel(latency, in_flight), RAGStore(store_dir=None), in_flight
+
+
+def bench_async(debates: int, rounds: int, latency: float, encode_threads: int) -> dict:
+    """Run `debates` debates concurrently on one event loop"""
+    from models.debate import run_debate_async
+    from models.judge import Judge
+
+    prosecutor, defender, model, rag_store, in_flight = make_components(latency)
+    encode_executor = ThreadPoolExecutor(max_workers=encode_threads, thread_name_prefix="encode")
+
+    async def one(i: int):
+        judge = Judge(model, rag_store=rag_store)
+        message = f"Async bench message {i}: claim your prize {i * 7919} now"
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(encode_executor, judge.check_similar_case, message)
+        return await run_debate_async(message, judge, prosecutor, defender, rounds, executor=encode_executor)
+
+    async def run_all():
+        return await asyncio.gather(*(one(i) for i in range(debates)))
+
+    start = time.perf_counter()
+    results = asyncio.run(run_all())
+    elapsed = time.perf_counter() - start
+    encode_executor.shutdown()
+    return {'debates': len(results), 'elapsed': elapsed, 'peak': in_flight.peak, 'calls': in_flight.calls}
+
+
+def bench_sync(debates: int, rounds: int, latency: float, threads: int) -> dict:
+    """Run `debates` debates through run_debate on a gunicorn-sized thread pool"""
+    from models.debate import run_debate
+    from models.judge import Judge
+
+    prosecutor, defender, model, rag_store, in_flight = make_components(latency)
+
+    def one(i: int):
+        judge = Judge(model, rag_store=rag_store)
+        message = f"Sync bench message {i}: claim your prize {i * 7919} now"
+        judge.check_similar_case(message)
+        return run_debate(message, judge, prosecutor, defender, rounds)
+
+    start = time.perf_counter()
+    # run_debate prints every argument
+    with ThreadPoolExecutor(max_workers=threads) as pool, contextlib.redirect_stdout(io.StringIO()):
+        results = list(pool.map(one, range(debates)))
+    elapsed = time.perf_counter() - start
+    return {'debates': len(results), 'elapsed': elapsed, 'peak': in_flight.peak, 'calls': in_flight.calls}
+
+
+def report(label: str, result: dict, calls_per_debate: int, latency: float):
+    ideal = calls_per_debate * latency
+    print(f"{label:6s} {result['debates']:4d} debates in {result['elapsed']:7.2f}s  "
+          f"{result['debates'] / result['elapsed']:7.1f} debates/s  "
+          f"peak in-flight Gemini calls {result['peak']:4d}  "
+          f"(one debate alone: {ideal:.2f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare async and thread-bound debate concurrency")
+    parser.add_argument('--debates', type=int, default=300, help="Concurrent debates on the async path")
+    parser.add_argument('--sync-debates', type=int, default=16, help="Debates on the sync path (0 to skip)")
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.5, help="Seconds each stub Gemini call takes")
+    parser.add_argument('--threads', type=int, default=4, help="Sync worker threads (gunicorn `threads`)")
+    parser.add_argument('--encode-threads', type=int, default=4)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, force=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep benchmark state out of the app's databases and logs
+        os.environ['SEARCH_CACHE_DB'] = os.path.join(tmp, "bench_search_cache.db")
+        os.environ['DEBATES_DB'] = os.path.join(tmp, "bench_debates.db")
+        os.environ['LOG_DIR'] = os.path.join(tmp, "logs")
+        calls_per_debate = 2 * args.rounds + 1
+
+        result = bench_async(args.debates, args.rounds, args.latency, args.encode_threads)
+        report("async", result, calls_per_debate, args.latency)
+        if args.sync_debates:
+            result = bench_sync(args.sync_debates, args.rounds, args.latency, args.threads)
+            report("sync", result, calls_per_debate, args.latency)
+
+        from utils.log_sink import get_log_sink
+        get_log_sink().close()
+
+
+if __name__ == "__main__":
+    main()
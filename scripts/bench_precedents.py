@@ -0,0 +1,212 @@
+"""Measure rounds and input tokens per debate with and without precedent retrieval.
+
+A synthetic history of message campaigns (the same scam or legitimate
+notice with varying details) is stored in an in-memory RAGStore, then new
+messages from the same campaigns plus unrelated ones are replayed through
+Judge.check_similar_case and run_debate against stub Gemini backends that
+count input tokens. Baseline runs with PRECEDENT_TOP_K = 0.
+
+Also reports how often the injected precedents come from the query's own
+campaign under the hybrid (BM25 + embedding) order versus embedding order alone.
+
+Usage:
+    python -m scripts.bench_precedents --history 200 --queries 100
+    python -m scripts.bench_precedents --rounds 3 --novel-share 0.3
+    python -m scripts.bench_precedents --near-miss-rounds 1
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import random
+import tempfile
+from types import SimpleNamespace
+from scripts.bench_prompt_tokens import StubGeminiClient, count_tokens
+
+CAMPAIGNS = [
+    ("SCAM", "Your {carrier} parcel is on hold at our depot. Pay the {fee} redelivery fee at "
+             "parcel-redeliver-now.com within {hours} hours or it will be returned."),
+    ("SCAM", "Congratulations {name}! You were selected for a remote data entry job paying {pay} per week. "
+             "Buy your starter kit via giftcards to hr-onboard-team@outlook.com to begin."),
+    ("SCAM", "{bank} security alert: unusual sign-in from {city}. Verify your account at "
+             "{bank_lower}-verify-login.net or call +1-888-555-0199 to avoid suspension."),
+    ("SCAM", "Hi {name}, this is your grandson, I lost my phone and I'm stuck in {city}. "
+             "Please send {fee} by Western Union, don't tell mom."),
+    ("SCAM", "You have an unclaimed tax refund of {pay}. Submit your card details at irs-refund-portal.org "
+             "before {weekday} to receive it."),
+    ("LEGITIMATE", "{bank}: your statement for {month} is ready. Sign in through the {bank} app to view it. "
+                   "We will never ask for your password by text."),
+    ("LEGITIMATE", "Reminder from {clinic}: your appointment is on {weekday} at {hours}:00. "
+                   "Reply C to confirm or call the number on our website to reschedule."),
+    ("LEGITIMATE", "Your {carrier} order has shipped and should arrive {weekday}. Track it in your "
+                   "{carrier} account; no payment is required."),
+]
+SLOTS = {
+    'carrier': ["DHL", "FedEx", "UPS", "USPS", "Royal Mail"],
+    'fee': ["$1.99", "$2.50", "$3.00", "$500", "$1,200"],
+    'hours': ["12", "24", "48", "9", "15"],
+    'name': ["Alex", "Sam", "Jordan", "Taylor", "Priya"],
+    'pay': ["$650", "$800", "$1,200", "$2,450"],
+    'bank': ["Chase", "Barclays", "Wells Fargo", "HSBC"],
+    'city': ["Lagos", "Madrid", "Toronto", "Bangkok"],
+    'weekday': ["Monday", "Tuesday", "Friday", "Saturday"],
+    'month': ["March", "April", "October"],
+    'clinic': ["Riverside Dental", "City Eye Clinic", "Northside Family Practice"],
+}
+NOVEL = [
+    "The city council votes next week on extending library opening hours to Sundays.",
+    "A study claims drinking coffee after 4pm halves your life expectancy.",
+    "Breaking: scientists confirm the moon will turn red permanently next month.",
+    "Our team offsite has moved to the third floor conference room, lunch provided.",
+    "New law requires all drivers to renew licences online by Friday or pay a fine.",
+]
+
+
+def campaign_message(rng: random.Random, template: str) -> str:
+    values = {slot: rng.choice(options) for slot, options in SLOTS.items()}
+    values['bank_lower'] = values['bank'].lower().replace(" ", "")
+    return template.format(**values)
+
+
+def build_corpus(history: int, queries: int, novel_share: float, seed: int):
+    """Return (history cases, queries); each query is (message, campaign index or -1)"""
+    rng = random.Random(seed)
+    cases = []
+    for i in range(history):
+        campaign = i % len(CAMPAIGNS)
+        verdict, template = CAMPAIGNS[campaign]
+        cases.append((campaign, {
+            'topic': campaign_message(rng, template),
+            'verdict': {'verdict': verdict, 'summary': f"Matches campaign {campaign} ({verdict.lower()}).",
+                        'evidence': [f"Campaign {campaign} indicator"]},
+            'key_evidence': f"Campaign {campaign} indicator"
+        }))
+    replay = []
+    for i in range(queries):
+        if rng.random() < novel_share:
+            replay.append((f"{rng.choice(NOVEL)} (ref {i})", -1))
+        else:
+            campaign = rng.randrange(len(CAMPAIGNS))
+            replay.append((campaign_message(rng, CAMPAIGNS[campaign][1]), campaign))
+    return cases, replay
+
+
+class StubJudgeModel:
+    """Stand-in for RetryGenerativeModel that reports prompt tokens"""
+
+    def generate_content(self, prompt: str, **kwargs):
+        text = "Verdict: SCAM\nStub summary.\nStub evidence."
+        return SimpleNamespace(text=text, usage_metadata=SimpleNamespace(
+            prompt_token_count=count_tokens(prompt), cached_content_token_count=0,
+            candidates_token_count=count_tokens(text)
+        ))
+
+
+def replay(rag_store, queries, rounds: int, top_k: int, near_miss_rounds: int) -> dict:
+    """Replay the queries with PRECEDENT_TOP_K = top_k and return per-debate averages"""
+    import models.ai_lawyer as ai_lawyer
+    import models.judge as judge_module
+    from models.debate import run_debate
+    from models.retrieval import debate_rounds
+    from utils.token_meter import token_meter
+
+    judge_module.PRECEDENT_TOP_K = top_k
+    token_meter.reset()
+    client = StubGeminiClient()
+    prosecutor = ai_lawyer.AILawyer("Scam Analyst", "stub-key-1", "prosecutor", client=client)
+    defender = ai_lawyer.AILawyer("Legitimacy Analyst", "stub-key-2", "defender", client=client)
+    model = StubJudgeModel()
+
+    hits = 0
+    for message, _ in queries:
+        judge = judge_module.Judge(model, rag_store=rag_store)
+        has_similar, _ = judge.check_similar_case(message)
+        if has_similar:
+            hits += 1
+            continue
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_debate(message, judge, prosecutor, defender,
+                       rounds=debate_rounds(judge.precedents, rounds, near_miss_rounds), precedents=judge.precedents)
+        judge.debate_history = []
+
+    debates = token_meter.debate_stats()
+    tokens = token_meter.stats()
+    count = max(debates['count'], 1)
+    lawyer = sum(t['prompt_token_count'] for c, t in tokens.items() if c.startswith('lawyer:'))
+    judge_tokens = tokens.get('judge', {}).get('prompt_token_count', 0)
+    return {
+        'hits': hits,
+        'debates': debates['count'],
+        'with_precedents': debates['with_precedents'],
+        'rounds_per_debate': debates['rounds_per_debate'],
+        'lawyer_tokens_per_debate': lawyer / count,
+        'judge_tokens_per_debate': judge_tokens / count,
+        'tokens_per_debate': (lawyer + judge_tokens) / count,
+        'tokens_per_message': (lawyer + judge_tokens) / max(len(queries), 1)
+    }
+
+
+def campaign_precision(rag_store, queries, topics: dict, top_k: int, min_similarity: float) -> tuple:
+    """Share of top-k precedents from the query's own campaign: (hybrid order, embedding order)"""
+    hybrid = semantic = total = 0
+    for message, campaign in queries:
+        if campaign < 0:
+            continue
+        candidates = rag_store.search(message, min_similarity=min_similarity)
+        by_similarity = sorted(candidates, key=lambda case: case['similarity'], reverse=True)
+        hybrid += sum(topics[case['topic']] == campaign for case in candidates[:top_k])
+        semantic += sum(topics[case['topic']] == campaign for case in by_similarity[:top_k])
+        total += min(top_k, len(candidates))
+    return hybrid / max(total, 1), semantic / max(total, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare debates with and without precedent retrieval")
+    parser.add_argument('--history', type=int, default=200, help="Stored cases before the replay")
+    parser.add_argument('--queries', type=int, default=100, help="Messages replayed")
+    parser.add_argument('--novel-share', type=float, default=0.3, help="Share of queries from no campaign")
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--top-k', type=int, default=3)
+    parser.add_argument('--near-miss-rounds', type=int, default=None,
+                        help="Rounds for near-misses whose precedents agree (default NEAR_MISS_ROUNDS)")
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, force=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep benchmark state out of the app's databases, caches and logs
+        os.environ['SEARCH_CACHE_DB'] = os.path.join(tmp, "bench_search_cache.db")
+        os.environ['DEBATES_DB'] = os.path.join(tmp, "bench_debates.db")
+        os.environ['LOG_DIR'] = os.path.join(tmp, "logs")
+        from config import PRECEDENT_MIN_SIMILARITY, NEAR_MISS_ROUNDS
+        near_miss_rounds = NEAR_MISS_ROUNDS if args.near_miss_rounds is None else args.near_miss_rounds
+        from models.rag_store import RAGStore
+
+        cases, queries = build_corpus(args.history, args.queries, args.novel_share, args.seed)
+        topics = {case['topic']: campaign for campaign, case in cases}
+
+        def seeded_store():
+            store = RAGStore(store_dir=None)
+            for _, case in cases:
+                store.add_case(case)
+            return store
+
+        for label, top_k in (("baseline", 0), ("hybrid", args.top_k)):
+            # Debated messages are stored as they are judged, so each mode starts from the same history
+            result = replay(seeded_store(), queries, args.rounds, top_k, near_miss_rounds)
+            print(f"{label:8s} cache hits {result['hits']:3d}  debates {result['debates']:3d} "
+                  f"({result['with_precedents']} with precedents)  rounds/debate {result['rounds_per_debate']:.2f}  "
+                  f"input tokens/debate {result['tokens_per_debate']:7.0f} "
+                  f"(lawyers {result['lawyer_tokens_per_debate']:.0f}, judge {result['judge_tokens_per_debate']:.0f})  "
+                  f"tokens/message {result['tokens_per_message']:7.0f}")
+
+        hybrid, semantic = campaign_precision(seeded_store(), queries, topics, args.top_k, PRECEDENT_MIN_SIMILARITY)
+        print(f"precedents from the query's campaign: hybrid {hybrid:.1%}, embedding only {semantic:.1%}")
+
+        from utils.log_sink import get_log_sink
+        get_log_sink().close()
+
+
+if __name__ == "__main__":
+    main()
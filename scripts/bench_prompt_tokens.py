@@ -0,0 +1,78 @@
+"""Count input tokens per lawyer call against a local stub Gemini backend.
+
+The stub mimics `client.models.generate_content`, counting tokens of the
+system instruction and the per-call contents, so the size of the static
+prefix and of each request can be measured without API keys.
+
+Usage:
+    python -m scripts.bench_prompt_tokens --debates 5 --rounds 3
+"""
+import argparse
+import os
+import re
+import tempfile
+from types import SimpleNamespace
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text: str) -> int:
+    """Rough token count: words plus individual symbols"""
+    return len(_TOKEN_PATTERN.findall(text or ""))
+
+
+class StubGeminiClient:
+    """Minimal stand-in for google.genai.Client"""
+
+    def __init__(self):
+        self.calls = 0
+        self.models = SimpleNamespace(generate_content=self._generate_content)
+
+    def _generate_content(self, model: str, contents: str, config):
+        self.calls += 1
+        text = f"Stub argument #{self.calls} about {contents[:40]}"
+        return SimpleNamespace(text=text, usage_metadata=SimpleNamespace(
+            prompt_token_count=count_tokens(config.system_instruction) + count_tokens(contents),
+            cached_content_token_count=0,
+            candidates_token_count=count_tokens(text)
+        ))
+
+
+def run_debates(client, debates: int, rounds: int):
+    """Run stub debates and return the lawyers' token totals"""
+    import models.ai_lawyer as ai_lawyer
+    from utils.token_meter import token_meter
+
+    token_meter.reset()
+    prosecutor = ai_lawyer.AILawyer("Scam Analyst", "stub-key-1", "prosecutor", client=client)
+    defender = ai_lawyer.AILawyer("Legitimacy Analyst", "stub-key-2", "defender", client=client)
+    for d in range(debates):
+        message = f"Bench message {d}: claim your prize now"
+        previous = None
+        for _ in range(rounds):
+            argument = prosecutor.make_argument(message, previous)
+            previous = defender.make_argument(message, argument)
+    return token_meter.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count lawyer input tokens against a stub backend")
+    parser.add_argument('--debates', type=int, default=5)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep benchmark state out of the app's search cache
+        os.environ['SEARCH_CACHE_DB'] = os.path.join(tmp, "bench_search_cache.db")
+        stats = run_debates(StubGeminiClient(), args.debates, args.rounds)
+        for component, totals in sorted(stats.items()):
+            print(f"{component:18s} calls {totals['calls']:3d}  input/call {totals['input_tokens_per_call']:7.1f}")
+
+    from models.prompts import direct_verdict_prompt, lawyer_system_instruction
+    for role, name in (("prosecutor", "Scam Analyst"), ("defender", "Legitimacy Analyst")):
+        print(f"{role} static prefix: {count_tokens(lawyer_system_instruction(role, name))} tokens")
+    print(f"judge direct-verdict prompt: {count_tokens(direct_verdict_prompt('x'))} tokens of static text")
+
+
+if __name__ == "__main__":
+    main()
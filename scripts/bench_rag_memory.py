@@ -0,0 +1,127 @@
+"""Measure RAGStore memory and lookup latency across memory budgets.
+
+A synthetic case history spread over --months is imported into a store
+directory once (random unit embeddings, so no encoder time is spent), then
+each budget opens the same directory in a fresh process and reports resident
+anonymous memory, hot/cold shards and search latency. Top results must be
+identical across budgets: cold shards are still searched, only from disk.
+
+Usage:
+    python -m scripts.bench_rag_memory --cases 200000 --months 24
+    python -m scripts.bench_rag_memory --budgets 0,64,1024 --queries 50
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+WORDS = ("parcel redelivery fee bank verify account refund tax prize job giftcard invoice appointment "
+         "order shipped statement password urgent suspended wire transfer crypto wallet lottery").split()
+
+
+def rss_anon_bytes() -> int:
+    """Resident anonymous memory of this process (Linux); memory-mapped shard pages are not counted"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('RssAnon:'):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def build_store(store_dir: str, cases: int, months: int, seed: int, batch: int = 20000):
+    """Import `cases` synthetic cases with timestamps spread over the last `months` months"""
+    from models.rag_store import RAGStore
+
+    rng = random.Random(seed)
+    vectors = np.random.default_rng(seed)
+    store = RAGStore(store_dir=store_dir, memory_budget=0, legacy_cache_file=None)
+    now = time.time()
+    for start in range(0, cases, batch):
+        count = min(batch, cases - start)
+        chunk = []
+        for i in range(start, start + count):
+            words = " ".join(rng.choice(WORDS) for _ in range(12))
+            chunk.append({
+                'topic': f"Case {i}: {words}",
+                'verdict': {'verdict': rng.choice(("SCAM", "LEGITIMATE")), 'summary': f"Synthetic case {i}."},
+                'key_evidence': words[:80],
+                'timestamp': now - rng.random() * months * 30 * 86400
+            })
+        store.import_cases(chunk, vectors.standard_normal((count, store.dim), dtype=np.float32))
+
+
+def measure(store_dir: str, budget_mb: int, queries: int, seed: int) -> dict:
+    """Open the store with `budget_mb` and time searches (runs in its own process)"""
+    from models.rag_store import RAGStore
+
+    baseline = rss_anon_bytes()
+    start = time.perf_counter()
+    store = RAGStore(store_dir=store_dir, memory_budget=budget_mb * 1024 * 1024, legacy_cache_file=None)
+    load = time.perf_counter() - start
+    rng = random.Random(seed)
+    latencies, tops = [], []
+    for i in range(queries):
+        query = f"Case {rng.randrange(len(store))}: " + " ".join(rng.choice(WORDS) for _ in range(12))
+        start = time.perf_counter()
+        results = store.search(query)
+        latencies.append(time.perf_counter() - start)
+        tops.append(results[0]['topic'] if results else None)
+    stats = store.stats()
+    return {
+        'budget_mb': budget_mb,
+        'rss_mb': (rss_anon_bytes() - baseline) / 2 ** 20,
+        'hot_shards': stats['hot_shards'],
+        'shards': stats['shards'],
+        'cases': stats['cases'],
+        'load_s': load,
+        'p50_ms': float(np.percentile(latencies, 50)) * 1000,
+        'p95_ms': float(np.percentile(latencies, 95)) * 1000,
+        'tops': tops
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare RAGStore memory budgets")
+    parser.add_argument('--cases', type=int, default=200000)
+    parser.add_argument('--months', type=int, default=24, help="History span the cases are spread over")
+    parser.add_argument('--budgets', default="0,64,256,4096", help="Comma-separated budgets in MB")
+    parser.add_argument('--queries', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--measure', nargs=2, metavar=('STORE_DIR', 'BUDGET_MB'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, force=True)
+
+    if args.measure:
+        print(json.dumps(measure(args.measure[0], int(args.measure[1]), args.queries, args.seed)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep benchmark state out of the app's argument store
+        os.environ['DEBATES_DB'] = os.path.join(tmp, "bench_debates.db")
+        store_dir = os.path.join(tmp, "case_store")
+        start = time.perf_counter()
+        build_store(store_dir, args.cases, args.months, args.seed)
+        print(f"imported {args.cases} cases over {args.months} months in {time.perf_counter() - start:.1f}s")
+
+        reference = None
+        for budget in (int(b) for b in args.budgets.split(',')):
+            # A fresh process per budget, so RSS is not inflated by the previous one
+            output = subprocess.run([sys.executable, '-m', 'scripts.bench_rag_memory', '--queries',
+                                     str(args.queries), '--seed', str(args.seed), '--measure', store_dir,
+                                     str(budget)], env=os.environ, capture_output=True, text=True, check=True)
+            result = json.loads(output.stdout.strip().splitlines()[-1])
+            reference = reference or result['tops']
+            print(f"budget {budget:5d} MB  RSS +{result['rss_mb']:7.1f} MB  "
+                  f"hot shards {result['hot_shards']:3d}/{result['shards']}  load {result['load_s']:5.1f}s  "
+                  f"search p50 {result['p50_ms']:6.1f} ms  p95 {result['p95_ms']:6.1f} ms  "
+                  f"same top results: {result['tops'] == reference}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Measure the per-request overhead of the shared SQLite rate limiter.
+
+Runs hits from several threads and processes against a throwaway database and
+reports latency percentiles per hit, mirroring a gunicorn deployment of
+`workers` processes with `threads` threads each.
+
+Usage:
+    python -m scripts.bench_rate_limit --workers 4 --threads 4 --hits 500
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import tempfile
+import threading
+import time
+from utils.rate_limit import SQLiteRateLimiter
+from config import DEFAULT_LIMITS
+
+
+def run_worker(db_path: str, threads: int, hits: int, keys: int, results):
+    """Hit the limiter from `threads` threads and push latencies to `results`"""
+    limiter = SQLiteRateLimiter(db_path=db_path)
+    latencies = []
+    lock = threading.Lock()
+
+    def run_thread(thread_id: int):
+        local = []
+        for i in range(hits):
+            key = f"bench:{(thread_id * hits + i) % keys}"
+            start = time.perf_counter()
+            limiter.hit(key, DEFAULT_LIMITS)
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    pool = [threading.Thread(target=run_thread, args=(t,)) for t in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    results.put(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the shared rate limiter")
+    parser.add_argument('--workers', type=int, default=4, help="Processes (gunicorn workers)")
+    parser.add_argument('--threads', type=int, default=4, help="Threads per process")
+    parser.add_argument('--hits', type=int, default=500, help="Hits per thread")
+    parser.add_argument('--keys', type=int, default=1000, help="Distinct client keys")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench_rate_limits.db")
+        SQLiteRateLimiter(db_path=db_path)
+
+        results = multiprocessing.Queue()
+        start = time.perf_counter()
+        procs = [multiprocessing.Process(target=run_worker, args=(db_path, args.threads, args.hits, args.keys, results))
+                 for _ in range(args.workers)]
+        for p in procs:
+            p.start()
+        latencies = []
+        for _ in procs:
+            latencies.extend(results.get())
+        for p in procs:
+            p.join()
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    ms = [l * 1000 for l in latencies]
+    print(f"{len(ms)} hits from {args.workers} workers x {args.threads} threads in {elapsed:.2f}s "
+          f"({len(ms) / elapsed:.0f} hits/s)")
+    print(f"mean {statistics.mean(ms):.3f} ms  p50 {ms[len(ms) // 2]:.3f} ms  "
+          f"p95 {ms[int(len(ms) * 0.95)]:.3f} ms  p99 {ms[int(len(ms) * 0.99)]:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Exercise the search cache against the local stub search server.
+
+Replays a workload of repeated queries (as happens across debate rounds and
+repeated messages) and reports the cache hit rate, upstream requests and
+latency with and without the cache.
+
+Usage:
+    python -m scripts.bench_search_cache --queries 200 --distinct 20 --delay 0.05
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the search cache with a stub backend")
+    parser.add_argument('--queries', type=int, default=200, help="Total searches to run")
+    parser.add_argument('--distinct', type=int, default=20, help="Distinct queries in the workload")
+    parser.add_argument('--delay', type=float, default=0.05, help="Stub server latency in seconds")
+    args = parser.parse_args()
+
+    from scripts.stub_search_server import start_stub_server
+    server = start_stub_server(delay=args.delay)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Point the search client and cache at the stub before they are imported
+        os.environ['GOOGLE_SEARCH_API'] = f"http://127.0.0.1:{server.server_address[1]}/customsearch/v1"
+        os.environ['SEARCH_CACHE_DB'] = os.path.join(tmp, "bench_search_cache.db")
+        from utils.web_search import perform_web_search
+        from utils.search_cache import get_search_cache
+
+        rng = random.Random(42)
+        workload = [f"is this message a scam {rng.randrange(args.distinct)}" for _ in range(args.queries)]
+
+        start = time.perf_counter()
+        for query in workload:
+            perform_web_search(query)
+        cached_elapsed = time.perf_counter() - start
+        stats = get_search_cache().stats()
+
+    upstream = server.request_count
+    uncached_estimate = args.queries * args.delay
+    print(f"{args.queries} searches, {args.distinct} distinct queries")
+    print(f"upstream requests: {upstream}  hit rate: {stats['web']['hit_rate']:.1%}")
+    print(f"elapsed with cache: {cached_elapsed:.2f}s  (uncached would be >= {uncached_estimate:.2f}s)")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""Calibrate the similar-case threshold used by Judge.check_similar_case.
+
+Replays the single-message debates in debates.db (those RAGStore indexes,
+not thread steps) in id order as if each message had been looked up against
+the cases stored before it. Messages are encoded as RAGStore.add_case
+encodes a stored case (the message alone) and as a lookup encodes its
+query, so similarities are on the scale Judge compares against. For every
+message the best earlier match is found with blockwise matrix products over
+normalised embeddings, then hit rate (share of messages served from cache)
+and verdict agreement (share of hits whose reused verdict matches the
+message's own) are computed for a grid of thresholds.
+
+A threshold is recommended per reused verdict: the lowest one whose agreement
+reaches --target-agreement. Judge picks the file up at runtime.
+
+Embeddings are kept in an .npz next to the output so reruns only encode the
+debates added since the last calibration.
+
+Usage:
+    python -m scripts.calibrate_threshold --target-agreement 0.95
+    python -m scripts.calibrate_threshold --plot calibration.png --csv calibration.csv
+"""
+import argparse
+import csv
+import json
+import os
+import time
+import numpy as np
+from config import SIMILARITY_THRESHOLD, SIMILARITY_THRESHOLDS_FILE
+from models.debate_db import DebateDB
+
+
+def load_embeddings(rows: list, cache_path: str, model_name: str) -> np.ndarray:
+    """Return normalised embeddings for `rows`, encoding only ids missing from the cache"""
+    cached = {}
+    if os.path.exists(cache_path):
+        data = np.load(cache_path, allow_pickle=False)
+        if str(data['model']) == model_name:
+            cached = dict(zip(data['ids'].tolist(), data['embeddings']))
+
+    missing = [row for row in rows if row['id'] not in cached]
+    if missing:
+        from sentence_transformers import SentenceTransformer
+        encoder = SentenceTransformer(model_name)
+        print(f"Encoding {len(missing)} new messages ({len(cached)} cached)")
+        encoded = encoder.encode([row['message'] for row in missing], batch_size=64, show_progress_bar=False)
+        for row, embedding in zip(missing, encoded):
+            cached[row['id']] = embedding
+
+    ids = np.array([row['id'] for row in rows], dtype=np.int64)
+    embeddings = np.array([cached[row['id']] for row in rows], dtype=np.float32)
+    np.savez(cache_path, ids=ids, embeddings=embeddings, model=np.array(model_name))
+
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+
+def best_earlier_match(embeddings: np.ndarray, block_size: int = 1024):
+    """For each row, return the index and cosine similarity of its most similar earlier row.
+
+    Row 0 has no earlier rows and gets index -1, similarity -inf.
+    """
+    n = len(embeddings)
+    best_idx = np.full(n, -1, dtype=np.int64)
+    best_sim = np.full(n, -np.inf, dtype=np.float32)
+    start = 0
+    while start < n:
+        # Cap each block at ~64M similarities so memory stays bounded for large histories
+        stop = min(start + max(1, min(block_size, (1 << 26) // max(start, 1))), n)
+        block_start, start = start, stop
+        if stop == 1:
+            continue
+        sims = embeddings[block_start:stop] @ embeddings[:stop].T
+        # Only cases stored before the query are in the index when it arrives
+        rows = np.arange(block_start, stop)[:, None]
+        sims[np.arange(stop)[None, :] >= rows] = -np.inf
+        best_idx[block_start:stop] = sims.argmax(axis=1)
+        best_sim[block_start:stop] = sims.max(axis=1)
+    best_idx[best_sim == -np.inf] = -1
+    return best_idx, best_sim
+
+
+def sweep(best_sim: np.ndarray, agrees: np.ndarray, thresholds: np.ndarray, mask: np.ndarray = None):
+    """Return (hit_rate, agreement, hits) for each threshold over the rows in `mask`"""
+    if mask is None:
+        mask = np.ones(len(best_sim), dtype=bool)
+    total = max(int(mask.sum()), 1)
+    hits_matrix = (best_sim[None, :] > thresholds[:, None]) & mask[None, :]
+    hits = hits_matrix.sum(axis=1)
+    agreeing = (hits_matrix & agrees[None, :]).sum(axis=1)
+    agreement = np.divide(agreeing, hits, out=np.ones(len(thresholds)), where=hits > 0)
+    return hits / total, agreement, hits
+
+
+def recommend(thresholds: np.ndarray, agreement: np.ndarray, hits: np.ndarray,
+              target: float, min_hits: int, fallback: float) -> float:
+    """Lowest threshold whose agreement meets the target with at least `min_hits` hits"""
+    ok = (agreement >= target) & (hits >= min_hits)
+    if not ok.any():
+        return fallback
+    # Require the target to hold for every stricter threshold too, so noise at the top can't pass
+    for i in range(len(thresholds)):
+        if ok[i] and (agreement[i:][hits[i:] >= min_hits] >= target).all():
+            return float(round(thresholds[i], 3))
+    return fallback
+
+
+def calibrate(verdicts: np.ndarray, embeddings: np.ndarray, thresholds: np.ndarray,
+              target: float, min_hits: int, fallback: float = SIMILARITY_THRESHOLD) -> dict:
+    """Run the replay and return curves and recommended thresholds"""
+    best_idx, best_sim = best_earlier_match(embeddings)
+    has_match = best_idx >= 0
+    reused = np.where(has_match, verdicts[np.maximum(best_idx, 0)], "")
+    agrees = has_match & (reused == verdicts)
+
+    hit_rate, agreement, hits = sweep(best_sim, agrees, thresholds)
+    result = {
+        'curves': {'all': {'hit_rate': hit_rate, 'agreement': agreement, 'hits': hits}},
+        'default': recommend(thresholds, agreement, hits, target, min_hits, fallback),
+        'per_verdict': {}
+    }
+    # Group by the verdict that would be reused: that is what Judge knows at lookup time
+    for verdict in sorted(set(verdicts.tolist())):
+        mask = reused == verdict
+        v_hit_rate, v_agreement, v_hits = sweep(best_sim, agrees, thresholds, mask)
+        result['curves'][verdict] = {'hit_rate': v_hit_rate, 'agreement': v_agreement, 'hits': v_hits}
+        result['per_verdict'][verdict] = recommend(thresholds, v_agreement, v_hits, target, min_hits,
+                                                   result['default'])
+    return result
+
+
+def write_csv(path: str, thresholds: np.ndarray, curves: dict):
+    """Write one row per threshold and group"""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['group', 'threshold', 'hit_rate', 'agreement', 'hits'])
+        for group, curve in curves.items():
+            for i, threshold in enumerate(thresholds):
+                writer.writerow([group, f"{threshold:.3f}", f"{curve['hit_rate'][i]:.4f}",
+                                 f"{curve['agreement'][i]:.4f}", int(curve['hits'][i])])
+
+
+def plot(path: str, thresholds: np.ndarray, curves: dict, recommended: dict):
+    """Plot hit rate against verdict agreement for every group"""
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("matplotlib is not installed, skipping plot")
+        return
+
+    fig, ax = plt.subplots(figsize=(8, 6))
+    for group, curve in curves.items():
+        ax.plot(curve['hit_rate'], curve['agreement'], marker='.', label=group)
+        chosen = recommended['default'] if group == 'all' else recommended['per_verdict'].get(group)
+        if chosen is not None:
+            i = int(np.abs(thresholds - chosen).argmin())
+            ax.annotate(f"{chosen:.2f}", (curve['hit_rate'][i], curve['agreement'][i]))
+    ax.set_xlabel("Cache hit rate")
+    ax.set_ylabel("Verdict agreement")
+    ax.set_title("Similar-case threshold calibration")
+    ax.legend()
+    fig.savefig(path, dpi=120, bbox_inches='tight')
+    print(f"Saved plot to {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate similar-case thresholds")
+    parser.add_argument('--db', help="Path to debates.db (defaults to the app database)")
+    parser.add_argument('--model', default='all-MiniLM-L6-v2', help="Sentence transformer used by RAGStore")
+    parser.add_argument('--target-agreement', type=float, default=0.95)
+    parser.add_argument('--min-hits', type=int, default=5, help="Hits needed before a threshold is trusted")
+    parser.add_argument('--min', type=float, default=0.70, help="Lowest threshold to evaluate")
+    parser.add_argument('--max', type=float, default=0.99, help="Highest threshold to evaluate")
+    parser.add_argument('--step', type=float, default=0.01)
+    parser.add_argument('--output', default=SIMILARITY_THRESHOLDS_FILE, help="Thresholds file read by Judge")
+    parser.add_argument('--embeddings-cache', help="Embedding cache (defaults to <output>.embeddings.npz)")
+    parser.add_argument('--csv', help="Write the curves as CSV")
+    parser.add_argument('--plot', help="Save a hit rate vs agreement plot (needs matplotlib)")
+    args = parser.parse_args()
+
+    db = DebateDB(args.db)
+    rows = [row for chunk in db.iter_messages(chunk_size=1000) for row in chunk]
+    db.close()
+    if len(rows) < 2:
+        print("Need at least two debates to calibrate")
+        return
+
+    cache_path = args.embeddings_cache or f"{os.path.splitext(args.output)[0]}.embeddings.npz"
+    embeddings = load_embeddings(rows, cache_path, args.model)
+    verdicts = np.array([row['verdict'] for row in rows])
+    thresholds = np.round(np.arange(args.min, args.max + args.step / 2, args.step), 4)
+
+    result = calibrate(verdicts, embeddings, thresholds, args.target_agreement, args.min_hits)
+
+    for group, curve in result['curves'].items():
+        chosen = result['default'] if group == 'all' else result['per_verdict'][group]
+        i = int(np.abs(thresholds - chosen).argmin())
+        print(f"{group:12s} threshold {chosen:.2f}  hit rate {curve['hit_rate'][i]:.1%}  "
+              f"agreement {curve['agreement'][i]:.1%}  ({int(curve['hits'][i])} hits)")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'default': result['default'],
+            'per_verdict': result['per_verdict'],
+            'target_agreement': args.target_agreement,
+            'model': args.model,
+            'messages': len(rows),
+            'generated_at': time.strftime('%Y-%m-%d %H:%M:%S')
+        }, f, indent=2)
+    print(f"Wrote recommended thresholds to {args.output}")
+
+    if args.csv:
+        write_csv(args.csv, thresholds, result['curves'])
+    if args.plot:
+        plot(args.plot, thresholds, result['curves'], result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""Move argument bodies of debates saved before compaction into the argument store.
+
+Usage:
+    python -m scripts.compact_arguments            # migrate rows, then VACUUM
+    python -m scripts.compact_arguments --no-vacuum
+"""
+import argparse
+import os
+from models.debate_db import DebateDB
+from config import DEBATES_DB
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact legacy argument rows")
+    parser.add_argument('--db', default=DEBATES_DB, help="Path to debates.db")
+    parser.add_argument('--no-vacuum', action='store_true', help="Skip reclaiming freed pages")
+    args = parser.parse_args()
+
+    size_before = os.path.getsize(args.db)
+    db = DebateDB(args.db)
+    moved = db.compact_arguments()
+    if not args.no_vacuum:
+        db.conn.execute('VACUUM')
+    db.close()
+    print(f"Compacted {moved} arguments: {size_before / 1024:.0f} KB -> {os.path.getsize(args.db) / 1024:.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
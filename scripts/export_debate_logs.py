@@ -0,0 +1,62 @@
+"""Export debate log segments written by utils.log_sink.
+
+Usage:
+    python -m scripts.export_debate_logs --output debates.jsonl
+    python -m scripts.export_debate_logs --format text --since 2025-11-01
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from config import LOG_DIR
+from utils.log_sink import iter_records
+
+
+def format_text(record: dict) -> str:
+    """Render a record in the layout of the old per-debate .txt logs"""
+    logged_at = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(record.get('logged_at', 0)))
+    title = "DEBATE LOG" if record.get('type') == 'debate' else "DIRECT VERDICT LOG"
+    lines = [f"{title} - {logged_at}", '=' * 80, "", f"TOPIC:\n{record.get('topic', '')}", "", '=' * 80, ""]
+    if record.get('type') == 'debate':
+        lines.append("DEBATE:")
+        for entry in record.get('arguments', []):
+            lines.append(f"\n{entry['speaker']}:\n{entry['argument']}\n{'-' * 80}")
+        lines.extend(["", '=' * 80, ""])
+    lines.append("VERDICT:")
+    lines.append(f"Verdict: {record.get('verdict')}")
+    lines.append(f"Summary: {record.get('summary')}")
+    lines.append(f"Evidence: {', '.join(record.get('evidence', []))}")
+    return "\n".join(lines) + "\n\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export debate log segments")
+    parser.add_argument('--logs-dir', default=LOG_DIR, help="Directory containing log segments")
+    parser.add_argument('--format', choices=['jsonl', 'text'], default='jsonl')
+    parser.add_argument('--since', help="Only export records logged on or after this date (YYYY-MM-DD)")
+    parser.add_argument('--type', choices=['debate', 'direct'], help="Only export records of this type")
+    parser.add_argument('--output', help="Output file (defaults to stdout)")
+    args = parser.parse_args()
+
+    since = datetime.strptime(args.since, '%Y-%m-%d').timestamp() if args.since else None
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+
+    count = 0
+    try:
+        for record in iter_records(args.logs_dir, since=since):
+            if args.type and record.get('type') != args.type:
+                continue
+            if args.format == 'jsonl':
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            else:
+                out.write(format_text(record))
+            count += 1
+    finally:
+        if args.output:
+            out.close()
+    print(f"Exported {count} records", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Re-score historical messages in debates.db under a new verdict version.
+
+Streams single-message debates in id order (thread steps, whose message is a
+numbered transcript, are skipped), dedupes near-identical messages through a
+RAGStore kept per version next to the database, runs direct verdicts or full
+debates through a bounded worker pool and writes each result to the
+`verdicts` table keyed by (debate_id, version). Rows already scored under the
+version are skipped and the dedup store survives, so an interrupted run
+resumes where it stopped with the same near-duplicates still reused.
+
+Usage:
+    python -m scripts.readjudicate --version prompts-v2 --mode direct --workers 4
+    python -m scripts.readjudicate --version prompts-v2 --mode debate --rounds 2 --limit 500
+"""
+import argparse
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import numpy as np
+from config import DEBATES_DB, GEMINI_KEY_1, ROUNDS
+from utils.gemini_setup import setup_gemini
+from models.debate_db import DebateDB
+from models.judge import Judge, load_similarity_thresholds
+from models.rag_store import RAGStore
+from models.debate import create_lawyers, run_debate
+
+
+def adjudicate(message: str, mode: str, rounds: int, rag_store: RAGStore) -> dict:
+    """Score one message, reusing the verdict of a near-duplicate seen earlier in the run"""
+    judge = Judge(setup_gemini(GEMINI_KEY_1), rag_store=rag_store)
+
+    has_similar, cached_verdict = judge.check_similar_case(message)
+    if has_similar:
+        return {**cached_verdict, 'source': 'dedup'}
+
+    if mode == 'direct':
+        return {**judge.direct_verdict(message), 'source': 'direct'}
+
+    prosecutor, defender = create_lawyers()
+    return {**run_debate(message, judge, prosecutor, defender, rounds=rounds, precedents=judge.precedents),
+            'source': 'debate'}
+
+
+def normalise_verdict(verdict: str) -> str:
+    """Label direct verdicts like debated ones: Judge.direct_verdict says 'NOT A SCAM' for 'LEGITIMATE'"""
+    return 'LEGITIMATE' if verdict == 'NOT A SCAM' else verdict
+
+
+def dedup_store_dir(db_path: str, version: str) -> str:
+    """Directory of the dedup RAGStore of a scoring version, next to the database"""
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), "readjudicate_store",
+                        re.sub(r'[^\w.-]+', '_', version))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-adjudicate historical debates")
+    parser.add_argument('--version', required=True, help="Label stored with every new verdict")
+    parser.add_argument('--mode', choices=['direct', 'debate'], default='direct')
+    parser.add_argument('--rounds', type=int, default=ROUNDS, help="Debate rounds in debate mode")
+    parser.add_argument('--workers', type=int, default=4, help="Messages scored concurrently")
+    parser.add_argument('--chunk-size', type=int, default=100, help="Rows read from the database at a time")
+    parser.add_argument('--limit', type=int, help="Stop after scoring this many messages")
+    parser.add_argument('--db', help="Path to debates.db (defaults to the app database)")
+    args = parser.parse_args()
+
+    db_path = args.db or DEBATES_DB
+    db = DebateDB(db_path)
+    # Dedupes across runs of this version without touching the app's case store. Argument
+    # bodies of stored cases go to the database being re-scored, not the app's debates.db.
+    rag_store = RAGStore(store_dir=dedup_store_dir(db_path, args.version), argument_store=db.argument_store,
+                         legacy_cache_file=None)
+    thresholds = load_similarity_thresholds()
+    dedup_floor = min([thresholds['default'], *thresholds['per_verdict'].values()])
+
+    scored = skipped = failed = 0
+    sources = {}
+    start = time.time()
+    in_flight = {}
+
+    def collect(done):
+        nonlocal scored, failed
+        for future in done:
+            row, _ = in_flight.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"Debate {row['id']} failed: {e}")
+                continue
+            # Written from the main thread only: DebateDB shares one connection
+            db.save_verdict(row['id'], args.version, normalise_verdict(result['verdict']), result['summary'],
+                            result['evidence'], result.get('judge_statement'), result['source'])
+            scored += 1
+            sources[result['source']] = sources.get(result['source'], 0) + 1
+            if scored % 25 == 0:
+                report(scored, skipped, failed, sources, start)
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        for chunk in db.iter_messages(chunk_size=args.chunk_size):
+            done_ids = db.get_verdict_ids(args.version, [row['id'] for row in chunk])
+            for row in chunk:
+                if row['id'] in done_ids:
+                    skipped += 1
+                    continue
+                if args.limit is not None and scored + failed + len(in_flight) >= args.limit:
+                    break
+                # Bound the queue so memory stays flat however large the table is
+                while len(in_flight) >= args.workers * 2:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                # A near-duplicate still being scored is not in the store yet: wait for it, so this
+                # message reuses its verdict instead of being scored twice
+                embedding = rag_store.encoder.encode([row['message']])[0]
+                embedding = embedding / max(float(np.linalg.norm(embedding)), 1e-12)
+                earlier = [f for f, (_, other) in in_flight.items() if float(embedding @ other) >= dedup_floor]
+                if earlier:
+                    done, _ = wait(earlier)
+                    collect(done)
+                future = pool.submit(adjudicate, row['message'], args.mode, args.rounds, rag_store)
+                in_flight[future] = (row, embedding)
+            if args.limit is not None and scored + failed + len(in_flight) >= args.limit:
+                break
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            collect(done)
+
+    report(scored, skipped, failed, sources, start)
+    db.close()
+
+
+def report(scored: int, skipped: int, failed: int, sources: dict, start: float):
+    """Print progress and throughput"""
+    minutes = max(time.time() - start, 1e-6) / 60
+    breakdown = ", ".join(f"{source}: {count}" for source, count in sorted(sources.items()))
+    print(f"Scored {scored} messages ({breakdown or 'none'}), skipped {skipped} already scored, "
+          f"{failed} failed - {scored / minutes:.1f} messages/min")
+
+
+if __name__ == "__main__":
+    main()
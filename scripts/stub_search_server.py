@@ -0,0 +1,81 @@
+"""Local stand-in for the Google Custom Search API.
+
+Answers /customsearch/v1 with deterministic results derived from the query and
+counts the requests it served, so search caching can be exercised offline.
+
+Usage:
+    python -m scripts.stub_search_server --port 8765
+    GOOGLE_SEARCH_API=http://127.0.0.1:8765/customsearch/v1 python app.py
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+class StubSearchHandler(BaseHTTPRequestHandler):
+    """Serve fake Custom Search results"""
+    delay = 0.0
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/stats':
+            return self._send(200, {'requests': self.server.request_count})
+        if url.path != '/customsearch/v1':
+            return self._send(404, {'error': 'not found'})
+
+        with self.server.count_lock:
+            self.server.request_count += 1
+        if self.delay:
+            time.sleep(self.delay)
+
+        params = parse_qs(url.query)
+        query = params.get('q', [''])[0]
+        num = int(params.get('num', ['3'])[0])
+        items = [{
+            'title': f"Result {i + 1} for {query}",
+            'snippet': f"Stub snippet {i + 1} about {query}.",
+            'link': f"https://example.com/{i + 1}?q={query.replace(' ', '+')}"
+        } for i in range(num)]
+        self._send(200, {'items': items})
+
+    def _send(self, status: int, body: dict):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(port: int = 0, delay: float = 0.0) -> ThreadingHTTPServer:
+    """Start the stub server in a daemon thread and return it (port 0 picks a free port)"""
+    handler = type('DelayedStubSearchHandler', (StubSearchHandler,), {'delay': delay})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.request_count = 0
+    server.count_lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a stub Custom Search API")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--delay', type=float, default=0.0, help="Seconds to wait before answering")
+    args = parser.parse_args()
+
+    server = start_stub_server(args.port, args.delay)
+    print(f"Stub search server on http://127.0.0.1:{server.server_address[1]}/customsearch/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Run from any directory: the modules import each other from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep the databases, logs and case store that modules open on import out of the working tree.
+# Set before config is first imported, which reads them once.
+_runtime_dir = tempfile.mkdtemp(prefix="scam-debate-tests-")
+for _name, _default in (('DEBATES_DB', "debates.db"), ('RATE_LIMIT_DB', "rate_limits.db"),
+                        ('SEARCH_CACHE_DB', "search_cache.db"), ('LOG_DIR', "debate_logs"),
+                        ('RAG_STORE_DIR', "case_store"), ('RAG_LEGACY_CACHE', "case_cache.pkl"),
+                        ('SIMILARITY_THRESHOLDS_FILE', "similarity_thresholds.json")):
+    os.environ.setdefault(_name, os.path.join(_runtime_dir, _default))
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    """The Flask app module with a fresh debates database and rate limiter"""
+    import app
+    from models.debate_db import DebateDB
+    from utils.rate_limit import SQLiteRateLimiter
+
+    db = DebateDB(str(tmp_path / "debates.db"))
+    monkeypatch.setattr(app, 'db', db)
+    monkeypatch.setattr(app, 'limiter', SQLiteRateLimiter(str(tmp_path / "rate_limits.db")))
+    yield app
+    db.close()
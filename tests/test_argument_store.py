@@ -0,0 +1,61 @@
+import json
+
+from models.argument_store import ArgumentStore
+from models.debate_db import DebateDB
+
+
+def blob_count(store):
+    return store._connection().execute('SELECT COUNT(*) FROM argument_blobs').fetchone()[0]
+
+
+def test_bodies_round_trip_once(tmp_path):
+    path = str(tmp_path / "debates.db")
+    store = ArgumentStore(path, cache_size=2)
+    texts = ["Pay the fee at parcel-help.example", "Le colis est retenu — payez 2 €", ""]
+
+    hashes = store.put_many(texts + texts[:1])
+    assert hashes[0] == hashes[3] == ArgumentStore.hash_text(texts[0])
+    assert blob_count(store) == 3
+    assert len(store._cache) == 2
+
+    # A new store (empty LRU) reads the compressed bodies back
+    reopened = ArgumentStore(path)
+    assert reopened.get_many(hashes) == dict(zip(hashes, texts))
+    assert reopened.get("0" * 64) == ''
+
+
+def test_compact_and_expand_debate_history(tmp_path):
+    store = ArgumentStore(str(tmp_path / "debates.db"))
+    arguments = [
+        {'speaker': 'Scam Analyst', 'argument': 'Round 1: The domain was registered last week.'},
+        {'speaker': 'Legitimacy Analyst', 'argument': 'Round 1: Round numbers are common.', 'round': 1},
+        {'speaker': 'Judge', 'argument': 'Round two: no prefix to strip'}
+    ]
+
+    refs = store.compact_arguments(arguments)
+    assert all('argument' not in ref for ref in refs)
+    # The body is hashed without its "Round N:" prefix, as DebateDB stores it
+    assert refs[0]['hash'] == ArgumentStore.hash_text('The domain was registered last week.')
+    assert refs[0]['prefix'] == 'Round 1: '
+    assert 'prefix' not in refs[2]
+    assert store.expand_arguments(json.loads(json.dumps(refs))) == arguments
+
+
+def test_legacy_inline_arguments_are_compacted(tmp_path):
+    db = DebateDB(str(tmp_path / "debates.db"))
+    debate_id = db.save_debate("Claim your prize", 'SCAM', 'Prize bait.', [],
+                               [{'speaker': 'Scam Analyst', 'argument': 'Round 1: Nobody wins unentered draws.'}],
+                               'Verdict: SCAM')
+    # Rows written before the argument store kept their bodies inline
+    db.conn.execute('''
+        INSERT INTO arguments (debate_id, round_number, speaker, argument, body_hash)
+        VALUES (?, 1, 'Legitimacy Analyst', 'Some lotteries do notify winners.', NULL)
+    ''', (debate_id,))
+    db.conn.commit()
+
+    assert db.compact_arguments(batch_size=1) == 1
+    assert db.compact_arguments() == 0
+    assert db.conn.execute("SELECT COUNT(*) FROM arguments WHERE argument != ''").fetchone()[0] == 0
+    assert [a['argument'] for a in db.get_debate(debate_id)['arguments']] == [
+        'Nobody wins unentered draws.', 'Some lotteries do notify winners.']
+    db.close()
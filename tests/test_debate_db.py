@@ -0,0 +1,118 @@
+import pytest
+
+from models.debate_db import DebateDB, ReservationExpired, ThreadBusy
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DebateDB(str(tmp_path / "debates.db"))
+    yield db
+    db.close()
+
+
+def step_debate(message, parent_id=None):
+    """save_debate arguments of a one-round thread step"""
+    return {
+        'message': message, 'verdict': 'SCAM', 'summary': 'Asks for a fee.', 'evidence': ['fee'],
+        'arguments': [{'speaker': 'Scam Analyst', 'argument': 'Round 1: Pay-to-release is a scam.'},
+                      {'speaker': 'Legitimacy Analyst', 'argument': 'Round 1: Carriers do charge duties.'}],
+        'judge_statement': 'Verdict: SCAM', 'source': 'thread_round', 'parent_id': parent_id
+    }
+
+
+def debate_count(db):
+    return db.conn.execute('SELECT COUNT(*) FROM debates').fetchone()[0]
+
+
+def test_reserve_complete_release(db):
+    thread_id = db.create_thread()
+    assert db.add_thread_message(thread_id, "Your parcel is held", 'SCAM', 'Fee request.', 'debate') == 1
+
+    reservation = db.reserve_thread_message(thread_id, "Pay $2 to release it")
+    # A pending message is not part of the thread and blocks further appends
+    assert len(db.get_thread(thread_id)['messages']) == 1
+    with pytest.raises(ThreadBusy):
+        db.reserve_thread_message(thread_id, "Hello?")
+    # Other threads are not affected
+    db.release_thread_message(db.reserve_thread_message(db.create_thread(), "Unrelated"))
+
+    position, debate_id = db.complete_thread_message(reservation, 'SCAM', 'Asks for a fee.', 'thread_round',
+                                                     debate=step_debate("Pay $2 to release it"))
+    assert position == 2
+    thread = db.get_thread(thread_id)
+    assert [m['position'] for m in thread['messages']] == [1, 2]
+    assert thread['latest_debate_id'] == debate_id
+    assert thread['verdict'] == 'SCAM'
+    debate = db.get_debate(debate_id)
+    assert debate['source'] == 'thread_round'
+    assert [(a['round'], a['argument']) for a in debate['arguments']] == [
+        (1, 'Pay-to-release is a scam.'), (1, 'Carriers do charge duties.')]
+
+    # A released reservation frees its position for the next message
+    reservation = db.reserve_thread_message(thread_id, "Never mind")
+    db.release_thread_message(reservation)
+    assert db.add_thread_message(thread_id, "Still there?", 'SCAM', 'Same thread.', 'thread_round') == 3
+
+
+def test_stale_reservation_expires_without_orphan_debate(db):
+    thread_id = db.create_thread()
+    stale = db.reserve_thread_message(thread_id, "Slow step")
+    db.conn.execute("UPDATE thread_messages SET created_at = datetime('now', '-1 hour') WHERE id = ?", (stale,))
+    db.conn.commit()
+
+    # The next append drops the stale row and takes its position
+    fresh = db.reserve_thread_message(thread_id, "Next step", stale_after=60)
+    assert db.complete_thread_message(fresh, 'LEGITIMATE', 'Fine.', 'thread_round')[0] == 1
+
+    with pytest.raises(ReservationExpired):
+        db.complete_thread_message(stale, 'SCAM', 'Too late.', 'thread_round', debate=step_debate("Slow step"))
+    assert debate_count(db) == 0
+    assert [m['message'] for m in db.get_thread(thread_id)['messages']] == ["Next step"]
+
+
+def test_append_to_busy_thread_is_rejected(app_module, monkeypatch):
+    db = app_module.db
+    thread_id = db.create_thread()
+    db.add_thread_message(thread_id, "Your parcel is held", 'SCAM', 'Fee request.', 'debate')
+    pending = db.reserve_thread_message(thread_id, "Pay $2 to release it")
+
+    def analyze(*args, **kwargs):
+        raise AssertionError("a busy thread must not be analyzed")
+
+    monkeypatch.setattr(app_module, 'analyze_thread_message', analyze)
+    client = app_module.app.test_client()
+    response = client.post(f"/threads/{thread_id}/messages", json={'message': "Hello?"})
+    assert response.status_code == 409
+    assert "already has a message" in response.get_json()['error']
+
+    # The pending step keeps its reservation
+    db.complete_thread_message(pending, 'SCAM', 'Asks for a fee.', 'thread_round')
+    assert len(db.get_thread(thread_id)['messages']) == 2
+
+
+def test_expired_or_refused_steps_answer_and_free_the_thread(app_module, monkeypatch):
+    db = app_module.db
+    thread_id = db.create_thread()
+    db.add_thread_message(thread_id, "Your parcel is held", 'SCAM', 'Fee request.', 'debate')
+    client = app_module.app.test_client()
+
+    def expire(thread, message, reservation, quota_key=None):
+        db.release_thread_message(reservation)
+        raise ReservationExpired(reservation)
+
+    monkeypatch.setattr(app_module, 'analyze_thread_message', expire)
+    response = client.post(f"/threads/{thread_id}/messages", json={'message': "Pay $2"})
+    assert response.status_code == 409
+    assert "retry" in response.get_json()['error']
+
+    def over_quota(thread, message, reservation, quota_key=None):
+        raise app_module.QuotaExceeded(30)
+
+    monkeypatch.setattr(app_module, 'analyze_thread_message', over_quota)
+    response = client.post(f"/threads/{thread_id}/messages", json={'message': "Pay $2"})
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == "31"
+
+    # Neither left a pending message behind
+    db.release_thread_message(db.reserve_thread_message(thread_id, "Pay $2"))
+    assert len(db.get_thread(thread_id)['messages']) == 1
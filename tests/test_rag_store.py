@@ -0,0 +1,100 @@
+import glob
+import json
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+from models.argument_store import ArgumentStore
+from models.rag_store import RAGStore
+
+DAY = 86400
+MESSAGES = [
+    ("SCAM", "Your {} parcel is on hold. Pay the redelivery fee at parcel-redeliver-now.com"),
+    ("SCAM", "{} security alert: verify your account at secure-login-check.net or call +1-888-555-0199"),
+    ("LEGITIMATE", "{} statement is ready. Sign in through the app to view it"),
+    ("LEGITIMATE", "Reminder from {} dental: your appointment is on Monday, reply C to confirm"),
+]
+NAMES = ["DHL", "Chase", "HSBC", "Riverside", "UPS", "Barclays"]
+QUERIES = ["Pay the DHL redelivery fee now", "verify your HSBC account at secure-login-check.net",
+           "dental appointment reminder", "call +1-888-555-0199", "completely unrelated weather report"]
+
+
+def make_case(i, day):
+    verdict, template = MESSAGES[i % len(MESSAGES)]
+    return {'topic': template.format(NAMES[i % len(NAMES)]) + f" (ref {i})",
+            'verdict': {'verdict': verdict, 'summary': f"Case {i} is {verdict.lower()}.", 'evidence': []},
+            'key_evidence': f"indicator {i % len(MESSAGES)}",
+            'timestamp': 1_700_000_000 + day * DAY}
+
+
+def open_store(store_dir, argument_store, memory_budget):
+    return RAGStore(store_dir=str(store_dir), argument_store=argument_store, memory_budget=memory_budget,
+                    shard_days=1, legacy_cache_file=None)
+
+
+def ranking(store, query):
+    return [(case['topic'], round(case['similarity'], 5), round(case['lexical_score'], 5),
+             round(case['rank_score'], 8)) for case in store.search(query, min_similarity=0.1, candidates=5)]
+
+
+@pytest.fixture
+def argument_store(tmp_path):
+    return ArgumentStore(str(tmp_path / "debates.db"))
+
+
+def test_cold_shards_rank_like_hot_ones(tmp_path, argument_store):
+    store_dir = tmp_path / "case_store"
+    hot = open_store(store_dir, argument_store, memory_budget=1 << 30)
+    for i in range(36):
+        hot.add_case(make_case(i, day=i % 3))
+
+    cold = open_store(store_dir, argument_store, memory_budget=0)
+    assert hot.stats()['hot_shards'] == 3
+    assert cold.stats()['hot_shards'] == 0
+    assert len(cold) == 36
+    for query in QUERIES:
+        assert ranking(cold, query) == ranking(hot, query)
+
+    # Cases written after the cold shards' lexicons were persisted are found too
+    for i in range(36, 48):
+        hot.add_case(make_case(i, day=i % 3))
+    cold.refresh(force=True)
+    assert len(cold) == 48
+    for query in QUERIES:
+        assert ranking(cold, query) == ranking(hot, query)
+    assert ([case['topic'] for case in cold.find_similar_cases(QUERIES[0], threshold=0.3)] ==
+            [case['topic'] for case in hot.find_similar_cases(QUERIES[0], threshold=0.3)])
+
+
+def test_store_of_older_embeddings_is_reembedded(tmp_path, argument_store):
+    store_dir = tmp_path / "case_store"
+    store = open_store(store_dir, argument_store, memory_budget=1 << 30)
+    cases = [make_case(i, day=i % 2) for i in range(12)]
+    for case in cases:
+        store.add_case(case)
+    del store
+
+    # Stores written by earlier versions embedded other text and have no 'embedded_text' in their manifest
+    rng = np.random.default_rng(0)
+    for path in glob.glob(os.path.join(store_dir, "*.emb")):
+        rows = os.path.getsize(path) // 4
+        noise = rng.standard_normal(rows).astype(np.float32)
+        noise.tofile(path)
+    manifest_path = os.path.join(store_dir, "manifest.json")
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    del manifest['embedded_text']
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+
+    store = open_store(store_dir, argument_store, memory_budget=0)
+    with open(manifest_path, encoding='utf-8') as f:
+        assert json.load(f)['embedded_text'] == 'topic'
+    assert len(store) == 12
+    for case in cases:
+        best = store.find_similar_cases(case['topic'], threshold=0.0)[0]
+        assert best['topic'] == case['topic']
+        assert best['similarity'] == pytest.approx(1.0, abs=1e-4)
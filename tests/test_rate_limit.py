@@ -0,0 +1,93 @@
+from types import SimpleNamespace
+
+import pytest
+
+import utils.rate_limit as rate_limit
+from utils.rate_limit import SQLiteRateLimiter, parse_limit
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Control the limiter's notion of now"""
+    now = SimpleNamespace(value=1_000_000.0)
+    monkeypatch.setattr(rate_limit, 'time', SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+@pytest.fixture
+def limiter(tmp_path):
+    return SQLiteRateLimiter(str(tmp_path / "rate_limits.db"), prune_probability=0)
+
+
+def test_parse_limit():
+    assert parse_limit("2 per day") == (2, 86400)
+    assert parse_limit("50/hours") == (50, 3600)
+    with pytest.raises(ValueError):
+        parse_limit("often")
+
+
+def test_window_slides_past_old_hits(limiter, clock):
+    assert limiter.hit("k", ["3 per minute"], cost=2) == (True, 0.0)
+    clock.value += 30
+    assert limiter.hit("k", ["3 per minute"]) == (True, 0.0)
+
+    clock.value += 15
+    allowed, retry_after = limiter.hit("k", ["3 per minute"])
+    assert not allowed
+    # The cost-2 hit leaves the window 60s after it was made, 15s from now
+    assert retry_after == pytest.approx(15)
+
+    clock.value += 15.5
+    assert limiter.hit("k", ["3 per minute"]) == (True, 0.0)
+    assert limiter.usage("k", "3 per minute") == 2
+
+
+def test_rejected_hits_are_not_charged(limiter, clock):
+    assert limiter.hit("k", ["5 per hour"], cost=4)[0]
+    assert not limiter.hit("k", ["5 per hour"], cost=2)[0]
+    assert limiter.usage("k", "5 per hour") == 4
+    assert limiter.hit("k", ["5 per hour"], cost=1)[0]
+
+
+def test_cost_above_the_limit_waits_a_full_window(limiter, clock):
+    assert limiter.hit("k", ["3 per minute"], cost=4) == (False, 60.0)
+    assert limiter.usage("k", "3 per minute") == 0
+
+
+def test_every_limit_must_have_room(limiter, clock):
+    limits = ["2 per second", "3 per minute"]
+    assert limiter.hit("k", limits)[0]
+    assert limiter.hit("k", limits)[0]
+    assert limiter.hit("k", limits) == (False, pytest.approx(1))
+
+    clock.value += 1.5
+    assert limiter.hit("k", limits)[0]
+    allowed, retry_after = limiter.hit("k", limits)
+    assert not allowed
+    assert retry_after == pytest.approx(58.5)
+    # Keys are counted separately
+    assert limiter.hit("other", limits)[0]
+
+
+def test_debate_cost_scales_with_rounds(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'ROUNDS', 3)
+    monkeypatch.setattr(app_module, 'QUOTA_COST_DEBATE', 5)
+
+    assert app_module.debate_cost(3) == 5
+    assert app_module.debate_cost(6) == 10
+    # Shorter debates are charged proportionally, rounded up, and never free
+    assert app_module.debate_cost(1) == 2
+    assert app_module.debate_cost(0) == 1
+
+
+def test_charge_quota_counts_cost(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'ANALYZE_QUOTA', "10 per day")
+
+    app_module.charge_quota("analyze:1.2.3.4", 5)
+    app_module.charge_quota("analyze:1.2.3.4", 4)
+    with pytest.raises(app_module.QuotaExceeded):
+        app_module.charge_quota("analyze:1.2.3.4", 2)
+    app_module.charge_quota("analyze:1.2.3.4", 1)
+    # Calls without a quota key (e.g. /testanalyze) are not charged
+    app_module.charge_quota(None, 100)
+    assert app_module.limiter.usage("analyze:1.2.3.4", "10 per day") == 10
@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+import pytest
+
+import utils.web_search as web_search
+from models.ai_lawyer import AILawyer
+from models.debate import run_debate
+from utils.search_cache import SearchCache
+
+
+class StubClient:
+    """google.genai.Client stand-in recording the prompts it is sent"""
+
+    def __init__(self):
+        self.prompts = []
+        self.models = SimpleNamespace(generate_content=self._generate_content)
+
+    def _generate_content(self, model, contents, config):
+        self.prompts.append(contents)
+        return SimpleNamespace(text=f"Argument {len(self.prompts)}", usage_metadata=None)
+
+
+class StubJudge:
+    def __init__(self):
+        self.debate_history = []
+
+    def record_argument(self, speaker, argument):
+        self.debate_history.append({'speaker': speaker, 'argument': argument})
+
+    def analyze_debate(self, topic, store_case=True, precedents=None):
+        return {'verdict': 'SCAM', 'arguments': self.debate_history}
+
+
+@pytest.fixture
+def search_calls(tmp_path, monkeypatch):
+    """Route perform_web_search to a fresh cache and a fake Custom Search endpoint"""
+    cache = SearchCache(db_path=str(tmp_path / "search_cache.db"))
+    calls = []
+
+    def fake_get(url, params, timeout):
+        calls.append(params['q'])
+        items = [{'title': 'Parcel scam warning', 'snippet': 'Fake redelivery fees.', 'link': 'https://example.org/a'}]
+        return SimpleNamespace(raise_for_status=lambda: None, json=lambda: {'items': items})
+
+    monkeypatch.setattr(web_search, 'get_search_cache', lambda: cache)
+    monkeypatch.setattr(web_search.session, 'get', fake_get)
+    return calls
+
+
+def test_rounds_and_debates_on_one_claim_share_one_search(search_calls):
+    client = StubClient()
+    prosecutor = AILawyer("Scam Analyst", "key-1", "prosecutor", client=client, web_search=True)
+    defender = AILawyer("Legitimacy Analyst", "key-2", "defender", client=client, web_search=True)
+    message = "Your parcel is held, pay the redelivery fee at parcel-help.example"
+
+    run_debate(message, StubJudge(), prosecutor, defender, rounds=2)
+    assert len(search_calls) == 1
+
+    run_debate(message, StubJudge(), prosecutor, defender, rounds=2)
+    assert len(search_calls) == 1
+    assert len(client.prompts) == 8
+    assert all("https://example.org/a" in prompt for prompt in client.prompts)
+
+
+def test_grounding_is_used_without_web_search(search_calls):
+    lawyer = AILawyer("Scam Analyst", "key-1", "prosecutor", client=StubClient(), web_search=False)
+
+    lawyer.make_argument("Claim your prize now")
+    assert search_calls == []
+    assert lawyer.config.tools
@@ -1,7 +1,17 @@
-import google.generativeai as genai
+import asyncio
 import time
 import random
 from functools import wraps
+from google import genai
+from google.genai import errors, types
+
+MODEL_NAME = 'gemini-2.0-flash-exp'  # Using experimental for free tier
+
+def _is_rate_limited(e: Exception) -> bool:
+    """True for Gemini quota errors (HTTP 429 / RESOURCE_EXHAUSTED)"""
+    if isinstance(e, errors.APIError):
+        return e.code == 429
+    return "429" in str(e) or "Resource exhausted" in str(e)
 
 def retry_with_exponential_backoff(max_retries=3, base_delay=1):
     """Decorator to retry API calls with exponential backoff"""
@@ -12,7 +22,7 @@ def retry_with_exponential_backoff(max_retries=3, base_delay=1):
                 try:
                     return func(*args, **kwargs)
                 except Exception as e:
-                    if "429" in str(e) or "Resource exhausted" in str(e):
+                    if _is_rate_limited(e):
                         if attempt < max_retries - 1:
                             # Exponential backoff with jitter
                             delay = base_delay * (2 ** attempt) + random.uniform(0, 1)
@@ -26,33 +36,57 @@ def retry_with_exponential_backoff(max_retries=3, base_delay=1):
         return wrapper
     return decorator
 
+def retry_with_exponential_backoff_async(max_retries=3, base_delay=1):
+    """Coroutine version of retry_with_exponential_backoff that sleeps without blocking the event loop"""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            for attempt in range(max_retries):
+                try:
+                    return await func(*args, **kwargs)
+                except Exception as e:
+                    if _is_rate_limited(e):
+                        if attempt < max_retries - 1:
+                            delay = base_delay * (2 ** attempt) + random.uniform(0, 1)
+                            print(f"Rate limit hit. Retrying in {delay:.2f}s... (attempt {attempt + 1}/{max_retries})")
+                            await asyncio.sleep(delay)
+                        else:
+                            print(f"Max retries reached. Error: {e}")
+                            raise
+                    else:
+                        raise
+        return wrapper
+    return decorator
+
 class RetryGenerativeModel:
-    """Wrapper around GenerativeModel with retry logic"""
-    def __init__(self, model: genai.GenerativeModel):
-        self.model = model
-    
+    """A model on a google-genai client with retry logic"""
+    def __init__(self, client: genai.Client, model_name: str = MODEL_NAME,
+                 config: types.GenerateContentConfig = None):
+        self.client = client
+        self.model_name = model_name
+        self.config = config
+
     @retry_with_exponential_backoff(max_retries=3, base_delay=2)
     def generate_content(self, prompt: str, **kwargs):
         """Generate content with retry logic"""
-        return self.model.generate_content(prompt, **kwargs)
+        return self.client.models.generate_content(model=self.model_name, contents=prompt,
+                                                   config=kwargs.pop('config', self.config), **kwargs)
+
+    @retry_with_exponential_backoff_async(max_retries=3, base_delay=2)
+    async def generate_content_async(self, prompt: str, **kwargs):
+        """Generate content on the event loop with retry logic"""
+        return await self.client.aio.models.generate_content(model=self.model_name, contents=prompt,
+                                                             config=kwargs.pop('config', self.config), **kwargs)
 
 def setup_gemini(api_key: str) -> RetryGenerativeModel:
     """Initialize a Gemini model instance with retry logic"""
-    genai.configure(api_key=api_key)
-    
     # Configure the model with generation config
-    generation_config = {
-        "temperature": 0.7,
-        "top_p": 1,
-        "top_k": 1,
-        "max_output_tokens": 2048,
-    }
-    
-    # Create the model with specific configuration
-    model = genai.GenerativeModel(
-        model_name='gemini-2.0-flash-exp',  # Using experimental for free tier
-        generation_config=generation_config
+    generation_config = types.GenerateContentConfig(
+        temperature=0.7,
+        top_p=1,
+        top_k=1,
+        max_output_tokens=2048
     )
-    
+
     # Wrap with retry logic
-    return RetryGenerativeModel(model)
\ No newline at end of file
+    return RetryGenerativeModel(genai.Client(api_key=api_key), MODEL_NAME, generation_config)
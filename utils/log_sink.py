@@ -0,0 +1,178 @@
+import atexit
+import gzip
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+from config import LOG_DIR, LOG_SEGMENT_MAX_BYTES, LOG_QUEUE_SIZE
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = "debates-"
+SEGMENT_SUFFIX = ".jsonl.gz"
+
+_STOP = object()
+
+
+class DebateLogSink:
+    """Background writer that appends debate records to rotating gzip segments.
+
+    Records are queued from the request path and written in batches by a daemon
+    thread. Each batch is appended to the active segment as its own gzip member,
+    so segments stay readable even if the process dies mid-write.
+    """
+
+    def __init__(self, logs_dir: str = LOG_DIR, max_segment_bytes: int = LOG_SEGMENT_MAX_BYTES,
+                 queue_size: int = LOG_QUEUE_SIZE, batch_size: int = 64,
+                 flush_interval: float = 1.0, put_timeout: float = 0.05):
+        self.logs_dir = logs_dir
+        self.max_segment_bytes = max_segment_bytes
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.written = 0
+        self.dropped = 0
+        self._segment_path = None
+        self._segment_bytes = 0
+        self._segment_seq = 0
+        self._closed = False
+
+        if not os.path.exists(self.logs_dir):
+            os.makedirs(self.logs_dir)
+            logger.info(f"Created debate logs directory at {self.logs_dir}")
+
+        self._thread = threading.Thread(target=self._run, name="debate-log-sink", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, record: Dict) -> bool:
+        """Queue a record for writing; drops it if the queue stays full"""
+        if self._closed:
+            return False
+        record.setdefault('logged_at', time.time())
+        try:
+            # Bounded wait keeps backpressure from stalling the request path
+            self.queue.put(record, timeout=self.put_timeout)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            logger.warning(f"Debate log queue full, dropped record ({self.dropped} dropped so far)")
+            return False
+
+    def flush(self):
+        """Block until every queued record has been written"""
+        self.queue.join()
+
+    def close(self):
+        """Drain the queue and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self.queue.put(_STOP)
+        self._thread.join(timeout=10)
+
+    def stats(self) -> Dict:
+        """Return writer counters"""
+        return {
+            'queued': self.queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'segment': self._segment_path
+        }
+
+    def _run(self):
+        """Writer loop: collect up to batch_size records and append them"""
+        while True:
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = []
+            stop = item is _STOP
+            if not stop:
+                batch.append(item)
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.append(item)
+
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except Exception as e:
+                    logger.error(f"Failed to write {len(batch)} debate log records: {e}")
+            for _ in range(len(batch) + (1 if stop else 0)):
+                self.queue.task_done()
+            if stop:
+                break
+
+    def _write_batch(self, batch: List[Dict]):
+        """Append a batch to the active segment as one gzip member"""
+        if self._segment_path is None or self._segment_bytes >= self.max_segment_bytes:
+            self._rotate()
+
+        lines = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in batch)
+        data = gzip.compress(lines.encode('utf-8'))
+        with open(self._segment_path, 'ab') as f:
+            f.write(data)
+        self._segment_bytes += len(data)
+        self.written += len(batch)
+
+    def _rotate(self):
+        """Start a new segment file"""
+        self._segment_seq += 1
+        timestamp = time.strftime("%Y%m%d_%H%M%S")
+        # pid keeps segments from different gunicorn workers apart
+        filename = f"{SEGMENT_PREFIX}{timestamp}-{os.getpid()}-{self._segment_seq:04d}{SEGMENT_SUFFIX}"
+        self._segment_path = os.path.join(self.logs_dir, filename)
+        self._segment_bytes = 0
+        logger.info(f"Rotated debate log segment to {self._segment_path}")
+
+
+def list_segments(logs_dir: str = LOG_DIR) -> List[str]:
+    """Return segment paths ordered by creation time"""
+    if not os.path.isdir(logs_dir):
+        return []
+    names = [n for n in os.listdir(logs_dir) if n.startswith(SEGMENT_PREFIX) and n.endswith(SEGMENT_SUFFIX)]
+    return [os.path.join(logs_dir, n) for n in sorted(names)]
+
+
+def iter_records(logs_dir: str = LOG_DIR, since: Optional[float] = None) -> Iterator[Dict]:
+    """Yield records from every segment, optionally only those logged after `since`"""
+    for path in list_segments(logs_dir):
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    if since is None or record.get('logged_at', 0) >= since:
+                        yield record
+        except (EOFError, OSError) as e:
+            # A truncated trailing member only loses the batch being written
+            logger.warning(f"Stopped reading truncated segment {path}: {e}")
+
+
+_sink = None
+_sink_lock = threading.Lock()
+
+
+def get_log_sink() -> DebateLogSink:
+    """Return the process-wide log sink, starting it on first use"""
+    global _sink
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                _sink = DebateLogSink()
+    return _sink
@@ -0,0 +1,140 @@
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+import logging
+from typing import List, Tuple
+from config import RATE_LIMIT_DB
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+WINDOW_SECONDS = {
+    'second': 1,
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400
+}
+
+_LIMIT_PATTERN = re.compile(r'^\s*(\d+)\s*(?:per|/)\s*(second|minute|hour|day)s?\s*$', re.IGNORECASE)
+
+
+def parse_limit(limit: str) -> Tuple[int, int]:
+    """Parse a limit string like "2 per day" into (amount, window_seconds)"""
+    match = _LIMIT_PATTERN.match(limit)
+    if not match:
+        raise ValueError(f"Invalid rate limit: {limit!r}")
+    return int(match.group(1)), WINDOW_SECONDS[match.group(2).lower()]
+
+
+class SQLiteRateLimiter:
+    """Sliding-window rate limiter shared by every worker through one SQLite file.
+
+    Each accepted hit is stored with its cost and timestamp; a hit is allowed
+    when the summed cost inside every window stays within that window's limit.
+    The check and insert run in one BEGIN IMMEDIATE transaction, so concurrent
+    gunicorn workers cannot both spend the last unit of a quota.
+    """
+
+    def __init__(self, db_path: str = RATE_LIMIT_DB, timeout: float = 5.0, prune_probability: float = 0.01):
+        self.db_path = db_path
+        self.timeout = timeout
+        self.prune_probability = prune_probability
+        self.max_window = max(WINDOW_SECONDS.values())
+        self._local = threading.local()
+        self.create_tables()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, reopening it after a fork"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def create_tables(self):
+        """Create the hits table"""
+        conn = self._connection()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS rate_limit_hits (
+                key TEXT NOT NULL,
+                ts REAL NOT NULL,
+                cost INTEGER NOT NULL
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_rate_limit_hits_key_ts ON rate_limit_hits (key, ts)')
+
+    def hit(self, key: str, limits: List[str], cost: int = 1) -> Tuple[bool, float]:
+        """Charge `cost` against every limit for `key`.
+
+        Returns (allowed, retry_after_seconds). Nothing is recorded when the
+        hit is rejected.
+        """
+        parsed = [parse_limit(limit) for limit in limits]
+        now = time.time()
+        longest = max(window for _, window in parsed)
+        conn = self._connection()
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM rate_limit_hits WHERE key = ? AND ts <= ?', (key, now - longest))
+            if random.random() < self.prune_probability:
+                # Occasionally drop expired hits of keys that never came back
+                conn.execute('DELETE FROM rate_limit_hits WHERE ts <= ?', (now - self.max_window,))
+
+            retry_after = 0.0
+            for amount, window in parsed:
+                used = conn.execute(
+                    'SELECT COALESCE(SUM(cost), 0) FROM rate_limit_hits WHERE key = ? AND ts > ?',
+                    (key, now - window)
+                ).fetchone()[0]
+                if used + cost > amount:
+                    retry_after = max(retry_after, self._retry_after(conn, key, amount, window, cost, used, now))
+
+            if retry_after == 0.0:
+                conn.execute('INSERT INTO rate_limit_hits (key, ts, cost) VALUES (?, ?, ?)', (key, now, cost))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        if retry_after:
+            logger.info(f"Rate limit exceeded for {key} (cost {cost}), retry after {retry_after:.0f}s")
+            return False, retry_after
+        return True, 0.0
+
+    def _retry_after(self, conn: sqlite3.Connection, key: str, amount: int, window: int,
+                     cost: int, used: int, now: float) -> float:
+        """Seconds until enough earlier hits slide out of the window to fit `cost`"""
+        if cost > amount:
+            return float(window)
+        rows = conn.execute(
+            'SELECT ts, cost FROM rate_limit_hits WHERE key = ? AND ts > ? ORDER BY ts',
+            (key, now - window)
+        )
+        for ts, hit_cost in rows:
+            used -= hit_cost
+            if used + cost <= amount:
+                return max(ts + window - now, 0.001)
+        return float(window)
+
+    def usage(self, key: str, limit: str) -> int:
+        """Return the cost already charged to `key` inside the window of `limit`"""
+        _, window = parse_limit(limit)
+        return self._connection().execute(
+            'SELECT COALESCE(SUM(cost), 0) FROM rate_limit_hits WHERE key = ? AND ts > ?',
+            (key, time.time() - window)
+        ).fetchone()[0]
+
+    def reset(self, key: str = None):
+        """Forget the hits of one key, or of every key"""
+        conn = self._connection()
+        if key is None:
+            conn.execute('DELETE FROM rate_limit_hits')
+        else:
+            conn.execute('DELETE FROM rate_limit_hits WHERE key = ?', (key,))
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+from typing import Any, Dict, Optional
+from config import SEARCH_CACHE_DB, SEARCH_CACHE_TTL, SEARCH_CACHE_MAX_ENTRIES
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class SearchCache:
+    """TTL and size-bounded cache for web search results (utils.web_search).
+
+    Entries live in SQLite so they are shared by every debate and gunicorn
+    worker. Once the table holds more than max_entries rows, the
+    least recently used entries are evicted.
+    """
+
+    def __init__(self, db_path: str = SEARCH_CACHE_DB, ttl: float = SEARCH_CACHE_TTL,
+                 max_entries: int = SEARCH_CACHE_MAX_ENTRIES, timeout: float = 5.0):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.hits = {}
+        self.misses = {}
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self.create_tables()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, reopening it after a fork"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def create_tables(self):
+        """Create the cache table"""
+        conn = self._connection()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS search_cache (
+                key TEXT PRIMARY KEY,
+                namespace TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_search_cache_last_access ON search_cache (last_access)')
+
+    @staticmethod
+    def make_key(namespace: str, *parts: Any) -> str:
+        """Hash a namespace and the parts of a query into a cache key"""
+        payload = json.dumps([namespace, *parts], sort_keys=True, ensure_ascii=False)
+        return f"{namespace}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+    def get(self, namespace: str, *parts: Any) -> Optional[Any]:
+        """Return the cached value for a query, or None if missing or expired"""
+        key = self.make_key(namespace, *parts)
+        now = time.time()
+        conn = self._connection()
+        row = conn.execute('SELECT value, created_at FROM search_cache WHERE key = ?', (key,)).fetchone()
+
+        if row is None or now - row[1] > self.ttl:
+            if row is not None:
+                conn.execute('DELETE FROM search_cache WHERE key = ?', (key,))
+            self._count(self.misses, namespace)
+            return None
+
+        conn.execute('UPDATE search_cache SET last_access = ? WHERE key = ?', (now, key))
+        self._count(self.hits, namespace)
+        return json.loads(row[0])
+
+    def set(self, namespace: str, value: Any, *parts: Any):
+        """Store a value for a query and evict the least recently used overflow"""
+        key = self.make_key(namespace, *parts)
+        now = time.time()
+        conn = self._connection()
+        conn.execute('''
+            INSERT OR REPLACE INTO search_cache (key, namespace, value, created_at, last_access)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (key, namespace, json.dumps(value, ensure_ascii=False), now, now))
+        self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Drop expired entries and trim the table to max_entries"""
+        conn.execute('DELETE FROM search_cache WHERE created_at < ?', (now - self.ttl,))
+        overflow = conn.execute('SELECT COUNT(*) FROM search_cache').fetchone()[0] - self.max_entries
+        if overflow > 0:
+            conn.execute('''
+                DELETE FROM search_cache WHERE key IN (
+                    SELECT key FROM search_cache ORDER BY last_access LIMIT ?
+                )
+            ''', (overflow,))
+            logger.info(f"Evicted {overflow} search cache entries")
+
+    def _count(self, counter: Dict[str, int], namespace: str):
+        with self._stats_lock:
+            counter[namespace] = counter.get(namespace, 0) + 1
+
+    def stats(self) -> Dict:
+        """Return per-namespace hit/miss counts and hit rates for this process"""
+        namespaces = set(self.hits) | set(self.misses)
+        stats = {}
+        for namespace in sorted(namespaces):
+            hits = self.hits.get(namespace, 0)
+            misses = self.misses.get(namespace, 0)
+            stats[namespace] = {
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': hits / (hits + misses) if hits + misses else 0.0
+            }
+        stats['entries'] = self._connection().execute('SELECT COUNT(*) FROM search_cache').fetchone()[0]
+        return stats
+
+    def clear(self):
+        """Remove every cached entry"""
+        self._connection().execute('DELETE FROM search_cache')
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> SearchCache:
+    """Return the process-wide search cache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SearchCache()
+    return _cache
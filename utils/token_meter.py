@@ -0,0 +1,71 @@
+import threading
+import logging
+from typing import Dict
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class TokenMeter:
+    """Per-process counters of Gemini calls and the tokens they consumed"""
+
+    FIELDS = ('prompt_token_count', 'cached_content_token_count', 'candidates_token_count')
+
+    def __init__(self):
+        self.components = {}
+        self.debates = {'count': 0, 'rounds': 0, 'with_precedents': 0}
+        self._lock = threading.Lock()
+
+    def record(self, component: str, response) -> Dict[str, int]:
+        """Add the usage metadata of a Gemini response to `component`'s totals"""
+        usage = getattr(response, 'usage_metadata', None)
+        counts = {field: int(getattr(usage, field, 0) or 0) for field in self.FIELDS}
+
+        with self._lock:
+            totals = self.components.setdefault(component, {'calls': 0, **{f: 0 for f in self.FIELDS}})
+            totals['calls'] += 1
+            for field, value in counts.items():
+                totals[field] += value
+
+        logger.info(f"{component} call used {counts['prompt_token_count']} input tokens "
+                    f"({counts['cached_content_token_count']} cached)")
+        return counts
+
+    def record_debate(self, rounds: int, with_precedents: bool):
+        """Count a debate and the rounds it was given"""
+        with self._lock:
+            self.debates['count'] += 1
+            self.debates['rounds'] += rounds
+            self.debates['with_precedents'] += int(with_precedents)
+    
+    def debate_stats(self) -> Dict:
+        """Return debate count, mean rounds per debate and how many debates had precedents"""
+        with self._lock:
+            count = self.debates['count']
+            return {**self.debates, 'rounds_per_debate': self.debates['rounds'] / count if count else 0.0}
+    
+    def stats(self) -> Dict:
+        """Return totals and mean input tokens per call for each component"""
+        with self._lock:
+            stats = {}
+            for component, totals in self.components.items():
+                calls = totals['calls']
+                stats[component] = {
+                    **totals,
+                    'input_tokens_per_call': totals['prompt_token_count'] / calls if calls else 0.0,
+                    'uncached_input_tokens_per_call': (
+                        (totals['prompt_token_count'] - totals['cached_content_token_count']) / calls
+                        if calls else 0.0
+                    )
+                }
+            return stats
+
+    def reset(self):
+        """Clear all counters"""
+        with self._lock:
+            self.components = {}
+            self.debates = {'count': 0, 'rounds': 0, 'with_precedents': 0}
+
+
+# Shared by every lawyer and judge in the worker
+token_meter = TokenMeter()
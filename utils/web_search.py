@@ -1,20 +1,53 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import List, Dict
-from config import GOOGLE_SEARCH_API, SEARCH_ENGINE_ID
-import os
+from config import GOOGLE_SEARCH_API, GOOGLE_API_KEY, SEARCH_ENGINE_ID, SEARCH_TIMEOUT
+from utils.search_cache import get_search_cache
+
+
+def _create_session() -> requests.Session:
+    """Create a pooled HTTP session that retries transient failures"""
+    session = requests.Session()
+    retry = Retry(total=2, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504],
+                  allowed_methods=["GET"])
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# Shared by all threads of a worker so connections are reused between searches
+session = _create_session()
+
 
 def perform_web_search(query: str, num_results: int = 3) -> List[Dict]:
-    """Perform a web search and return relevant results"""
+    """Perform a web search and return relevant results, served from cache when possible"""
+    cache = get_search_cache()
+    cached = cache.get('web', query, num_results)
+    if cached is not None:
+        return cached
+
     try:
         params = {
             'q': query,
-            'key': os.getenv('GOOGLE_SEARCH_API_KEY'),
+            'key': GOOGLE_API_KEY,
             'cx': SEARCH_ENGINE_ID,
             'num': num_results
         }
-        response = requests.get(GOOGLE_SEARCH_API, params=params)
+        response = session.get(GOOGLE_SEARCH_API, params=params, timeout=SEARCH_TIMEOUT)
+        response.raise_for_status()
         results = response.json().get('items', [])
-        return [{'title': r['title'], 'snippet': r['snippet'], 'link': r['link']} for r in results]
+        results = [{'title': r['title'], 'snippet': r['snippet'], 'link': r['link']} for r in results]
     except Exception as e:
         print(f"Search error: {e}")
-        return []
\ No newline at end of file
+        return []
+
+    cache.set('web', results, query, num_results)
+    return results
+
+
+def evidence_query(message: str, max_words: int = 32) -> str:
+    """Search query for a message: its first words, normalised so repeats hit the cache"""
+    # Custom Search ignores words beyond the 32nd
+    return " ".join(str(message or "").split()[:max_words])